@@ -0,0 +1,75 @@
+"""Benchmark response decoding with each JSON codec and the raw mode.
+
+Decodes a synthetic ``users.list`` response through ``APIPath`` with a
+stubbed transport, so the numbers are the client-side CPU cost per call.
+
+    python -m benchmarks.codec
+"""
+
+import json
+import timeit
+
+from mock import patch
+
+from rocketchat import RocketChat
+from rocketchat.codec import CODECS
+
+URL = "http://rocket.test"
+
+
+class _Response(object):
+    status_code = 200
+    headers = {}
+
+    def __init__(self, content):
+        self.content = content
+
+
+def users_payload(count=5000) -> bytes:
+    users = [
+        {
+            "_id": "user{:06d}".format(i),
+            "username": "user{}".format(i),
+            "name": "User Number {}".format(i),
+            "status": "online" if i % 3 else "away",
+            "active": True,
+            "roles": ["user"],
+            "emails": [{"address": "user{}@example.com".format(i), "verified": True}],
+            "_updatedAt": "2020-01-01T00:00:00.000Z",
+        }
+        for i in range(count)
+    ]
+    body = {"users": users, "count": count, "offset": 0, "total": count}
+    return json.dumps(dict(body, success=True)).encode("utf-8")
+
+
+def call_time(call, number=20):
+    return min(timeit.repeat(call, number=number, repeat=5)) / number
+
+
+def run():
+    payload = users_payload()
+    results = {"payload_kb": len(payload) / 1024}
+    for name, cls in CODECS.items():
+        try:
+            codec = cls()
+        except ImportError:
+            continue
+        api = RocketChat(URL, codec=codec)
+        api.auth_token = "token"
+        with patch.object(api, "_send", return_value=_Response(payload)):
+            results["{}_ms".format(name)] = call_time(api.users.list) * 1e3
+    api = RocketChat(URL)
+    api.auth_token = "token"
+    with patch.object(api, "_send", return_value=_Response(payload)):
+        results["raw_ms"] = call_time(api.users.list.raw) * 1e3
+    return results
+
+
+def main():
+    for name, value in run().items():
+        print("{:<30} {:>10.3f}".format(name, value))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Benchmark client import time, construction time and per-instance memory.
+
+Compares a fresh client (endpoints created lazily) with a client where every
+endpoint in the tree has been materialized, which is the cost every client
+paid when the whole tree was built eagerly in ``RocketChat.__init__``.
+
+Import time is compared with importing ``requests`` alone, which every sync
+client needs: ``import_overhead_ms`` is what the package itself adds.  The
+suite (``benchmarks.suite``) checks it against ``baseline.json``.
+
+    python -m benchmarks.construction
+"""
+
+import gc
+import subprocess
+import sys
+import timeit
+import tracemalloc
+
+from rocketchat import RocketChat
+from rocketchat.endpoints import ENDPOINTS
+
+URL = "http://rocket.test"
+
+
+def materialize(api):
+    """
+    Access every endpoint in the tree.
+    """
+    for name in ENDPOINTS:
+        path = api
+        for attr in name.split("."):
+            path = getattr(path, attr)
+    return api
+
+
+def import_time(module="rocketchat", runs=9):
+    """
+    Return the fastest of ``runs`` imports of ``module``, each in a new
+    interpreter.
+    """
+    code = (
+        "import time; t = time.perf_counter(); import {}; "
+        "print(time.perf_counter() - t)".format(module)
+    )
+    times = [
+        float(subprocess.check_output([sys.executable, "-c", code]))
+        for _ in range(runs)
+    ]
+    return min(times)
+
+
+def import_metrics() -> dict:
+    package = import_time("rocketchat")
+    floor = import_time("requests")
+    return {
+        "import_ms": package * 1e3,
+        "import_requests_ms": floor * 1e3,
+        "import_overhead_ms": (package - floor) * 1e3,
+    }
+
+
+def construction_time(factory, number=2000):
+    return min(timeit.repeat(factory, number=number, repeat=5)) / number
+
+
+def instance_memory(factory, count=200):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    instances = [factory() for _ in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del instances
+    return (after - before) / count
+
+
+def run():
+    lazy = lambda: RocketChat(URL)
+    eager = lambda: materialize(RocketChat(URL))
+    results = import_metrics()
+    results.update(
+        {
+            "construct_lazy_us": construction_time(lazy) * 1e6,
+            "construct_all_endpoints_us": construction_time(eager, number=200) * 1e6,
+            "memory_lazy_kb": instance_memory(lazy) / 1024,
+            "memory_all_endpoints_kb": instance_memory(eager) / 1024,
+        }
+    )
+    return results
+
+
+def main():
+    for name, value in run().items():
+        print("{:<30} {:>10.1f}".format(name, value))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Benchmark memory and lookup time of ``Directory`` for a large workspace.
+
+Loads synthetic users straight into the index, so the numbers are the
+client-side cost independent of the server.
+
+    python -m benchmarks.directory
+"""
+
+import timeit
+import tracemalloc
+
+from rocketchat import RocketChat
+from rocketchat.directory import Directory
+
+URL = "http://rocket.test"
+USERS = 500000
+
+
+def users(count):
+    for i in range(count):
+        yield {
+            "_id": "user{:017d}".format(i),
+            "username": "user{}".format(i),
+            "name": "User Number {}".format(i),
+            "active": True,
+        }
+
+
+def run(count=USERS):
+    directory = Directory(RocketChat(URL))
+    tracemalloc.start()
+    directory._add_users(users(count))
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    number = 100000
+    lookup = lambda: directory.user_id("user12345")
+    return {
+        "users": count,
+        "memory_mb": memory / 1024 / 1024,
+        "bytes_per_user": memory / count,
+        "lookup_ns": min(timeit.repeat(lookup, number=number, repeat=5)) / number * 1e9,
+    }
+
+
+def main():
+    for name, value in run().items():
+        print("{:<30} {:>10.1f}".format(name, value))
+
+
+if __name__ == "__main__":
+    main()
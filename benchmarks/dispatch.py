@@ -0,0 +1,79 @@
+"""Benchmark enqueue latency and delivery throughput of ``Dispatcher``.
+
+Calls are sent to a stubbed transport that takes ``LATENCY`` seconds per
+request, so throughput shows how delivery scales with the number of workers.
+
+    python -m benchmarks.dispatch
+"""
+
+import time
+import timeit
+
+from mock import patch
+
+from rocketchat import RocketChat
+
+URL = "http://rocket.test"
+LATENCY = 0.002
+
+
+class _Response(object):
+    status_code = 200
+    headers = {}
+    text = '{"success": true}'
+    content = b'{"success": true}'
+
+    def json(self):
+        return {"success": True}
+
+
+def _send(method, url, **kwargs):
+    time.sleep(LATENCY)
+    return _Response()
+
+
+def _api():
+    api = RocketChat(URL)
+    api.user_id, api.auth_token = "uid", "token"
+    return api
+
+
+def enqueue_time(number=100000):
+    api = _api()
+    dispatcher = api.dispatcher(workers=1, maxsize=number + 1)
+    # Park the worker so the benchmark measures the producer side only.
+    with patch.object(api, "_send", side_effect=lambda *a, **k: time.sleep(3600)):
+        dispatcher.post_message(channel="#warmup", text="x")
+        elapsed = timeit.timeit(
+            lambda: dispatcher.post_message(channel="#bench", text="x"), number=number
+        )
+    dispatcher.close(wait=False, timeout=0)
+    return elapsed / number
+
+
+def throughput(workers, count=1000):
+    api = _api()
+    with patch.object(api, "_send", side_effect=_send):
+        start = time.perf_counter()
+        with api.dispatcher(workers=workers) as dispatcher:
+            for i in range(count):
+                dispatcher.post_message(channel="#room{}".format(i % 50), text="x")
+        elapsed = time.perf_counter() - start
+    assert dispatcher.failed == 0, list(dispatcher.failures)[:1]
+    return count / elapsed
+
+
+def run():
+    results = {"enqueue_us": enqueue_time() * 1e6}
+    for workers in (1, 4, 16):
+        results["msgs_per_s_{}_workers".format(workers)] = throughput(workers)
+    return results
+
+
+def main():
+    for name, value in run().items():
+        print("{:<30} {:>10.1f}".format(name, value))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Benchmark the per-call overhead of instrumentation.
+
+Times ``users.info`` calls against a stubbed transport with instrumentation
+disabled (the default), with metrics only and with metrics and hooks.
+
+    python -m benchmarks.instrumentation
+"""
+
+import timeit
+
+from mock import patch
+
+from rocketchat import Instrumentation, RocketChat
+
+URL = "http://rocket.test"
+
+
+class _Response(object):
+    status_code = 200
+    headers = {}
+    content = b'{"user": {"_id": "u1", "username": "bob"}, "success": true}'
+
+
+def call_time(instrumentation, number=20000):
+    api = RocketChat(URL, instrumentation=instrumentation)
+    api.auth_token = "token"
+    call = api.users.info
+    with patch.object(api, "_send", return_value=_Response()):
+        times = timeit.repeat(lambda: call(username="bob"), number=number, repeat=5)
+    return min(times) / number
+
+
+def run():
+    with_hooks = Instrumentation()
+    with_hooks.before_request(lambda call: None)
+    with_hooks.after_response(lambda call: None)
+    disabled = call_time(None)
+    metrics = call_time(Instrumentation())
+    hooks = call_time(with_hooks)
+    return {
+        "disabled_us": disabled * 1e6,
+        "metrics_us": metrics * 1e6,
+        "metrics_and_hooks_us": hooks * 1e6,
+        "metrics_overhead_us": (metrics - disabled) * 1e6,
+    }
+
+
+def main():
+    for name, value in run().items():
+        print("{:<30} {:>10.2f}".format(name, value))
+
+
+if __name__ == "__main__":
+    main()
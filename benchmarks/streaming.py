@@ -0,0 +1,92 @@
+"""Benchmark peak memory and time of streaming a large listing.
+
+Compares decoding a synthetic ``users.list(count=0)`` response in one go with
+``stream()``, with and without compact ``User`` records.  The transport is
+stubbed, so the numbers are the client-side cost.
+
+    python -m benchmarks.streaming
+"""
+
+import time
+import tracemalloc
+
+from rocketchat import RocketChat
+from rocketchat.models import User
+
+from .codec import users_payload
+
+URL = "http://rocket.test"
+USERS = 50000
+
+
+class _Response(object):
+    status_code = 200
+    headers = {}
+
+    def __init__(self, content):
+        self.content = content
+
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i : i + chunk_size]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+def measure(consume) -> tuple:
+    """
+    Return the seconds and peak bytes allocated by ``consume()``.
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    consume()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def run(count=USERS):
+    payload = users_payload(count)
+    api = RocketChat(URL)
+    api.auth_token = "token"
+    api._send = lambda *args, **kwargs: _Response(payload)
+    results = {"payload_mb": len(payload) / 1e6}
+
+    def decoded():
+        for user in api.users.list(count=0)["users"]:
+            pass
+
+    def streamed():
+        for user in api.users.list.stream(count=0):
+            pass
+
+    def kept_dicts():
+        return list(api.users.list.stream(count=0))
+
+    def kept_records():
+        return list(api.users.list.stream(count=0, model=User))
+
+    for name, consume in [
+        ("decoded", decoded),
+        ("streamed", streamed),
+        ("kept_dicts", kept_dicts),
+        ("kept_records", kept_records),
+    ]:
+        elapsed, peak = measure(consume)
+        results[name + "_s"] = elapsed
+        results[name + "_peak_mb"] = peak / 1e6
+    return results
+
+
+def main():
+    for name, value in run().items():
+        print("{:<30} {:>10.3f}".format(name, value))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""In-process HTTP stand-in for a RocketChat server.
+
+Serves every ``/api/v1/`` endpoint declared in ``rocketchat.endpoints`` with
+generated payloads, so the client can be benchmarked without a live server.
+Latency, payload sizes and error/429 injection are configurable.
+
+>>> with StubServer(latency=0.001, items=5000) as server:
+...     api = RocketChat(server.url, 'bench', 'bench')
+...     users = list(api.users.list.iter())
+"""
+
+import datetime
+import json
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from rocketchat.endpoints import ENDPOINTS
+
+_EPOCH = datetime.datetime(2020, 1, 1)
+
+
+def _route_table():
+    """
+    Map each url path to its endpoint spec.  Endpoints that take a positional
+    argument are matched by prefix.
+    """
+    exact, prefixed = {}, []
+    for spec in ENDPOINTS.values():
+        if spec.method is None:
+            continue
+        url = spec.api_root + spec.path
+        if spec.arg_endpoint:
+            prefixed.append((url + "/", spec))
+        else:
+            exact[(url, spec.method)] = spec
+    return exact, prefixed
+
+
+class StubServer(object):
+    """
+    A threaded HTTP server answering RocketChat api calls.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        items: int = 1000,
+        item_size: int = 100,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        retry_after: float = 0.01,
+        seed: int = 0,
+    ):
+        """
+        Args:
+            latency: Seconds each request takes to answer.
+            items: Number of items in every list endpoint (users.list,
+                channels.history, ...).
+            item_size: Bytes of padding in every generated object.
+            error_rate: Fraction of calls answered with an api error.
+            rate_limit_rate: Fraction of calls rejected with HTTP 429.
+            retry_after: Seconds until the rate limit resets on a 429.
+            seed: Seed of the error injection.
+        """
+        self.latency = latency
+        self.items = items
+        self.item_size = item_size
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.statuses = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._exact, self._prefixed = _route_table()
+        self._httpd = None
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return "http://{}:{}".format(host, port)
+
+    @property
+    def requests(self) -> int:
+        return sum(self.statuses.values())
+
+    def start(self):
+        handler = type("Handler", (_Handler,), {"stub": self})
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._thread.join()
+            self._httpd = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def item(self, index: int) -> dict:
+        ts = _EPOCH - datetime.timedelta(seconds=index)
+        return {
+            "_id": "id{:08d}".format(index),
+            "name": "item{}".format(index),
+            "ts": ts.isoformat(timespec="milliseconds") + "Z",
+            "pad": "x" * self.item_size,
+        }
+
+    def _inject(self) -> str:
+        with self._lock:
+            roll = self._random.random()
+        if roll < self.rate_limit_rate:
+            return "rate_limit"
+        if roll < self.rate_limit_rate + self.error_rate:
+            return "error"
+        return ""
+
+    def respond(self, method: str, path: str, query: dict) -> tuple:
+        """
+        Return the ``(status, headers, payload)`` of a request.
+        """
+        if self.latency:
+            time.sleep(self.latency)
+        if path == "/api/v1/login":
+            data = {"userId": "bench", "authToken": "bench-token"}
+            return 200, {}, {"status": "success", "data": data}
+        spec = self._exact.get((path, method))
+        if spec is None:
+            spec = next(
+                (s for prefix, s in self._prefixed if path.startswith(prefix)), None
+            )
+        if spec is None:
+            return 404, {}, {"success": False, "error": "Not found"}
+
+        injected = self._inject()
+        if injected == "rate_limit":
+            reset = int((time.time() + self.retry_after) * 1000)
+            headers = {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(reset)}
+            return 429, headers, {"success": False, "error": "Too many requests"}
+        if injected == "error":
+            error = {"success": False, "error": "Injected", "errorType": "error-stub"}
+            return 400, {}, error
+
+        payload = {"success": True}
+        # Cursor endpoints list their items under result_key.
+        items_key = spec.items_key or (spec.result_key if spec.cursor else None)
+        if items_key is not None:
+            payload.update(self._page(spec.cursor, items_key, query))
+        elif spec.result_key is not None:
+            payload[spec.result_key] = self.item(0)
+        return 200, {}, payload
+
+    def _page(self, cursor, items_key: str, query: dict) -> dict:
+        count = int(query.get("count", 50))
+        offset = int(query.get("offset", 0))
+        start = 0
+        if cursor is not None and "latest" in query:
+            # Items are numbered newest first, one second apart.
+            latest = datetime.datetime.strptime(
+                query["latest"], "%Y-%m-%dT%H:%M:%S.%fZ"
+            )
+            start = int((_EPOCH - latest).total_seconds())
+            # Like the server, only the string "true" makes latest inclusive.
+            if query.get("inclusive") != "true":
+                start += 1
+        start += offset
+        stop = min(self.items, start + count)
+        items = [self.item(i) for i in range(start, stop)]
+        return {
+            items_key: items,
+            "count": len(items),
+            "offset": offset,
+            "total": self.items,
+        }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    stub = None  # type: StubServer
+
+    def _handle(self, method: str):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        url = urlsplit(self.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        status, headers, payload = self.stub.respond(method, url.path, query)
+        body = json.dumps(payload).encode("utf-8")
+        with self.stub._lock:
+            self.stub.statuses[status] += 1
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def log_message(self, format, *args):
+        pass
@@ -0,0 +1,218 @@
+"""Client benchmark suite against the local stub server.
+
+Measures construction time and memory, and calls/sec and p50/p99 latency of
+single calls, pagination, concurrent fan-out and calls with 429 injection.
+Results are compared with a stored baseline and the run fails if any metric
+regressed by more than the tolerance.
+
+    python -m benchmarks.suite                   # compare with baseline.json
+    python -m benchmarks.suite --save-baseline   # store a new baseline
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from rocketchat import RateLimiter, RocketChat
+from rocketchat.errors import RocketChatError
+
+from . import construction
+from .stub_server import StubServer
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+#: Metrics where a higher value is better.  Everything else is lower-better.
+HIGHER_IS_BETTER = ("_per_s",)
+
+
+def better(metric: str, a: float, b: float) -> float:
+    if metric.endswith(HIGHER_IS_BETTER):
+        return max(a, b)
+    return min(a, b)
+
+
+def best_of(repeat: int, bench, *args, **kwargs) -> dict:
+    """
+    Run a benchmark ``repeat`` times and keep the best value of each metric,
+    which is the least affected by noise from the rest of the machine.
+    """
+    best = bench(*args, **kwargs)
+    for _ in range(repeat - 1):
+        for metric, value in bench(*args, **kwargs).items():
+            best[metric] = better(metric, best[metric], value)
+    return best
+
+
+def percentile(values, fraction: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+def timed_calls(call, count: int) -> dict:
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(count):
+        t = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - t)
+    elapsed = time.perf_counter() - start
+    return {
+        "calls_per_s": count / elapsed,
+        "p50_ms": percentile(latencies, 0.5) * 1e3,
+        "p99_ms": percentile(latencies, 0.99) * 1e3,
+    }
+
+
+def bench_construction() -> dict:
+    lazy = lambda: RocketChat(construction.URL)
+    imports = construction.import_metrics()
+    return {
+        "import_overhead_ms": imports["import_overhead_ms"],
+        "construct_us": construction.construction_time(lazy) * 1e6,
+        "memory_kb": construction.instance_memory(lazy) / 1024,
+    }
+
+
+def bench_single(server: StubServer, count: int) -> dict:
+    with RocketChat(server.url, "bench", "bench") as api:
+        api.users.info(username="warmup")
+        return timed_calls(lambda: api.users.info(username="bench"), count)
+
+
+def bench_pagination(server: StubServer) -> dict:
+    with RocketChat(server.url, "bench", "bench") as api:
+        api.me()
+        start = time.perf_counter()
+        users = sum(1 for _ in api.users.list.iter(page_size=100))
+        messages = sum(
+            1 for _ in api.channels.history.iter(roomId="GENERAL", page_size=100)
+        )
+        elapsed = time.perf_counter() - start
+    assert users == messages == server.items, (users, messages)
+    return {"items_per_s": (users + messages) / elapsed}
+
+
+def bench_fanout(server: StubServer, count: int, workers: int) -> dict:
+    with RocketChat(server.url, "bench", "bench", pool_maxsize=workers) as api:
+        api.me()
+        calls = [(api.users.info, {"username": str(i)}) for i in range(count)]
+        start = time.perf_counter()
+        results = api.batch(calls, max_workers=workers).results()
+        elapsed = time.perf_counter() - start
+    errors = [r for r in results if isinstance(r, Exception)]
+    assert not errors, errors[0]
+    return {"calls_per_s": count / elapsed}
+
+
+def bench_rate_limited(server: StubServer, count: int, workers: int) -> dict:
+    limiter = RateLimiter(backoff=0.001, max_backoff=0.05, max_retries=10)
+    with RocketChat(
+        server.url, "bench", "bench", pool_maxsize=workers, rate_limiter=limiter
+    ) as api:
+        api.me()
+        calls = [(api.users.info, {"username": str(i)}) for i in range(count)]
+        start = time.perf_counter()
+        results = api.batch(calls, max_workers=workers).results()
+        elapsed = time.perf_counter() - start
+    failed = sum(1 for r in results if isinstance(r, RocketChatError))
+    return {
+        "calls_per_s": count / elapsed,
+        "throttled": limiter.throttled,
+        "failed": failed,
+    }
+
+
+def run(latency: float = 0.001, scale: float = 1.0, repeat: int = 3) -> dict:
+    """
+    Run every benchmark and return the results keyed by scenario.metric.
+    """
+    n = lambda count: max(1, int(count * scale))
+    results = {"construction": bench_construction()}
+    with StubServer(latency=latency, items=n(2000)) as server:
+        results["single"] = best_of(repeat, bench_single, server, n(500))
+        results["pagination"] = best_of(repeat, bench_pagination, server)
+        results["fanout"] = best_of(repeat, bench_fanout, server, n(1000), 16)
+    with StubServer(latency=latency, rate_limit_rate=0.02, seed=1) as server:
+        results["rate_limited"] = best_of(
+            repeat, bench_rate_limited, server, n(500), 16
+        )
+    return {
+        "{}.{}".format(scenario, metric): value
+        for scenario, metrics in results.items()
+        for metric, value in metrics.items()
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Return ``(metric, baseline, result, change)`` for every metric that is
+    worse than the baseline by more than ``tolerance`` (a fraction).
+    """
+    regressions = []
+    for metric, value in results.items():
+        base = baseline.get(metric)
+        if not base or metric.endswith((".throttled", ".failed")):
+            continue
+        change = (value - base) / base
+        if metric.endswith(HIGHER_IS_BETTER):
+            change = -change
+        if change > tolerance:
+            regressions.append((metric, base, value, change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="Store the results as baseline"
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Allowed slowdown before a metric counts as a regression",
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.001, help="Stub server latency, seconds"
+    )
+    parser.add_argument(
+        "--scale", type=float, default=1.0, help="Multiplier for call counts"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Runs per scenario, the best is kept"
+    )
+    args = parser.parse_args(argv)
+
+    results = run(latency=args.latency, scale=args.scale, repeat=args.repeat)
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    for metric, value in results.items():
+        base = baseline.get(metric)
+        delta = "" if not base else "{:+.1%}".format((value - base) / base)
+        print("{:<32} {:>12.2f} {:>10}".format(metric, value, delta))
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print("Saved baseline to {}".format(args.baseline))
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance)
+    for metric, base, value, change in regressions:
+        print(
+            "REGRESSION {}: {:.2f} -> {:.2f} ({:.1%} worse)".format(
+                metric, base, value, change
+            )
+        )
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
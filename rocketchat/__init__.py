@@ -24,8 +24,60 @@ keyword arguments) that will be appended to the api path to create the full endp
 
 >>> api.settings.get('blah')
 >>> api.settings.set('blah', value=True)
+
+An asyncio version of the api with the same endpoints is also available (requires aiohttp).
+
+>>> from rocketchat import AsyncRocketChat
+>>> async with AsyncRocketChat('http://server.com', 'username', 'password') as api:
+...     await api.users.list()
 """
 
+import importlib
+
+from .errors import (
+    CircuitOpenError,
+    DeadlineExceeded,
+    RateLimitError,
+    RocketChatError,
+)
 from .rocketchat import RocketChat
 
+#: Public names and the module they are imported from on first use, so
+#: ``import rocketchat`` only loads what the sync client needs.
+_LAZY = {
+    "AsyncRocketChat": "aio",
+    "CircuitBreaker": "breaker",
+    "Coalescer": "coalesce",
+    "FileTokenStore": "tokens",
+    "Hedging": "hedge",
+    "Instrumentation": "metrics",
+    "Metrics": "metrics",
+    "RateLimiter": "ratelimit",
+    "RealtimeClient": "realtime",
+    "ResponseCache": "cache",
+    "RocketChatPool": "pool",
+}
+
+__all__ = [
+    "CircuitOpenError",
+    "DeadlineExceeded",
+    "RateLimitError",
+    "RocketChat",
+    "RocketChatError",
+] + sorted(_LAZY)
+
+
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError("module {} has no attribute {}".format(__name__, name))
+    value = getattr(importlib.import_module("." + module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
+
+
 __version__ = "1.0.0"
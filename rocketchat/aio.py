@@ -0,0 +1,475 @@
+"""asyncio interface for the RocketChat REST API.
+
+``AsyncRocketChat`` exposes the same endpoint tree as ``RocketChat``, but every
+endpoint is a coroutine function that is sent through one shared ``aiohttp``
+connection pool.
+
+>>> async with AsyncRocketChat('http://server.com', 'username', 'password') as api:
+...     user = await api.users.info(username='username')
+...     history = await api.channels.history(roomId='GENERAL')
+
+Requires the optional ``aiohttp`` dependency (``pip install rocketchat[async]``).
+"""
+
+import asyncio
+import importlib.util
+import logging
+from typing import TYPE_CHECKING, AsyncIterator, Dict, Optional, Union
+
+if TYPE_CHECKING:
+    import aiohttp
+
+from .apipath import APIPath, query_value
+from .breaker import CircuitBreaker
+from .cache import ResponseCache
+from .coalesce import Coalescer
+from .codec import JSONCodec
+from .files import CHUNK_SIZE, MultipartEncoder
+from .hedge import Hedging
+from .metrics import Call, Instrumentation
+from .ratelimit import RateLimiter
+from .timeouts import DEFAULT_TIMEOUT, Timeout, bounded, check_wait
+from .tokens import FileTokenStore
+from .rocketchat import RocketChat
+
+LOG = logging.getLogger(__name__)
+
+
+def _encode_params(params: Optional[dict]) -> Optional[list]:
+    """
+    Encode query params the same way ``requests`` does.
+
+    ``None`` values are dropped, lists become repeated keys, booleans become
+    "true" or "false" and every other value is converted to a string.
+    """
+    if params is None:
+        return None
+    encoded = []
+    for key, value in params.items():
+        if value is None:
+            continue
+        values = value if isinstance(value, (list, tuple)) else [value]
+        encoded.extend((key, str(query_value(v))) for v in values)
+    return encoded
+
+
+def _client_timeout(timeout: Timeout) -> "aiohttp.ClientTimeout":
+    """
+    Convert a requests style timeout to an ``aiohttp.ClientTimeout``.
+    """
+    import aiohttp
+
+    if isinstance(timeout, tuple):
+        connect, read = timeout
+    else:
+        connect = read = timeout
+    return aiohttp.ClientTimeout(total=None, sock_connect=connect, sock_read=read)
+
+
+async def _iter_chunks(body: MultipartEncoder):
+    """
+    Stream an upload body, reading each chunk in the default executor so file
+    reads do not block the event loop.
+    """
+    loop = asyncio.get_event_loop()
+    while True:
+        chunk = await loop.run_in_executor(None, body.read, CHUNK_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
+
+class AsyncAPIPath(APIPath):
+    """
+    Awaitable version of ``APIPath``.
+    """
+
+    def iter(
+        self, *args, page_size: int = 100, prefetch: bool = True, **kwargs
+    ) -> AsyncIterator:
+        """
+        Lazily yield every item from a paginated endpoint.
+
+        If ``prefetch`` is True, the next page is requested while the current
+        page is being consumed.
+
+        >>> async for user in api.users.list.iter(page_size=500):
+        ...     print(user['username'])
+        """
+        return self._iter(args, self._paginator(kwargs, page_size), prefetch)
+
+    async def _iter(self, args, paginator, prefetch):
+        params = paginator.first_params()
+        task = asyncio.ensure_future(self._call(args, params))
+        try:
+            while task is not None:
+                page = await task
+                items = paginator.items(page)
+                params = paginator.next_params(page)
+                task = None
+                if params is not None:
+                    next_page = self._call(args, params)
+                    task = asyncio.ensure_future(next_page) if prefetch else next_page
+                del page
+                for item in items:
+                    yield item
+        finally:
+            if task is not None:
+                if prefetch:
+                    task.cancel()
+                else:
+                    task.close()
+
+    async def _send_call(self, args, kwargs, call: Optional[Call] = None) -> tuple:
+        """
+        Send this api call and return the response ``(status, body)``.
+        """
+        if self._auth:
+            await self._api._ensure_login()
+        request_kwargs = self._request_kwargs(args, kwargs)
+        request_kwargs["params"] = _encode_params(request_kwargs["params"])
+        if call is not None:
+            call.start(request_kwargs)
+
+        try:
+            hedging = self._api.hedging
+            if (
+                hedging is not None
+                and self._method == "GET"
+                and hedging.enabled(self._path)
+            ):
+                status, headers, body = await hedging.send_async(
+                    self._path, self._api._request, request_kwargs
+                )
+            else:
+                status, headers, body = await self._api._request(**request_kwargs)
+            if status == 401 and self._auth:
+                stale_token = request_kwargs["headers"]["X-Auth-Token"]
+                if await self._api._reauthenticate(stale_token):
+                    self._use_current_token(request_kwargs)
+                    status, headers, body = await self._api._request(**request_kwargs)
+        finally:
+            if isinstance(request_kwargs["data"], MultipartEncoder):
+                request_kwargs["data"].close()
+        if call is not None:
+            call.received(status, body)
+        self._check_status(status, headers, body)
+        return status, body
+
+    async def _call(self, args, kwargs, raw: bool = False):
+        """
+        Send this api call and return the full decoded response (or the
+        undecoded body if ``raw``).
+        """
+        instrumentation = self._api.instrumentation
+        if instrumentation is None:
+            return self._complete(*await self._send_call(args, kwargs), raw=raw)
+        with instrumentation.call(self._path) as call:
+            return self._complete(*await self._send_call(args, kwargs, call), raw=raw)
+
+    async def raw(self, *args, **kwargs) -> bytes:
+        return await self._call(args, kwargs, raw=True)
+
+    def download(self, *args, **kwargs):
+        raise TypeError("Downloads are only supported by RocketChat")
+
+    def stream(self, *args, **kwargs):
+        raise TypeError("Streaming is only supported by RocketChat, use iter()")
+
+    async def _fetch(self, args, kwargs):
+        coalescer = self._api.coalescer
+        if coalescer is None or not self._coalescable(coalescer):
+            return await self._call(args, kwargs)
+        key = coalescer.key(self._api, self._path, args, kwargs)
+        return await coalescer.do_async(key, self._call, args, kwargs)
+
+    async def __call__(self, *args, **kwargs):
+        if self._auth:
+            # Cache and coalescer keys include the user id, so login first.
+            await self._api._ensure_login()
+        cache = self._api.cache
+        if cache is None:
+            result = await self._fetch(args, kwargs)
+        elif self._cacheable(cache):
+            key = cache.key(self._path, args, kwargs, self._api.url, self._api.user_id)
+            result = cache.get(key)
+            if result is None:
+                generation = cache.generation(self._path)
+                result = await self._fetch(args, kwargs)
+                cache.set(key, result, generation)
+        elif self._method == "GET":
+            result = await self._fetch(args, kwargs)
+        else:
+            try:
+                result = await self._call(args, kwargs)
+            finally:
+                cache.invalidate(self._path)
+        return self._extract_result(result)
+
+
+class AsyncRocketChat(RocketChat):
+    """
+    asyncio interface to the RocketChat REST API.
+
+    Login happens on the first authenticated call (or when entering the
+    ``async with`` block), so the instance can be created outside of a running
+    event loop.
+    """
+
+    path_class = AsyncAPIPath
+
+    def __init__(
+        self,
+        url: str,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        limit: int = 100,
+        limit_per_host: int = 0,
+        keepalive_timeout: float = 15.0,
+        session: Optional["aiohttp.ClientSession"] = None,
+        cache: Optional[ResponseCache] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        codec: Union[str, JSONCodec] = "json",
+        instrumentation: Optional[Instrumentation] = None,
+        auth_token: Optional[str] = None,
+        user_id: Optional[str] = None,
+        token_store: Optional[FileTokenStore] = None,
+        coalescer: Optional[Coalescer] = None,
+        timeout: Timeout = DEFAULT_TIMEOUT,
+        timeouts: Optional[Dict[str, Timeout]] = None,
+        hedging: Optional[Hedging] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+    ):
+        """
+        Args:
+            url: Base url of the RocketChat server (e.g. https://chat.server.com)
+            username: Username to login with.
+            password: Password to login with.
+            limit: Maximum number of simultaneous connections.
+            limit_per_host: Maximum number of simultaneous connections to a
+                single host.  0 means no per host limit.
+            keepalive_timeout: Seconds to keep idle connections open.
+            session: An existing ``aiohttp.ClientSession`` to send requests
+                through.  It is used as-is and is not closed by ``close()``.
+            cache: A ``ResponseCache`` for responses from read-only endpoints.
+            rate_limiter: A ``RateLimiter`` that paces calls within the
+                server's rate limits and retries calls rejected with HTTP 429.
+            codec: JSON codec for request and response bodies, see
+                ``rocketchat.codec``.
+            instrumentation: An ``Instrumentation`` to run request hooks and
+                record per-endpoint metrics.
+            auth_token: Auth token of an existing session, or a personal
+                access token, used instead of logging in.
+            user_id: Id of the user ``auth_token`` belongs to.
+            token_store: A ``FileTokenStore`` to share auth tokens between
+                processes.
+            coalescer: A ``Coalescer`` so concurrent identical GET calls
+                share a single request.
+            timeout: Timeout of every request, in seconds or as a
+                ``(connect, read)`` tuple.  None waits forever.
+            timeouts: Timeouts of specific api paths, overriding ``timeout``.
+            hedging: A ``Hedging`` that sends a second request for GET calls
+                slower than usual.
+            circuit_breaker: A ``CircuitBreaker`` that fails calls fast while
+                the server is failing.
+        """
+        # aiohttp is slow to import, so it is only imported when a session is created.
+        if importlib.util.find_spec("aiohttp") is None:
+            raise ImportError("AsyncRocketChat requires the aiohttp package")
+        self._init_state(
+            url,
+            username,
+            password,
+            cache=cache,
+            rate_limiter=rate_limiter,
+            codec=codec,
+            instrumentation=instrumentation,
+            auth_token=auth_token,
+            user_id=user_id,
+            token_store=token_store,
+            coalescer=coalescer,
+            timeout=timeout,
+            timeouts=timeouts,
+            hedging=hedging,
+            circuit_breaker=circuit_breaker,
+        )
+        self._connector_kwargs = {
+            "limit": limit,
+            "limit_per_host": limit_per_host,
+            "keepalive_timeout": keepalive_timeout,
+        }
+        self._owns_session = session is None
+        self.session = session
+        self._login_lock = None
+
+    def _get_session(self) -> "aiohttp.ClientSession":
+        """
+        Return the shared ``aiohttp.ClientSession``, creating it on first use.
+        """
+        if self.session is None:
+            import aiohttp
+
+            connector = aiohttp.TCPConnector(**self._connector_kwargs)
+            self.session = aiohttp.ClientSession(connector=connector)
+        return self.session
+
+    def _send(self, method: str, url: str, **kwargs):
+        """
+        Send a request through the shared session.
+
+        Returns the ``aiohttp`` request context manager.
+        """
+        return self._get_session().request(method=method, url=url, **kwargs)
+
+    async def _request(self, method: str, url: str, **kwargs) -> tuple:
+        """
+        Send a request, applying the rate limiter, timeouts and circuit
+        breaker, and return the response ``(status, headers, body)``.
+        """
+        import aiohttp
+
+        timeout = kwargs.pop("timeout", self.timeout)
+        breaker = self.circuit_breaker
+        if breaker is None:
+            return await self._request_limited(method, url, timeout, kwargs)
+        breaker.before(self.url)
+        try:
+            status, headers, body = await self._request_limited(
+                method, url, timeout, kwargs
+            )
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+            breaker.failure()
+            raise
+        breaker.record(status)
+        return status, headers, body
+
+    async def _request_limited(
+        self, method: str, url: str, timeout: Timeout, kwargs: dict
+    ) -> tuple:
+        key = kwargs.pop("rate_key", url)
+        limiter = self.rate_limiter
+        request_body = kwargs.pop("data", None)
+        if isinstance(request_body, MultipartEncoder):
+            kwargs["headers"] = dict(kwargs.get("headers") or {})
+            kwargs["headers"]["Content-Length"] = str(request_body.len)
+        attempt = 0
+        while True:
+            if limiter is not None:
+                delay = limiter.reserve(key)
+                if delay > 0:
+                    check_wait(delay)
+                    await asyncio.sleep(delay)
+            data = request_body
+            if isinstance(request_body, MultipartEncoder):
+                request_body.seek(0)
+                data = _iter_chunks(request_body)
+            kwargs["timeout"] = _client_timeout(bounded(timeout))
+            async with self._send(method, url, data=data, **kwargs) as r:
+                status, headers, body = r.status, r.headers, await r.read()
+            if limiter is None:
+                return status, headers, body
+            limiter.update(key, status, headers)
+            if status != 429 or attempt >= limiter.max_retries:
+                return status, headers, body
+            delay = limiter.retry_delay(attempt, headers)
+            check_wait(delay)
+            LOG.debug("Rate limited by %s, retrying in %.2fs", url, delay)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _ensure_login(self):
+        """
+        Login with the stored credentials if this api is not authenticated yet.
+        """
+        if self.auth_token is not None or self._credentials["username"] is None:
+            return
+        async with self._get_login_lock():
+            if self.auth_token is None:
+                await self._authenticate()
+
+    def _get_login_lock(self) -> asyncio.Lock:
+        # Created lazily, so the instance can be created outside an event loop.
+        if self._login_lock is None:
+            self._login_lock = asyncio.Lock()
+        return self._login_lock
+
+    async def _authenticate(self, stale_token: Optional[str] = None):
+        """
+        Use the token in the token store, unless it is ``stale_token``, or
+        login and store the new token.  Must hold the login lock.
+        """
+        store = self.token_store
+        if store is None:
+            await self.login(**self._credentials)
+            return
+        key = self._token_key()
+        async with store.async_lock():
+            stored = store.get(key)
+            if stored is not None and stored["authToken"] != stale_token:
+                self.user_id = stored["userId"]
+                self.auth_token = stored["authToken"]
+                return
+            if stale_token is not None:
+                # Other processes must not pick up the rejected token if this
+                # login fails.
+                store.discard(key, stale_token)
+            await self.login(**self._credentials)
+            store.set(key, self.user_id, self.auth_token)
+
+    async def _reauthenticate(self, stale_token: Optional[str]) -> bool:
+        """
+        Replace ``stale_token`` after the server rejected it.  Returns True if
+        the rejected call should be retried with the current token.
+        """
+        async with self._get_login_lock():
+            if self.auth_token != stale_token:
+                return True
+            if self._credentials["username"] is None:
+                return False
+            LOG.info("Auth token for %s expired, logging in again", self.url)
+            await self._authenticate(stale_token)
+            return True
+
+    async def login(self, **kwargs):
+        """
+        Authenticate this Rocketchat API.
+
+        Uses the username and password given to the constructor unless other
+        credentials are passed.
+        """
+        kwargs = kwargs or self._credentials
+        url = self.url + self.api_v1_path + "login"
+        timeout = _client_timeout(bounded(self.timeout))
+        async with self._send("POST", url, data=kwargs, timeout=timeout) as r:
+            j = await r.json(content_type=None)
+        if j["status"] != "success":
+            raise Exception(j["message"])
+        self.user_id = j["data"]["userId"]
+        self.auth_token = j["data"]["authToken"]
+
+    async def close(self):
+        """
+        Close the pooled connections held by this api.
+        """
+        if self._owns_session and self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self):
+        await self._ensure_login()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def __enter__(self):
+        raise TypeError("Use 'async with' with AsyncRocketChat")
+
+    def dispatcher(self, *args, **kwargs):
+        raise TypeError("Dispatcher is only supported by RocketChat")
+
+    def batch(self, *args, **kwargs):
+        raise TypeError("Use asyncio.gather to run async calls concurrently")
+
+    def download(self, *args, **kwargs):
+        raise TypeError("Downloads are only supported by RocketChat")
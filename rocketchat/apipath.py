@@ -1,21 +1,60 @@
-import inspect
+import contextvars
 import json
 import logging
-from typing import Optional, Union
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, Optional, Union
 
-import requests
+from .endpoints import Node
+from .errors import RateLimitError, RocketChatError
+from .metrics import Call
+from .files import CHUNK_SIZE, MultipartEncoder, Progress, multipart_body, stream_to
+from .pagination import Paginator
+from .ratelimit import reset_delay
+from .streaming import iter_items
 
-from .errors import RocketChatError
-from .rocketchat import RocketChat
+if TYPE_CHECKING:
+    from .rocketchat import RocketChat
 
 LOG = logging.getLogger(__name__)
 
 
+def query_value(value):
+    """
+    Encode a query param value the way the server parses it.
+
+    The server compares boolean flags (e.g. ``inclusive``) with the string
+    "true", so booleans are sent in lower case rather than as "True".
+    """
+    if value is True:
+        return "true"
+    if value is False:
+        return "false"
+    return value
+
+
 class APIPath(object):
     """
     Descriptor object for defining RocketChat API calls.
+
+    Child endpoints (e.g. ``api.channels.list.joined``) are created from the
+    endpoint tree the first time they are accessed.
     """
 
+    __slots__ = (
+        "_api",
+        "_path",
+        "_method",
+        "_arg_endpoint",
+        "_result_key",
+        "_auth",
+        "_api_root",
+        "_items_key",
+        "_cursor",
+        "_upload",
+        "_nodes",
+        "_children",
+    )
+
     def __init__(
         self,
         api: "RocketChat",
@@ -25,21 +64,33 @@ class APIPath(object):
         result_key: Optional[str] = None,
         auth: bool = True,
         api_root: str = "/api/v1/",
+        items_key: Optional[str] = None,
+        cursor: Optional[str] = None,
+        upload: Optional[str] = None,
     ):
         """
         Args:
             api: The Rockchat instance to send the api call to.
             path: API endpoint (e.g. self.users.create)
             method: HTTP method (e.g. GET, POST, DELETE). Defaults to "GET", if
-                set to None, it will not be a valid endpoint and will raise an 
+                set to None, it will not be a valid endpoint and will raise an
                 exception if called as one.
-            arg_endpoint: If True, this APIPath will accept a single positional 
-                argument that will be added to the api path with a preceding 
+            arg_endpoint: If True, this APIPath will accept a single positional
+                argument that will be added to the api path with a preceding
                 slash to create the final endpoint. (e.g. api.settings.get('ARG') -> /settings/ARG
-            result_key: A specific key in the returned json object that should 
+            result_key: A specific key in the returned json object that should
                 be returned instead of the entire json response object.
             auth: Whether this call requires authorization or not.
             api_root: Specify an alternate root path for the api endpoints.
+            items_key: The key of the list of items in a paginated response,
+                used by ``iter()``.  Defaults to ``result_key``.
+            cursor: If set, ``iter()`` pages through the endpoint using the
+                ``latest`` param set to this field of the last item on each
+                page instead of using ``offset``. (e.g. "ts" for history endpoints)
+            upload: If set, the call is sent as a streaming multipart upload and
+                the keyword argument with this name is the file to upload (a
+                path, binary file object or memory-mapped file).  A ``progress``
+                keyword argument is called with ``(bytes_sent, total)``.
         """
         self._api = api
         self._path = path
@@ -48,53 +99,387 @@ class APIPath(object):
         self._result_key = result_key
         self._auth = auth
         self._api_root = api_root
+        self._items_key = items_key if items_key is not None else result_key
+        self._cursor = cursor
+        self._upload = upload
+        self._nodes = {}
+        self._children = None
+
+    @classmethod
+    def _from_node(cls, api: "RocketChat", node: Node) -> "APIPath":
+        """
+        Create the APIPath for a node of the endpoint tree.
+        """
+        spec, nodes = node
+        path = cls(api, *spec)
+        path._nodes = nodes
+        return path
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        if self._children is not None and name in self._children:
+            return self._children[name]
+        try:
+            node = self._nodes[name]
+        except KeyError:
+            raise AttributeError(
+                "{} has no endpoint {}".format(self, repr(name))
+            ) from None
+        if self._children is None:
+            self._children = {}
+        return self._children.setdefault(name, self._from_node(self._api, node))
+
+    def __setattr__(self, name, value):
+        # Public attributes are child endpoints added to the tree at runtime.
+        if name.startswith("_"):
+            object.__setattr__(self, name, value)
+        else:
+            if self._children is None:
+                self._children = {}
+            self._children[name] = value
+
+    def __dir__(self):
+        names = set(object.__dir__(self)).union(self._nodes)
+        return sorted(names.union(self._children or ()))
 
     def __str__(self):
         return "{}({})".format(self.__class__.__name__, repr(self._path))
 
     def __repr__(self):
-        args = inspect.getargspec(self.__init__).args[1:]
+        import inspect
+
+        args = inspect.getfullargspec(self.__init__).args[1:]
         attrs = ["{}={}".format(arg, repr(getattr(self, "_" + arg))) for arg in args]
         return "{}({})".format(self.__class__.__name__, ", ".join(attrs))
 
     def _url(self):
         return self._api.url + self._api_root + self._path
 
-    def __call__(self, *args, **kwargs):
+    def _request_kwargs(self, args, kwargs) -> dict:
+        """
+        Build the keyword arguments for sending this api call.
+        """
         if self._method is None:
             raise ValueError("Not a valid endpoint: {}".format(self._path))
 
+        content_type = None
         if self._method == "GET":
-            params = kwargs
+            params = {key: query_value(value) for key, value in kwargs.items()}
             data = None
+        elif self._upload is not None:
+            params = None
+            kwargs = dict(kwargs)
+            data = multipart_body(kwargs, self._upload, kwargs.pop("progress", None))
+            content_type = data.content_type
         else:
             params = None
-            data = json.dumps(kwargs)
+            data = self._api.codec.dumps(kwargs)
 
-        url = self._url()
+        # The server rate limits each endpoint, whatever its path argument.
+        rate_key = url = self._url()
         if self._arg_endpoint:
             url += "/{}".format(args[0])
 
-        request_kwargs = {}
+        api = self._api
+        request_kwargs = {
+            "method": self._method,
+            "url": url,
+            "params": params,
+            "data": data,
+            "timeout": api.timeouts.get(self._path, api.timeout),
+            "rate_key": rate_key,
+        }
         if self._auth:
             request_kwargs["headers"] = self._api.auth_header()
+        if content_type is not None:
+            headers = dict(request_kwargs.get("headers", {}))
+            headers["Content-type"] = content_type
+            request_kwargs["headers"] = headers
+        return request_kwargs
+
+    @staticmethod
+    def _check_status(status: int, headers, body: Union[str, bytes]):
+        """
+        Raise a ``RateLimitError`` if the call was rejected by the rate limit.
+        """
+        if status == 429:
+            if isinstance(body, bytes):
+                body = body.decode("utf-8", "replace")
+            raise RateLimitError(body, retry_after=reset_delay(headers))
 
-        r = requests.request(
-            method=self._method, url=url, params=params, data=data, **request_kwargs,
-        )
+    def _check_result(self, result: dict) -> dict:
+        """
+        Raise any api error in the decoded response.
+        """
+        if "error" in result:
+            raise RocketChatError(result.get("errorType"), result["error"])
+        return result
+
+    def _extract_result(self, result: dict):
+        """
+        Extract the ``result_key`` from the decoded response.
+        """
+        if self._result_key is not None:
+            result = result[self._result_key]
+        return result
+
+    def _paginator(self, kwargs: dict, page_size: int) -> Paginator:
+        if self._items_key is None:
+            raise ValueError("Not a paginated endpoint: {}".format(self._path))
+        return Paginator(kwargs, self._items_key, page_size, self._cursor)
+
+    def iter(
+        self, *args, page_size: int = 100, prefetch: bool = True, **kwargs
+    ) -> Iterator:
+        """
+        Lazily yield every item from a paginated endpoint.
+
+        Pages of ``page_size`` items are requested one at a time.  If
+        ``prefetch`` is True, the next page is requested in a background thread
+        while the current page is being consumed, so at most two pages are held
+        in memory at once.
+
+        >>> for user in api.users.list.iter(page_size=500):
+        ...     print(user['username'])
+        """
+        return self._iter(args, self._paginator(kwargs, page_size), prefetch)
+
+    def _iter(self, args, paginator: Paginator, prefetch: bool) -> Iterator:
+        params = paginator.first_params()
+        if not prefetch:
+            while params is not None:
+                page = self._call(args, params)
+                items = paginator.items(page)
+                params = paginator.next_params(page)
+                yield from items
+            return
+
+        executor = ThreadPoolExecutor(max_workers=1)
+        # Pages are fetched in the caller's context, to keep to its deadline.
+        context = contextvars.copy_context()
+        future = executor.submit(context.run, self._call, args, params)
         try:
-            result = r.json()
+            while future is not None:
+                page = future.result()
+                items = paginator.items(page)
+                params = paginator.next_params(page)
+                future = None
+                if params is not None:
+                    future = executor.submit(context.run, self._call, args, params)
+                del page
+                yield from items
+        finally:
+            if future is not None:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def download(
+        self,
+        dest,
+        *args,
+        chunk_size: int = CHUNK_SIZE,
+        progress: Optional[Progress] = None,
+        **kwargs
+    ) -> int:
+        """
+        Stream the binary response of this endpoint to ``dest`` (a path or a
+        binary file object).  Returns the number of bytes written.
+
+        >>> api.users.getAvatar.download('bob.png', username='bob')
+        """
+        if self._auth:
+            self._api._ensure_login()
+        request_kwargs = self._request_kwargs(args, kwargs)
+        if self._auth:
+            request_kwargs["headers"].pop("Content-type", None)
+        with self._api._send(stream=True, **request_kwargs) as r:
+            self._check_status(r.status_code, r.headers, "")
+            r.raise_for_status()
+            return stream_to(r, dest, chunk_size, progress)
+
+    def stream(
+        self,
+        *args,
+        fields: Union[dict, Iterable[str], None] = None,
+        model: Optional[Callable[[dict], Any]] = None,
+        chunk_size: int = CHUNK_SIZE,
+        **kwargs
+    ) -> Iterator:
+        """
+        Lazily yield the items of a listing endpoint while the response is
+        being received, without holding the whole response in memory.
+
+        Unlike ``iter()``, a single request is sent, so this suits calls that
+        return everything at once (e.g. ``count=0``).
+
+        Args:
+            fields: Only request these item fields, as a list of names or an
+                api ``fields`` projection (e.g. ``{"username": 1}``).
+            model: A ``rocketchat.models.Record`` class (or any callable) each
+                item is converted with.  Record classes also set ``fields``
+                to the fields they read, unless given.
+            chunk_size: Bytes read from the response at a time.
+
+        >>> for user in api.users.list.stream(count=0, model=User):
+        ...     print(user.username)
+        """
+        if self._items_key is None:
+            raise ValueError("Not a listing endpoint: {}".format(self._path))
+        if fields is None and hasattr(model, "api_fields"):
+            fields = model.api_fields()
+        if fields is not None:
+            if not isinstance(fields, dict):
+                fields = {name: 1 for name in fields}
+            kwargs["fields"] = json.dumps(fields)
+        convert = getattr(model, "from_dict", model)
+        return self._stream(args, kwargs, convert, chunk_size)
+
+    def _stream(self, args, kwargs, convert, chunk_size: int) -> Iterator:
+        if self._auth:
+            self._api._ensure_login()
+        request_kwargs = self._request_kwargs(args, kwargs)
+        r = self._api._send(stream=True, **request_kwargs)
+        if r.status_code == 401 and self._auth:
+            stale_token = request_kwargs["headers"]["X-Auth-Token"]
+            if self._api._reauthenticate(stale_token):
+                r.close()
+                self._use_current_token(request_kwargs)
+                r = self._api._send(stream=True, **request_kwargs)
+        with r:
+            self._check_status(r.status_code, r.headers, "")
+            if r.status_code >= 400:
+                self._complete(r.status_code, r.content)
+                r.raise_for_status()
+            rest = {}
+            items = iter_items(r.iter_content(chunk_size), self._items_key, rest)
+            for item in items:
+                yield item if convert is None else convert(item)
+            self._check_result(rest)
+
+    def _send_call(self, args, kwargs, call: Optional[Call] = None) -> tuple:
+        """
+        Send this api call and return the response ``(status, body)``.
+        """
+        if self._auth:
+            self._api._ensure_login()
+        request_kwargs = self._request_kwargs(args, kwargs)
+        if call is not None:
+            call.start(request_kwargs)
+        try:
+            hedging = self._api.hedging
+            if (
+                hedging is not None
+                and self._method == "GET"
+                and hedging.enabled(self._path)
+            ):
+                r = hedging.send(self._path, self._api._send, request_kwargs)
+            else:
+                r = self._api._send(**request_kwargs)
+            if r.status_code == 401 and self._auth:
+                stale_token = request_kwargs["headers"]["X-Auth-Token"]
+                if self._api._reauthenticate(stale_token):
+                    self._use_current_token(request_kwargs)
+                    r = self._api._send(**request_kwargs)
+        finally:
+            if isinstance(request_kwargs["data"], MultipartEncoder):
+                request_kwargs["data"].close()
+        if call is not None:
+            call.received(r.status_code, r.content)
+        self._check_status(r.status_code, r.headers, r.content)
+        return r.status_code, r.content
+
+    def _use_current_token(self, request_kwargs: dict):
+        """
+        Prepare a call rejected with an expired token to be sent again.
+        """
+        request_kwargs["headers"]["X-Auth-Token"] = self._api.auth_token
+        request_kwargs["headers"]["X-User-Id"] = self._api.user_id
+        if isinstance(request_kwargs["data"], MultipartEncoder):
+            request_kwargs["data"].seek(0)
+
+    def _decode(self, status: int, body: bytes) -> dict:
+        """
+        Decode a response body with the api's codec.
+        """
+        try:
+            return self._api.codec.loads(body)
         except Exception:
             LOG.debug(
                 "Error Response:\n"
                 "  Status: {}\n"
-                "  Text: {}\n".format(r.status_code, r.text)
+                "  Text: {}\n".format(status, body.decode("utf-8", "replace"))
             )
             raise
 
-        if "error" in result:
-            raise RocketChatError(result["errorType"], result["error"])
+    def _complete(self, status: int, body: bytes, raw: bool = False):
+        """
+        Decode and check a response body, or only check it if ``raw``.
+        """
+        if not raw:
+            return self._check_result(self._decode(status, body))
+        if status >= 400:
+            self._check_result(self._decode(status, body))
+        return body
 
-        if self._result_key is not None:
-            result = result[self._result_key]
-        return result
+    def _call(self, args, kwargs, raw: bool = False):
+        """
+        Send this api call and return the full decoded response (or the
+        undecoded body if ``raw``).
+        """
+        instrumentation = self._api.instrumentation
+        if instrumentation is None:
+            return self._complete(*self._send_call(args, kwargs), raw=raw)
+        with instrumentation.call(self._path) as call:
+            return self._complete(*self._send_call(args, kwargs, call), raw=raw)
+
+    def raw(self, *args, **kwargs) -> bytes:
+        """
+        Call this endpoint and return the undecoded response body, to forward
+        it without the cost of parsing.  Error responses are still decoded
+        and raised.  Responses are never cached.
+
+        >>> sink.write(api.users.list.raw(count=1000))
+        """
+        return self._call(args, kwargs, raw=True)
+
+    def _cacheable(self, cache) -> bool:
+        return self._method == "GET" and cache.ttl(self._path) > 0
+
+    def _coalescable(self, coalescer) -> bool:
+        return self._method == "GET" and coalescer.enabled(self._path)
+
+    def _fetch(self, args, kwargs):
+        """
+        Send a read-only call, sharing the request of an identical call in
+        flight if coalescing is enabled for this endpoint.
+        """
+        coalescer = self._api.coalescer
+        if coalescer is None or not self._coalescable(coalescer):
+            return self._call(args, kwargs)
+        key = coalescer.key(self._api, self._path, args, kwargs)
+        return coalescer.do(key, self._call, args, kwargs)
+
+    def __call__(self, *args, **kwargs):
+        if self._auth:
+            # Cache and coalescer keys include the user id, so login first.
+            self._api._ensure_login()
+        cache = self._api.cache
+        if cache is None:
+            result = self._fetch(args, kwargs)
+        elif self._cacheable(cache):
+            key = cache.key(self._path, args, kwargs, self._api.url, self._api.user_id)
+            result = cache.get(key)
+            if result is None:
+                generation = cache.generation(self._path)
+                result = self._fetch(args, kwargs)
+                cache.set(key, result, generation)
+        elif self._method == "GET":
+            result = self._fetch(args, kwargs)
+        else:
+            # Writes invalidate the cached reads of their namespace.
+            try:
+                result = self._call(args, kwargs)
+            finally:
+                cache.invalidate(self._path)
+        return self._extract_result(result)
@@ -0,0 +1,149 @@
+import logging
+import threading
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    CancelledError,
+    Future,
+    ThreadPoolExecutor,
+    wait,
+)
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
+
+LOG = logging.getLogger(__name__)
+
+
+def _run(call: tuple):
+    """
+    Run a single ``(APIPath, kwargs)`` or ``(APIPath, args, kwargs)`` call.
+    """
+    if len(call) == 2:
+        path, kwargs = call
+        args = ()
+    else:
+        path, args, kwargs = call
+    return path(*args, **kwargs)
+
+
+def _outcome(future: Future):
+    """
+    Return the result of ``future``, or the exception it raised.
+    """
+    if future.cancelled():
+        return CancelledError()
+    exc = future.exception()
+    return exc if exc is not None else future.result()
+
+
+class Batch(object):
+    """
+    Runs many api calls concurrently on a bounded pool of worker threads.
+
+    Each call is a ``(APIPath, kwargs)`` tuple, or ``(APIPath, args, kwargs)``
+    for endpoints that take a positional argument.  Calls are read lazily from
+    the input, so only a small window of calls is queued at any time.
+
+    Exceptions raised by a call (usually a ``RocketChatError``) are returned in
+    place of its result instead of being raised.
+
+    >>> calls = [(api.users.info, {'username': name}) for name in names]
+    >>> users = api.batch(calls, max_workers=20).results()
+    """
+
+    def __init__(
+        self,
+        calls: Iterable[tuple],
+        max_workers: int = 10,
+        progress: Optional[Callable[[int, Optional[int]], Any]] = None,
+    ):
+        """
+        Args:
+            calls: The api calls to run.
+            max_workers: Maximum number of calls running at the same time.  The
+                api ``pool_maxsize`` should be at least this large so that every
+                worker can hold a pooled connection.
+            progress: Called with ``(completed, total)`` after each call
+                finishes.  ``total`` is None if ``calls`` has no length.
+        """
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        self.total = len(calls) if hasattr(calls, "__len__") else None
+        self.completed = 0
+        self._calls = enumerate(calls)
+        self._max_workers = max_workers
+        self._progress = progress
+        self._cancelled = threading.Event()
+        self._started = False
+
+    def cancel(self):
+        """
+        Stop starting new calls.  Calls that are already running will finish.
+
+        Safe to call from any thread, including the progress callback.
+        """
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def _iter_outcomes(self) -> Iterator[Tuple[int, Any]]:
+        if self._started:
+            raise RuntimeError("A Batch can only be run once")
+        self._started = True
+
+        executor = ThreadPoolExecutor(
+            self._max_workers, thread_name_prefix="rocketchat-batch"
+        )
+        pending = {}
+        max_pending = self._max_workers * 2
+        try:
+            while True:
+                if self.cancelled:
+                    for future in pending:
+                        future.cancel()
+                else:
+                    while len(pending) < max_pending:
+                        try:
+                            index, call = next(self._calls)
+                        except StopIteration:
+                            break
+                        pending[executor.submit(_run, call)] = index
+                if not pending:
+                    break
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = pending.pop(future)
+                    if not future.cancelled():
+                        self.completed += 1
+                        if self._progress is not None:
+                            self._progress(self.completed, self.total)
+                    yield index, _outcome(future)
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def as_completed(self) -> Iterator[Tuple[int, Any]]:
+        """
+        Run the calls, yielding ``(index, result)`` tuples as each call finishes.
+
+        ``index`` is the position of the call in the input.  Closing the
+        iterator early cancels the calls that have not started yet.
+        """
+        for index, outcome in self._iter_outcomes():
+            if not isinstance(outcome, CancelledError):
+                yield index, outcome
+
+    def results(self) -> List[Any]:
+        """
+        Run the calls and return their results in input order.
+
+        If the batch is cancelled, calls that never ran are returned as
+        ``CancelledError`` instances.
+        """
+        outcomes = dict(self._iter_outcomes())
+        if self.cancelled:
+            for index, _ in self._calls:
+                outcomes[index] = CancelledError()
+        return [outcomes[i] for i in range(len(outcomes))]
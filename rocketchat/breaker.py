@@ -0,0 +1,121 @@
+"""Circuit breaker that fails fast while a server is unhealthy.
+
+After ``failure_threshold`` consecutive failures (connection errors, timeouts
+and 5xx responses), the circuit opens and calls raise ``CircuitOpenError``
+without being sent.  Once ``reset_timeout`` has passed, a single probe call is
+let through: the circuit closes again if it succeeds, and stays open for
+another ``reset_timeout`` if it fails.
+
+>>> api = RocketChat(url, username, password, circuit_breaker=CircuitBreaker())
+
+``RocketChatPool`` treats an open circuit like a connection error, so calls
+fail over to the other nodes.
+"""
+
+import logging
+import threading
+import time
+from typing import Iterable
+
+from .errors import CircuitOpenError
+
+LOG = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+#: Response statuses that count as a failure.
+FAILURE_STATUSES = (500, 502, 503, 504)
+
+
+class CircuitBreaker(object):
+    """
+    Thread-safe circuit breaker for the calls of a client.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        failure_statuses: Iterable[int] = FAILURE_STATUSES,
+    ):
+        """
+        Args:
+            failure_threshold: Consecutive failures after which the circuit
+                opens.
+            reset_timeout: Seconds the circuit stays open before a probe call
+                is let through.
+            failure_statuses: Response statuses that count as a failure.
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failure_statuses = frozenset(failure_statuses)
+        self.state = CLOSED
+        self.failures = 0
+        self.opened = 0
+        self.rejected = 0
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+
+    def before(self, name: str = ""):
+        """
+        Raise ``CircuitOpenError`` if a call may not be sent now.
+        """
+        if self.state == CLOSED:
+            return
+        with self._lock:
+            now = time.monotonic()
+            if self.state == CLOSED:
+                return
+            if now >= self._retry_at:
+                # Let one probe through.  If it never reports back, another
+                # probe is allowed after the next reset_timeout.
+                self.state = HALF_OPEN
+                self._retry_at = now + self.reset_timeout
+                return
+            self.rejected += 1
+            retry_after = self._retry_at - now
+        raise CircuitOpenError(
+            "Circuit open for {}, retry in {:.1f}s".format(name, retry_after),
+            retry_after=retry_after,
+        )
+
+    def success(self):
+        if self.state == CLOSED and not self.failures:
+            return
+        with self._lock:
+            if self.state != CLOSED:
+                LOG.info("Circuit closed")
+            self.state = CLOSED
+            self.failures = 0
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or (
+                self.state == CLOSED and self.failures >= self.failure_threshold
+            ):
+                if self.state == CLOSED:
+                    LOG.warning("Circuit opened after %d failures", self.failures)
+                self.state = OPEN
+                self.opened += 1
+                self._retry_at = time.monotonic() + self.reset_timeout
+
+    def record(self, status: int):
+        """
+        Record the response status of a call.
+        """
+        if status in self.failure_statuses:
+            self.failure()
+        else:
+            self.success()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "state": self.state,
+                "failures": self.failures,
+                "opened": self.opened,
+                "rejected": self.rejected,
+            }
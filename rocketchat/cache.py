@@ -0,0 +1,174 @@
+import copy
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+#: Default time to live, in seconds, for cached read-only endpoints.
+DEFAULT_TTLS = {
+    "info": 300.0,
+    "users.info": 60.0,
+    "channels.info": 60.0,
+    "groups.info": 60.0,
+    "rooms.info": 60.0,
+    "roles.list": 300.0,
+    "permissions.listAll": 300.0,
+    "settings.public": 300.0,
+}
+
+#: Namespaces whose cached entries also describe rooms in another namespace.
+RELATED_NAMESPACES = {
+    "channels": ("rooms",),
+    "groups": ("rooms",),
+    "im": ("rooms",),
+    "rooms": ("channels", "groups", "im"),
+}
+
+
+def namespace(path: str) -> str:
+    """
+    Return the namespace of an api path (e.g. channels.rename -> channels).
+    """
+    return path.split(".", 1)[0]
+
+
+class ResponseCache(object):
+    """
+    Thread-safe TTL/LRU cache of responses from read-only api endpoints.
+
+    Only GET endpoints with a TTL are cached.  Any write (non-GET) call to an
+    endpoint in the same namespace (e.g. channels.rename for channels.info)
+    invalidates the cached entries of that namespace and its related
+    namespaces, so reads never return data older than the client's own writes.
+
+    >>> api = RocketChat(url, username, password, cache=ResponseCache(maxsize=5000))
+    >>> api.users.info(username='bob')  # server
+    >>> api.users.info(username='bob')  # cache
+    >>> api.cache.stats()
+    {'hits': 1, 'misses': 1, ...}
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttls: Optional[Dict[str, float]] = None,
+        default_ttls: bool = True,
+    ):
+        """
+        Args:
+            maxsize: Maximum number of cached responses.  The least recently
+                used response is evicted when the cache is full.
+            ttls: Time to live, in seconds, for each api path to cache.  A ttl
+                of 0 disables caching for that path.
+            default_ttls: Whether to start from ``DEFAULT_TTLS``.
+        """
+        self.maxsize = maxsize
+        self.ttls = dict(DEFAULT_TTLS) if default_ttls else {}
+        self.ttls.update(ttls or {})
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def ttl(self, path: str) -> float:
+        return self.ttls.get(path, 0)
+
+    @staticmethod
+    def key(
+        path: str,
+        args: tuple,
+        params: dict,
+        url: Optional[str] = None,
+        user_id: Optional[str] = None,
+    ) -> tuple:
+        """
+        Return the cache key for a call, independent of keyword argument order.
+
+        The server ``url`` and ``user_id`` are part of the key, so a cache
+        shared between clients never returns one user's response to another.
+        """
+        params = json.dumps(params, sort_keys=True, default=str)
+        return (path, args, params, url, user_id)
+
+    def generation(self, path: str) -> tuple:
+        """
+        Return the invalidation generation of the namespace of ``path``.
+
+        Pass it to ``set()`` so responses to calls that overlapped a write are
+        not cached.
+        """
+        return (self._epoch, self._generations.get(namespace(path), 0))
+
+    def get(self, key: tuple):
+        """
+        Return a copy of the cached response for ``key``, or None.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return copy.deepcopy(entry[1])
+
+    def set(self, key: tuple, value, generation: tuple):
+        """
+        Cache ``value`` unless its namespace was invalidated after ``generation``.
+        """
+        path = key[0]
+        value = copy.deepcopy(value)
+        with self._lock:
+            if self.generation(path) != generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl(path), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, path: str):
+        """
+        Drop every cached response in the namespace of ``path`` and its
+        related namespaces.
+        """
+        ns = namespace(path)
+        namespaces = {ns}.union(RELATED_NAMESPACES.get(ns, ()))
+        with self._lock:
+            for name in namespaces:
+                self._generations[name] = self._generations.get(name, 0) + 1
+            stale = [k for k in self._entries if namespace(k[0]) in namespaces]
+            for k in stale:
+                del self._entries[k]
+            self.invalidations += 1
+
+    def clear(self):
+        """
+        Drop every cached response.
+        """
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Return hit/miss statistics for the cache.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+            }
@@ -0,0 +1,130 @@
+"""Command line interface, installed as the ``rocketchat`` command.
+
+    rocketchat export DEST --url https://chat.server.com --username bot
+
+Connection options can also be given with the ``ROCKETCHAT_URL``,
+``ROCKETCHAT_USERNAME``, ``ROCKETCHAT_PASSWORD``, ``ROCKETCHAT_USER_ID`` and
+``ROCKETCHAT_AUTH_TOKEN`` environment variables.
+"""
+
+import argparse
+import logging
+import os
+import sys
+import threading
+
+from .export import RoomExporter
+from .rocketchat import RocketChat
+
+
+def _split(value: str) -> list:
+    return [v.strip() for v in value.split(",") if v.strip()]
+
+
+def _add_connection_args(parser: argparse.ArgumentParser):
+    env = os.environ.get
+    parser.add_argument("--url", default=env("ROCKETCHAT_URL"))
+    parser.add_argument("--username", default=env("ROCKETCHAT_USERNAME"))
+    parser.add_argument("--password", default=env("ROCKETCHAT_PASSWORD"))
+    parser.add_argument("--user-id", default=env("ROCKETCHAT_USER_ID"))
+    parser.add_argument("--auth-token", default=env("ROCKETCHAT_AUTH_TOKEN"))
+
+
+def _connect(args, pool_maxsize: int = 10) -> RocketChat:
+    if not args.url:
+        raise SystemExit("error: --url or ROCKETCHAT_URL is required")
+    return RocketChat(
+        args.url,
+        args.username,
+        args.password,
+        user_id=args.user_id,
+        auth_token=args.auth_token,
+        pool_maxsize=pool_maxsize,
+        codec="auto",
+    )
+
+
+def _report(stats, interval: float, done: threading.Event):
+    while not done.wait(interval):
+        print(stats.summary(), file=sys.stderr)
+
+
+def export(args) -> int:
+    # Each room's history iterator prefetches the next page on its own thread.
+    with _connect(args, pool_maxsize=args.workers * 2) as api:
+        exporter = RoomExporter(
+            api,
+            args.dest,
+            oldest=args.oldest,
+            latest=args.latest,
+            fields=args.fields,
+            page_size=args.page_size,
+            max_workers=args.workers,
+            compresslevel=args.compresslevel,
+        )
+        rooms = exporter.rooms(types=args.types, all_rooms=args.all_rooms)
+        print("Exporting {} rooms to {}".format(len(rooms), args.dest), file=sys.stderr)
+        done = threading.Event()
+        if args.progress:
+            reporter = threading.Thread(
+                target=_report, args=(exporter.stats, args.progress, done), daemon=True
+            )
+            reporter.start()
+        try:
+            exporter.export(rooms)
+        finally:
+            done.set()
+    print(exporter.stats.summary())
+    return 1 if exporter.stats.failed else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="rocketchat", description=__doc__.split("\n")[0]
+    )
+    parser.add_argument("-v", "--verbose", action="store_true")
+    commands = parser.add_subparsers(dest="command")
+    commands.required = True
+
+    p = commands.add_parser(
+        "export", help="Export room histories to gzipped NDJSON files"
+    )
+    _add_connection_args(p)
+    p.add_argument("dest", help="Directory to write to; an existing export resumes")
+    p.add_argument(
+        "--types",
+        type=_split,
+        default=["c", "p", "d"],
+        help="Room types: c (channels), p (private groups), d (direct messages)",
+    )
+    p.add_argument(
+        "--all-rooms",
+        action="store_true",
+        help="Export every room on the server, not only the user's rooms",
+    )
+    p.add_argument("--oldest", help="Only messages at or after this ISO timestamp")
+    p.add_argument("--latest", help="Only messages at or before this ISO timestamp")
+    p.add_argument(
+        "--fields", type=_split, help="Comma separated message fields to keep"
+    )
+    p.add_argument("--workers", type=int, default=4, help="Rooms exported at once")
+    p.add_argument("--page-size", type=int, default=500)
+    p.add_argument("--compresslevel", type=int, default=6)
+    p.add_argument(
+        "--progress",
+        type=float,
+        default=10.0,
+        help="Seconds between progress reports, 0 to disable",
+    )
+    p.set_defaults(func=export)
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
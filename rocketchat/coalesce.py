@@ -0,0 +1,174 @@
+"""Coalescing of concurrent identical GET calls.
+
+While a call is in flight, identical calls (same endpoint, arguments and
+user) made from other threads or tasks wait for it and share its result or
+error instead of sending their own request.
+
+>>> api = RocketChat(url, username, password, coalescer=Coalescer())
+>>> api.users.info(username='bob')  # concurrent callers share one request
+>>> api.coalescer.stats()
+{'calls': 10, 'requests': 1, 'coalesced': 9, ...}
+"""
+
+import copy
+import threading
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Optional
+
+from .cache import ResponseCache
+
+if TYPE_CHECKING:
+    import asyncio
+
+#: Endpoints coalesced by default: lookups that many callers tend to make at
+#: the same moment.
+DEFAULT_PATHS = (
+    "me",
+    "info",
+    "users.info",
+    "channels.info",
+    "groups.info",
+    "rooms.info",
+    "subscriptions.getOne",
+    "roles.list",
+    "permissions.listAll",
+    "settings.public",
+)
+
+
+class _Flight(object):
+    """
+    A call in flight and the callers waiting for it.
+    """
+
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class Coalescer(object):
+    """
+    Thread-safe single-flight of identical GET calls.
+
+    Only GET endpoints in ``paths`` are coalesced.  Callers that waited for
+    another caller's request get a copy of its result, so they can modify it
+    freely.
+    """
+
+    def __init__(self, paths: Optional[Iterable[str]] = None, all_gets: bool = False):
+        """
+        Args:
+            paths: Api paths to coalesce.  Defaults to ``DEFAULT_PATHS``.
+            all_gets: Coalesce every GET endpoint, ignoring ``paths``.
+        """
+        self.paths = set(DEFAULT_PATHS if paths is None else paths)
+        self.all_gets = all_gets
+        self._flights = {}  # type: Dict[tuple, _Flight]
+        self._tasks = {}  # type: Dict[tuple, asyncio.Future]
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    def enabled(self, path: str) -> bool:
+        return self.all_gets or path in self.paths
+
+    @staticmethod
+    def key(api, path: str, args: tuple, params: dict) -> tuple:
+        """
+        Return the key of a call.  Calls by different users are never shared.
+        """
+        return ResponseCache.key(path, args, params, api.url, api.user_id)
+
+    def do(self, key: tuple, func: Callable, *args) -> Any:
+        """
+        Return ``func(*args)``, or the result of the identical call already
+        in flight.
+        """
+        with self._lock:
+            self.calls += 1
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                flight.waiters += 1
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return copy.deepcopy(flight.result)
+
+        try:
+            flight.result = func(*args)
+            return flight.result
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+                if flight.error is not None and flight.waiters:
+                    self.errors += flight.waiters
+            flight.done.set()
+
+    async def do_async(self, key: tuple, func: Callable, *args) -> Any:
+        """
+        Coroutine version of ``do()``: return ``await func(*args)``, or the
+        result of the identical call already in flight.
+        """
+        # asyncio is only imported by async callers, it slows down
+        # ``import rocketchat`` for everyone else.
+        import asyncio
+
+        self.calls += 1
+        future = self._tasks.get(key)
+        if future is not None:
+            self.coalesced += 1
+            try:
+                result = await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # The caller that sent the request was cancelled, try again.
+                return await self.do_async(key, func, *args)
+            except Exception:
+                self.errors += 1
+                raise
+            return copy.deepcopy(result)
+
+        future = self._tasks[key] = asyncio.get_event_loop().create_future()
+        try:
+            result = await func(*args)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as exc:
+            future.set_exception(exc)
+            # Mark the exception as retrieved when nobody is waiting for it.
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._tasks[key]
+
+    def stats(self) -> dict:
+        """
+        Return how many calls were made and how many shared another call's
+        request.
+        """
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "requests": self.calls - self.coalesced,
+                "coalesced": self.coalesced,
+                "coalesced_errors": self.errors,
+                "in_flight": len(self._flights) + len(self._tasks),
+            }
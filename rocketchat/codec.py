@@ -0,0 +1,91 @@
+"""JSON codecs used to encode request bodies and decode responses.
+
+The stdlib ``json`` module is used by default.  Faster codecs are used if
+their package is installed:
+
+>>> api = RocketChat(url, username, password, codec='orjson')
+>>> api = RocketChat(url, username, password, codec='auto')  # fastest available
+
+Any object with ``dumps(obj)`` and ``loads(data)`` methods can be passed as a
+codec.  ``loads`` is given the raw response bytes.
+"""
+
+import importlib
+import json
+from typing import Any, Union
+
+
+class JSONCodec(object):
+    """
+    Codec using the stdlib ``json`` module.
+    """
+
+    name = "json"
+
+    def dumps(self, obj: Any) -> Union[str, bytes]:
+        return json.dumps(obj)
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        return json.loads(data)
+
+
+class OrjsonCodec(JSONCodec):
+    """
+    Codec using ``orjson``.
+    """
+
+    name = "orjson"
+
+    def __init__(self):
+        self._orjson = importlib.import_module("orjson")
+
+    def dumps(self, obj: Any) -> bytes:
+        return self._orjson.dumps(obj)
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        return self._orjson.loads(data)
+
+
+class UjsonCodec(JSONCodec):
+    """
+    Codec using ``ujson``.
+    """
+
+    name = "ujson"
+
+    def __init__(self):
+        self._ujson = importlib.import_module("ujson")
+
+    def dumps(self, obj: Any) -> str:
+        return self._ujson.dumps(obj, ensure_ascii=False)
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        return self._ujson.loads(data)
+
+
+#: Codecs by name, fastest first.
+CODECS = {c.name: c for c in (OrjsonCodec, UjsonCodec, JSONCodec)}
+
+
+def get_codec(codec: Union[str, Any] = "json") -> JSONCodec:
+    """
+    Return the codec for ``codec``: a codec name, "auto" for the fastest
+    installed codec, or a codec object (returned as is).
+    """
+    if not isinstance(codec, str):
+        return codec
+    if codec == "auto":
+        for cls in CODECS.values():
+            try:
+                return cls()
+            except ImportError:
+                continue
+    try:
+        cls = CODECS[codec]
+    except KeyError:
+        raise ValueError(
+            "Unknown codec {}, expected one of {}".format(
+                repr(codec), ", ".join(["auto"] + list(CODECS))
+            )
+        ) from None
+    return cls()
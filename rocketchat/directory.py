@@ -0,0 +1,251 @@
+"""Local index of users and rooms.
+
+``Directory`` resolves usernames, user ids, room names and room ids without a
+round trip to the server.  It is bulk loaded once from ``users.list``,
+``channels.list``, ``groups.listAll`` and ``rooms.get``, then kept up to date
+by ``refresh()``, which only fetches what changed since the last load.
+
+>>> directory = Directory(api)
+>>> directory.load()
+>>> api.chat.postMessage(roomId=directory.room_id('general'), text='hi')
+>>> directory.refresh()
+
+Only the fields needed for lookups are kept, in tuples rather than the full
+response dicts, so large workspaces fit in modest memory.
+"""
+
+import datetime
+import json
+import logging
+import threading
+from collections import namedtuple
+from typing import TYPE_CHECKING, Dict, Iterable, Optional
+
+from .errors import RocketChatError
+
+if TYPE_CHECKING:
+    from .rocketchat import RocketChat
+
+LOG = logging.getLogger(__name__)
+
+UserEntry = namedtuple("UserEntry", "id username name active")
+RoomEntry = namedtuple("RoomEntry", "id name type")
+
+#: Fields requested when loading users and rooms.
+USER_FIELDS = {"username": 1, "name": 1, "active": 1}
+ROOM_FIELDS = {"name": 1, "t": 1}
+
+
+def _utcnow() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+def _updated_query(since: Optional[datetime.datetime]) -> dict:
+    if since is None:
+        return {}
+    ms = int(since.timestamp() * 1000)
+    return {"query": json.dumps({"_updatedAt": {"$gt": {"$date": ms}}})}
+
+
+class Directory(object):
+    """
+    In-memory index of a workspace's users and rooms.  Lookups are safe from
+    any thread while a refresh is running.
+    """
+
+    def __init__(
+        self,
+        api: "RocketChat",
+        page_size: int = 1000,
+        private_groups: bool = True,
+        clock_skew: float = 60.0,
+    ):
+        """
+        Args:
+            api: The api to load the directory from.
+            page_size: Number of users or rooms requested per page.
+            private_groups: Also load every private group with
+                ``groups.listAll``, which needs the view-room-administration
+                permission.  Without it only the private groups the user
+                belongs to are loaded (from ``rooms.get``).
+            clock_skew: Seconds of overlap between refreshes, to allow for
+                clock differences with the server.
+        """
+        self.api = api
+        self.page_size = page_size
+        self.private_groups = private_groups
+        self.clock_skew = clock_skew
+        self.loaded_at = None  # type: Optional[datetime.datetime]
+        self._users = {}  # type: Dict[str, UserEntry]
+        self._usernames = {}  # type: Dict[str, UserEntry]
+        self._rooms = {}  # type: Dict[str, RoomEntry]
+        self._room_names = {}  # type: Dict[str, RoomEntry]
+        self._direct = {}  # type: Dict[str, str]
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._users) + len(self._rooms)
+
+    def load(self):
+        """
+        Load every user and room.
+        """
+        self._load(since=None)
+
+    def refresh(self):
+        """
+        Load the users and rooms created or changed since the last load.
+
+        Rooms removed from the user's subscriptions are dropped.  Users
+        deleted from the server are not reported by the api and stay in the
+        directory until the next ``load()``.
+        """
+        if self.loaded_at is None:
+            return self.load()
+        since = self.loaded_at - datetime.timedelta(seconds=self.clock_skew)
+        self._load(since)
+
+    def _load(self, since: Optional[datetime.datetime]):
+        started_at = _utcnow()
+        query = _updated_query(since)
+        users = self.api.users.list.iter(
+            page_size=self.page_size, fields=json.dumps(USER_FIELDS), **query
+        )
+        self._add_users(users)
+
+        fields = json.dumps(ROOM_FIELDS)
+        self._add_rooms(
+            self.api.channels.list.iter(
+                page_size=self.page_size, fields=fields, **query
+            ),
+            default_type="c",
+        )
+        if self.private_groups:
+            try:
+                self._add_rooms(
+                    self.api.groups.listAll.iter(
+                        page_size=self.page_size, fields=fields, **query
+                    ),
+                    default_type="p",
+                )
+            except RocketChatError as exc:
+                LOG.info("Not loading all private groups: %s", exc)
+                self.private_groups = False
+
+        if since is None:
+            changes = self.api.rooms.get()
+        else:
+            changes = self.api.rooms.get(updatedSince=since.isoformat())
+        self._add_rooms(changes.get("update", []))
+        self._remove_rooms(r["_id"] for r in changes.get("remove", []))
+        self.loaded_at = started_at
+
+    def _add_users(self, users: Iterable[dict]):
+        for user in users:
+            username = user.get("username")
+            entry = UserEntry(
+                user["_id"], username, user.get("name"), user.get("active", True)
+            )
+            with self._lock:
+                previous = self._users.get(entry.id)
+                if previous is not None and previous.username != username:
+                    self._usernames.pop(previous.username, None)
+                self._users[entry.id] = entry
+                if username is not None:
+                    self._usernames[username] = entry
+
+    def _add_rooms(self, rooms: Iterable[dict], default_type: Optional[str] = None):
+        own_username = self._own_username()
+        for room in rooms:
+            entry = RoomEntry(
+                room["_id"], room.get("name"), room.get("t", default_type)
+            )
+            with self._lock:
+                previous = self._rooms.get(entry.id)
+                if previous is not None and previous.name != entry.name:
+                    self._room_names.pop(previous.name, None)
+                self._rooms[entry.id] = entry
+                if entry.name is not None and entry.type != "d":
+                    self._room_names[entry.name] = entry
+                if entry.type == "d":
+                    for username in room.get("usernames", ()):
+                        if username != own_username:
+                            self._direct[username] = entry.id
+
+    def _remove_rooms(self, room_ids: Iterable[str]):
+        with self._lock:
+            for room_id in room_ids:
+                entry = self._rooms.pop(room_id, None)
+                if entry is None:
+                    continue
+                if self._room_names.get(entry.name) is entry:
+                    del self._room_names[entry.name]
+                if entry.type == "d":
+                    self._direct = {
+                        u: rid for u, rid in self._direct.items() if rid != room_id
+                    }
+
+    def _own_username(self) -> Optional[str]:
+        username = self.api._credentials.get("username")
+        if username is None and self.api.user_id is not None:
+            username = self.username(self.api.user_id)
+        return username
+
+    def user(
+        self, username: Optional[str] = None, user_id: Optional[str] = None
+    ) -> Optional[UserEntry]:
+        """
+        Look up a user by username or id.
+        """
+        if user_id is not None:
+            return self._users.get(user_id)
+        return self._usernames.get(username)
+
+    def user_id(self, username: str) -> Optional[str]:
+        entry = self._usernames.get(username)
+        return entry.id if entry is not None else None
+
+    def username(self, user_id: str) -> Optional[str]:
+        entry = self._users.get(user_id)
+        return entry.username if entry is not None else None
+
+    def room(
+        self, name: Optional[str] = None, room_id: Optional[str] = None
+    ) -> Optional[RoomEntry]:
+        """
+        Look up a channel or private group by name, or any room by id.
+        """
+        if room_id is not None:
+            return self._rooms.get(room_id)
+        if name is None:
+            return None
+        return self._room_names.get(name.lstrip("#"))
+
+    def room_id(self, name: str) -> Optional[str]:
+        entry = self.room(name)
+        return entry.id if entry is not None else None
+
+    def direct_room_id(self, username: str, create: bool = True) -> Optional[str]:
+        """
+        Return the id of the direct message room with ``username``.
+
+        If the room is not in the directory and ``create`` is True, it is
+        created (or fetched, if it exists) with ``im.create`` and added.
+        """
+        room_id = self._direct.get(username)
+        if room_id is not None or not create:
+            return room_id
+        room = self.api.im.create(username=username)["room"]
+        room_id = room.get("rid") or room["_id"]
+        with self._lock:
+            self._direct[username] = room_id
+            self._rooms[room_id] = RoomEntry(room_id, None, "d")
+        return room_id
+
+    def stats(self) -> dict:
+        return {
+            "users": len(self._users),
+            "rooms": len(self._rooms),
+            "direct": len(self._direct),
+            "loaded_at": self.loaded_at,
+        }
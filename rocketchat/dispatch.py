@@ -0,0 +1,262 @@
+"""Background delivery of messages through a bounded queue.
+
+``Dispatcher`` lets producers hand off ``chat.postMessage`` / ``chat.sendMessage``
+calls without waiting for the round trip.  Calls are queued and sent by a
+pool of worker threads sharing the api's pooled session.  All messages for
+the same room are sent by the same worker, so they arrive in the order they
+were queued.
+
+>>> with api.dispatcher(workers=8) as dispatcher:
+...     for alert in alerts:
+...         dispatcher.post_message(channel='#alerts', text=alert)
+>>> dispatcher.failures
+"""
+
+import inspect
+import itertools
+import logging
+import queue
+import threading
+import time
+from collections import deque, namedtuple
+from typing import TYPE_CHECKING, Any, Callable, Optional
+
+if TYPE_CHECKING:
+    from .apipath import APIPath
+
+LOG = logging.getLogger(__name__)
+
+#: A queued call that raised.  ``path`` is the api endpoint, ``kwargs`` the
+#: call arguments and ``error`` the exception.
+Failure = namedtuple("Failure", "path kwargs error")
+
+#: What to do with a new call while the queue is full.
+BLOCK = "block"
+DROP_NEW = "drop_new"
+DROP_OLDEST = "drop_oldest"
+RAISE = "raise"
+OVERFLOW_POLICIES = (BLOCK, DROP_NEW, DROP_OLDEST, RAISE)
+
+
+class Dispatcher(object):
+    """
+    Sends api calls in the background from a bounded queue.
+    """
+
+    def __init__(
+        self,
+        api,
+        workers: int = 4,
+        maxsize: int = 10000,
+        overflow: str = BLOCK,
+        block_timeout: Optional[float] = None,
+        on_error: Optional[Callable[[Failure], Any]] = None,
+        max_failures: int = 1000,
+    ):
+        """
+        Args:
+            api: The ``RocketChat`` api to send calls with.
+            workers: Number of worker threads.  Each room is served by a
+                single worker, so delivery order is kept per room.
+            maxsize: Maximum number of calls waiting to be sent.
+            overflow: What ``submit`` does while the queue is full: "block"
+                until there is room, "drop_new" to discard the new call,
+                "drop_oldest" to discard the oldest call waiting for the same
+                worker, or "raise" to raise ``queue.Full``.
+            block_timeout: Seconds to block for room in the queue before
+                raising ``queue.Full``.  None waits forever.
+            on_error: Called with a ``Failure`` when a call raises.
+            max_failures: Number of recent failures kept in ``failures``.
+        """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError("Unknown overflow policy: {}".format(overflow))
+        if workers < 1 or maxsize < 1:
+            raise ValueError("workers and maxsize must be at least 1")
+        if inspect.iscoroutinefunction(type(api.chat.postMessage).__call__):
+            raise TypeError("Dispatcher requires a RocketChat api, not an async one")
+        self.api = api
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.on_error = on_error
+        self.failures = deque(maxlen=max_failures)
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self._size = 0
+        self._unfinished = 0
+        self._closed = False
+        self._round_robin = itertools.count()
+        self._lock = threading.Lock()
+        self._not_full = threading.Condition(self._lock)
+        self._all_done = threading.Condition(self._lock)
+        self._queues = [deque() for _ in range(workers)]
+        self._ready = [threading.Condition(self._lock) for _ in range(workers)]
+        self._threads = [
+            threading.Thread(
+                target=self._work,
+                args=(i,),
+                name="rocketchat-dispatch-{}".format(i),
+                daemon=True,
+            )
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def __len__(self):
+        """
+        Number of calls waiting to be sent.
+        """
+        return self._size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def post_message(self, **kwargs) -> bool:
+        """
+        Queue a ``chat.postMessage`` call.  See ``submit``.
+        """
+        room = kwargs.get("roomId") or kwargs.get("channel")
+        return self.submit(self.api.chat.postMessage, kwargs, room=room)
+
+    def send_message(self, message: dict) -> bool:
+        """
+        Queue a ``chat.sendMessage`` call.  See ``submit``.
+        """
+        return self.submit(
+            self.api.chat.sendMessage, {"message": message}, room=message.get("rid")
+        )
+
+    def submit(self, path: "APIPath", kwargs: dict, room: Optional[str] = None) -> bool:
+        """
+        Queue an api call.
+
+        Calls with the same ``room`` are sent one at a time, in order.  Calls
+        without a room are spread over all workers.  Returns False if the
+        call was dropped because the queue is full.
+        """
+        if room is None:
+            index = next(self._round_robin) % len(self._queues)
+        else:
+            index = hash(room) % len(self._queues)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Dispatcher is closed")
+            if self._size >= self.maxsize and not self._make_room(index):
+                return False
+            self._queues[index].append((path, kwargs))
+            self._size += 1
+            self._unfinished += 1
+            self._ready[index].notify()
+        return True
+
+    def _make_room(self, index: int) -> bool:
+        """
+        Apply the overflow policy while the queue is full.  Must hold the lock.
+        """
+        if self.overflow == DROP_NEW:
+            self.dropped += 1
+            return False
+        if self.overflow == RAISE:
+            raise queue.Full
+        if self.overflow == DROP_OLDEST:
+            target = self._queues[index] or max(self._queues, key=len)
+            target.popleft()
+            self._size -= 1
+            self._unfinished -= 1
+            self.dropped += 1
+            return True
+        if not self._not_full.wait_for(
+            lambda: self._size < self.maxsize or self._closed, self.block_timeout
+        ):
+            raise queue.Full
+        if self._closed:
+            raise RuntimeError("Dispatcher is closed")
+        return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every queued call has been sent.  Returns False if
+        ``timeout`` expired first.
+        """
+        with self._lock:
+            return self._all_done.wait_for(lambda: self._unfinished == 0, timeout)
+
+    def close(self, wait: bool = True, timeout: Optional[float] = None):
+        """
+        Stop accepting calls and shut down the workers.
+
+        Args:
+            wait: Send the calls still in the queue before stopping.  If False
+                they are discarded.
+            timeout: Maximum seconds to wait for the queue to drain.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            self._closed = True
+            if not wait:
+                for q in self._queues:
+                    self.dropped += len(q)
+                    self._unfinished -= len(q)
+                    q.clear()
+                self._size = 0
+            self._not_full.notify_all()
+            for ready in self._ready:
+                ready.notify()
+            self._all_done.notify_all()
+        for thread in self._threads:
+            remaining = None
+            if deadline is not None:
+                remaining = max(0.0, deadline - time.monotonic())
+            thread.join(remaining)
+
+    def _work(self, index: int):
+        q = self._queues[index]
+        ready = self._ready[index]
+        while True:
+            with self._lock:
+                ready.wait_for(lambda: q or self._closed)
+                if not q:
+                    return
+                path, kwargs = q.popleft()
+                self._size -= 1
+                self._not_full.notify()
+            failure = None
+            try:
+                result = path(**kwargs)
+                if inspect.iscoroutine(result):
+                    result.close()
+                    raise TypeError("Cannot dispatch async call to {}".format(path))
+            except Exception as exc:
+                LOG.warning("Dispatched call to %s failed: %s", path, exc)
+                failure = Failure(path, kwargs, exc)
+                if self.on_error is not None:
+                    try:
+                        self.on_error(failure)
+                    except Exception:
+                        LOG.exception("Error in dispatcher on_error callback")
+            with self._lock:
+                if failure is None:
+                    self.sent += 1
+                else:
+                    self.failed += 1
+                    self.failures.append(failure)
+                self._unfinished -= 1
+                if self._unfinished == 0:
+                    self._all_done.notify_all()
+
+    def stats(self) -> dict:
+        """
+        Return counts of queued, sent, failed and dropped calls.
+        """
+        with self._lock:
+            return {
+                "queued": self._size,
+                "sent": self.sent,
+                "failed": self.failed,
+                "dropped": self.dropped,
+            }
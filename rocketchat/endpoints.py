@@ -0,0 +1,323 @@
+"""Declarative table of the RocketChat REST API endpoints.
+
+``ENDPOINTS`` maps the python attribute path of each endpoint (e.g.
+``channels.list.joined``) to the ``Endpoint`` spec used to build its
+``APIPath``.  The table is compiled into a tree once, at import time, and
+``APIPath`` objects are only created when an endpoint is first accessed.
+"""
+from collections import namedtuple
+from typing import Dict, Optional, Tuple
+
+_EndpointBase = namedtuple(
+    "_EndpointBase",
+    "path method arg_endpoint result_key auth api_root items_key cursor upload",
+)
+
+
+class Endpoint(_EndpointBase):
+    """
+    Spec for a single api endpoint.  Fields match the ``APIPath`` arguments.
+    """
+
+    __slots__ = ()
+
+    def __new__(
+        cls,
+        path: str,
+        method: Optional[str] = "GET",
+        arg_endpoint: bool = False,
+        result_key: Optional[str] = None,
+        auth: bool = True,
+        api_root: str = "/api/v1/",
+        items_key: Optional[str] = None,
+        cursor: Optional[str] = None,
+        upload: Optional[str] = None,
+    ):
+        return super(Endpoint, cls).__new__(
+            cls,
+            path,
+            method,
+            arg_endpoint,
+            result_key,
+            auth,
+            api_root,
+            items_key,
+            cursor,
+            upload,
+        )
+
+
+#: Tree node: the endpoint spec and the nodes of its children by attribute name.
+Node = Tuple[Endpoint, Dict[str, "Node"]]
+
+# fmt:off
+ENDPOINTS = {
+    "me": Endpoint("me"),
+    "info": Endpoint("info", result_key="info", auth=False, api_root="/api/"),
+    "directory": Endpoint("directory", items_key="result"),
+    "spotlight": Endpoint("spotlight"),
+    "statistics": Endpoint("statistics"),
+    "statistics.list": Endpoint("statistics.list"),
+
+    "assets": Endpoint("assets", None),
+    "assets.setAsset": Endpoint("assets.setAsset", "POST", result_key="success"),
+    "assets.unsetAsset": Endpoint("assets.unsetAsset", "POST", result_key="success"),
+
+    "autotranslate": Endpoint("autotranslate", None),
+    "autotranslate.getSupportedLanguages": Endpoint("autotranslate.getSupportedLanguages", result_key="languages"),
+    "autotranslate.saveSettings": Endpoint("autotranslate.saveSettings", "POST", result_key="success"),
+    "autotranslate.translateMessage": Endpoint("autotranslate.translateMessage", "POST", result_key="message"),
+
+    "logout": Endpoint("logout", "POST"),
+
+    "users": Endpoint("users", None),
+    "users.presence": Endpoint("users.presence"),
+    "users.create": Endpoint("users.create", "POST", result_key="user"),
+    "users.createToken": Endpoint("users.createToken", "POST", result_key="data"),
+    "users.delete": Endpoint("users.delete", "POST", result_key="success"),
+    "users.deleteOwnAccount": Endpoint("users.deleteOwnAccount", "POST"),
+    "users.forgotPassword": Endpoint("users.forgotPassword", "POST"),
+    "users.generatePersonalAccessToken": Endpoint("users.generatePersonalAccessToken", "POST"),
+    "users.getAvatar": Endpoint("users.getAvatar", "GET"),
+    "users.getPersonalAccessTokens": Endpoint("users.getPersonalAccessTokens", "GET"),
+    "users.getPreferences": Endpoint("users.getPreferences", "GET"),
+    "users.getPresence": Endpoint("users.getPresence", "GET", result_key="presence"),
+    "users.getUsernameSuggestion": Endpoint("users.getUsernameSuggestion", "GET"),
+    "users.info": Endpoint("users.info", "GET", result_key="user"),
+    "users.list": Endpoint("users.list", "GET", items_key="users"),
+    "users.regeneratePersonalAccessToken": Endpoint("users.regeneratePersonalAccessToken", "POST"),
+    "users.register": Endpoint("users.register", "POST", result_key="user"),
+    "users.removePersonalAccessToken": Endpoint("users.removePersonalAccessToken", "POST"),
+    "users.requestDataDownload": Endpoint("users.requestDataDownload"),
+    "users.resetAvatar": Endpoint("users.resetAvatar", "POST", result_key="success"),
+    "users.setAvatar": Endpoint("users.setAvatar", "POST", result_key="success", upload="image"),
+    "users.setPreferences": Endpoint("users.setPreferences", "POST"),
+    "users.setActiveStatus": Endpoint("users.setActiveStatus", "POST"),
+    "users.update": Endpoint("users.update", "POST", result_key="user"),
+    "users.updateOwnBasicInfo": Endpoint("users.updateOwnBasicInfo", "POST"),
+
+    "channels": Endpoint("channels", None),
+    "channels.addAll": Endpoint("channels.addAll", "POST", result_key="channel"),
+    "channels.addLeader": Endpoint("channels.addLeader", "POST"),
+    "channels.anonymousread": Endpoint("channels.anonymousread"),
+    "channels.archive": Endpoint("channels.archive", "POST", result_key="success"),
+    "channels.cleanHistory": Endpoint("channels.cleanHistory", "POST", result_key="success"),
+    "channels.close": Endpoint("channels.close", "POST", result_key="success"),
+    "channels.counters": Endpoint("channels.counters"),
+    "channels.create": Endpoint("channels.create", "POST", result_key="channel"),
+    "channels.delete": Endpoint("channels.delete", "POST"),
+    "channels.files": Endpoint("channels.files", items_key="files"),
+    "channels.getAllUserMentionsByChannel": Endpoint("channels.getAllUserMentionsByChannel"),
+    "channels.getIntegrations": Endpoint("channels.getIntegrations", "GET", result_key="integrations"),
+    "channels.history": Endpoint("channels.history", "GET", result_key="messages", cursor="ts"),
+    "channels.info": Endpoint("channels.info", "GET", result_key="channel"),
+    "channels.invite": Endpoint("channels.invite", "POST", result_key="channel"),
+    "channels.join": Endpoint("channels.join", "POST"),
+    "channels.kick": Endpoint("channels.kick", "POST", result_key="channel"),
+    "channels.leave": Endpoint("channels.leave", "POST", result_key="channel"),
+    "channels.list": Endpoint("channels.list", "GET", result_key="channels"),
+    "channels.list.joined": Endpoint("channels.list.joined", "GET", result_key="channels"),
+    "channels.members": Endpoint("channels.members", items_key="members"),
+    "channels.messages": Endpoint("channels.mesages", items_key="messages"),
+    "channels.moderators": Endpoint("channels.moderators"),
+    "channels.online": Endpoint("channels.online"),
+    "channels.open": Endpoint("channels.open", "POST", result_key="success"),
+    "channels.removeLeader": Endpoint("channels.removeLeader", "POST"),
+    "channels.rename": Endpoint("channels.rename", "POST", result_key="channel"),
+    "channels.roles": Endpoint("channels.roles"),
+    "channels.setCustomFields": Endpoint("channels.setCustomFields", "POST"),
+    "channels.setAnnouncement": Endpoint("channels.setAnnouncement", "POST"),
+    "channels.setDefault": Endpoint("channels.setDefault", "POST"),
+    "channels.setDescription": Endpoint("channels.setDescription", "POST", result_key="description"),
+    "channels.setJoinCode": Endpoint("channels.setJoinCode", "POST", result_key="channel"),
+    "channels.setPurpose": Endpoint("channels.setPurpose", "POST", result_key="purpose"),
+    "channels.setReadOnly": Endpoint("channels.setReadOnly", "POST", result_key="channel"),
+    "channels.setTopic": Endpoint("channels.setTopic", "POST", result_key="topic"),
+    "channels.setType": Endpoint("channels.setType", "POST", result_key="channel"),
+    "channels.unarchive": Endpoint("channels.unarchive", "POST", result_key="success"),
+
+    "groups": Endpoint("groups", None),
+    "groups.archive": Endpoint("groups.archive", "POST"),
+    "groups.addLeader": Endpoint("groups.addLeader", "POST"),
+    "groups.close": Endpoint("groups.close", "POST"),
+    "groups.create": Endpoint("groups.create", "POST"),
+    "groups.delete": Endpoint("groups.delete", "POST"),
+    "groups.files": Endpoint("groups.files", "POST"),
+    "groups.history": Endpoint("groups.history", "GET", items_key="messages", cursor="ts"),
+    "groups.info": Endpoint("groups.info", "GET"),
+    "groups.invite": Endpoint("groups.invite", "POST"),
+    "groups.kick": Endpoint("groups.kick", "POST"),
+    "groups.leave": Endpoint("groups.leave", "POST"),
+    "groups.list": Endpoint("groups.list", "GET", items_key="groups"),
+    "groups.listAll": Endpoint("groups.listAll", items_key="groups"),
+    "groups.members": Endpoint("groups.members", items_key="members"),
+    "groups.messages": Endpoint("groups.messages", items_key="messages"),
+    "groups.moderators": Endpoint("groups.moderators"),
+    "groups.open": Endpoint("groups.open", "POST"),
+    "groups.removeLeader": Endpoint("groups.removeLeader", "POST"),
+    "groups.rename": Endpoint("groups.rename", "POST"),
+    "groups.roles": Endpoint("groups.roles"),
+    "groups.setAnnouncement": Endpoint("groups.setAnnouncement", "POST"),
+    "groups.setCustomFields": Endpoint("groups.setCustomFields", "POST"),
+    "groups.setDescription": Endpoint("groups.setDescription", "POST"),
+    "groups.setPurpose": Endpoint("groups.setPurpose", "POST"),
+    "groups.setReadOnly": Endpoint("groups.setReadOnly", "POST"),
+    "groups.setTopic": Endpoint("groups.setTopic", "POST"),
+    "groups.setType": Endpoint("groups.setType", "POST", result_key="group"),
+    "groups.unarchive": Endpoint("groups.unarchive", "POST"),
+
+    "chat": Endpoint("chat", None),
+    "chat.delete": Endpoint("chat.delete", "POST"),
+    "chat.followMessage": Endpoint("chat.followMessage", "POST"),
+    "chat.getDeletedMessages": Endpoint("chat.getDeletedMessages", items_key="messages"),
+    "chat.getDiscussions": Endpoint("chat.getDiscussions", items_key="messages"),
+    "chat.getMentionedMessages": Endpoint("chat.getMentionedMessages", items_key="messages"),
+    "chat.getMessage": Endpoint("chat.getMessage", "POST"),
+    "chat.getMessageReadReceipts": Endpoint("chat.getMessageReadReceipts"),
+    "chat.getPinnedMessages": Endpoint("chat.getPinnedMessages", items_key="messages"),
+    "chat.getSnippetedMessages": Endpoint("chat.getSnippetedMessages"),
+    "chat.getSnippetedMessageById": Endpoint("chat.getSnippetedMessageById"),
+    "chat.getStarredMessages": Endpoint("chat.getStarredMessages", items_key="messages"),
+    "chat.getThreadsList": Endpoint("chat.getThreadsList", items_key="threads"),
+    "chat.ignoreUser": Endpoint("chat.ignoreUser"),
+    "chat.pinMessage": Endpoint("chat.pinMessage", "POST"),
+    "chat.postMessage": Endpoint("chat.postMessage", "POST"),
+    "chat.react": Endpoint("chat.react", "POST"),
+    "chat.reportMessage": Endpoint("chat.reportMessage", "POST"),
+    "chat.search": Endpoint("chat.search", "POST"),
+    "chat.starMessage": Endpoint("chat.starMessage", "POST"),
+    "chat.sendMessage": Endpoint("chat.sendMessage", "POST"),
+    "chat.syncMessages": Endpoint("chat.syncMessages", result_key="result"),
+    "chat.syncThreadMessages": Endpoint("chat.syncThreadMessages", "POST"),
+    "chat.syncThreadsList": Endpoint("chat.syncThreadsList", "POST"),
+    "chat.unfollowMessage": Endpoint("chat.unfollowMessage", "POST"),
+    "chat.unPinMessage": Endpoint("chat.unPinMessage", "POST"),
+    "chat.unStarMessage": Endpoint("chat.unStarMessage", "POST"),
+    "chat.update": Endpoint("chat.update", "POST"),
+
+    "custom_sounds": Endpoint("custom-sounds", None),
+    "custom_sounds.list": Endpoint("custom-sounds.list", items_key="sounds"),
+
+    "im": Endpoint("im"),
+    "im.close": Endpoint("im.close", "POST"),
+    "im.counters": Endpoint("im.counters"),
+    "im.create": Endpoint("im.create", "POST"),
+    "im.history": Endpoint("im.history", "GET", items_key="messages", cursor="ts"),
+    "im.files": Endpoint("im.files", items_key="files"),
+    "im.members": Endpoint("im.members", items_key="members"),
+    "im.messages": Endpoint("im.messages", items_key="messages"),
+    "im.messages.others": Endpoint("im.messages.others", "GET", items_key="messages"),
+    "im.list": Endpoint("im.list", "GET", items_key="ims"),
+    "im.list.everyone": Endpoint("im.list.everyone", "GET", items_key="ims"),
+    "im.open": Endpoint("im.open", "POST"),
+    "im.setTopic": Endpoint("im.setTopic", "POST"),
+
+    "integrations": Endpoint("integrations", None),
+    "integrations.create": Endpoint("integrations.create", "POST"),
+    "integrations.get": Endpoint("integrations.get"),
+    "integrations.history": Endpoint("integrations.history", items_key="history"),
+    "integrations.list": Endpoint("integrations.list", items_key="integrations"),
+    "integrations.remove": Endpoint("integrations.remove", "POST"),
+
+    "findOrCreateInvite": Endpoint("findOrCreateInvite", "POST"),
+    "listInvites": Endpoint("listInvites"),
+    "removeInvite": Endpoint("removeInvite", "POST"),
+    "useInviteToken": Endpoint("useInviteToken", "POST"),
+    "validateInviteToken": Endpoint("validateInviteToken", "POST"),
+
+    "livechat": Endpoint("livechat", None),
+    "livechat.inquiries": Endpoint("livechat/inquiries", None),
+    "livechat.inquiries.list": Endpoint("livechat/inquiries.list", items_key="inquiries"),
+    "livechat.inquiries.take": Endpoint("livechat/inquiries.take", "POST"),
+    "livechat.rooms": Endpoint("livechat/rooms", items_key="rooms"),
+
+    "oauth_apps": Endpoint("oauth-apps", None),
+    "oauth_apps.get": Endpoint("oauth-apps.get"),
+    "oauth_apps.list": Endpoint("oauth-apps.list"),
+
+    "permissions": Endpoint("permissions", None),
+    "permissions.listAll": Endpoint("permissions.listAll"),
+    "permissions.update": Endpoint("permissions.update", "POST"),
+
+    "roles": Endpoint("roles", None),
+    "roles.create": Endpoint("roles.create", "POST"),
+    "roles.list": Endpoint("roles.list"),
+    "roles.addUserToRole": Endpoint("roles.addUserToRole", "POST"),
+    "roles.getUsersInRole": Endpoint("roles.getUsersInRole", items_key="users"),
+
+    "push": Endpoint("push", None),
+    "push.token": Endpoint("push.token", None),
+    "push.token.save": Endpoint("push.token", "POST"),
+    "push.token.delete": Endpoint("push.token", "DELETE"),
+
+    "rooms": Endpoint("rooms", None),
+    "rooms.adminRooms": Endpoint("rooms.adminRooms", items_key="rooms"),
+    "rooms.cleanHistory": Endpoint("rooms.cleanHistory", "POST"),
+    "rooms.createDiscussion": Endpoint("rooms.createDiscussion", "POST"),
+    "rooms.favorite": Endpoint("rooms.favorite", "POST"),
+    "rooms.get": Endpoint("rooms.get"),
+    "rooms.getDiscussions": Endpoint("rooms.getDiscussions", items_key="discussions"),
+    "rooms.info": Endpoint("rooms.info"),
+    "rooms.leave": Endpoint("rooms.leave", "POST"),
+    "rooms.saveNotification": Endpoint("rooms.saveNotification", "POST"),
+    "rooms.upload": Endpoint("rooms.upload", "POST", arg_endpoint=True, upload="file"),
+
+    "commands": Endpoint("commands"),
+    "commands.get": Endpoint("commands.get", "GET"),
+    "commands.list": Endpoint("commands.list", "GET"),
+    "commands.run": Endpoint("commands.run", "POST"),
+
+    "custom_user_status": Endpoint("custom-user-status", None),
+    "custom_user_status.list": Endpoint("custom-user-status.list", items_key="statuses"),
+
+    "emoji_custom": Endpoint("emoji-custom", None),
+    "emoji_custom.list": Endpoint("emoji-custom.list"),
+    "emoji_custom.create": Endpoint("emoji-custom.create", "POST", upload="emoji"),
+    "emoji_custom.delete": Endpoint("emoji-custom.delete", "POST"),
+    "emoji_custom.update": Endpoint("emoji-custom.update", "POST"),
+
+    "settings": Endpoint("settings", None),
+    "settings.public": Endpoint("settings.public"),
+    "settings.oauth": Endpoint("settings.oauth"),
+    "settings.get": Endpoint("settings", "GET", arg_endpoint=True),
+    "settings.set": Endpoint("settings", "POST", arg_endpoint=True),
+
+    "service": Endpoint("service", None),
+    "service.configurations": Endpoint("service.configurations"),
+
+    "subscriptions": Endpoint("subscriptions", None),
+    "subscriptions.get": Endpoint("subscriptions.get"),
+    "subscriptions.getOne": Endpoint("subscriptions.getOne"),
+    "subscriptions.read": Endpoint("subscriptions.read", "POST"),
+    "subscriptions.unread": Endpoint("subscriptions.unread", "POST"),
+
+    "video_conference": Endpoint("video-conference", None),
+    "video_conference.jitsi": Endpoint("video-conference/jitsi", None),
+    "video_conference.jitsi.update_timeout": Endpoint("video-conference/jitsi.update-timeout", "POST"),
+
+    "webdav": Endpoint("webdav", None),
+    "webdav.getMyAccounts": Endpoint("webdav.getMyAccounts"),
+}
+# fmt:on
+
+#: Alternate attribute names for top level endpoints.
+ALIASES = {
+    "dm": "im",
+}
+
+
+def build_tree(endpoints: Dict[str, Endpoint]) -> Dict[str, Node]:
+    """
+    Compile a flat ``{attribute path: Endpoint}`` table into a tree of nodes.
+    """
+    tree = {}
+    for name, spec in endpoints.items():
+        *parents, attr = name.split(".")
+        children = tree
+        for parent in parents:
+            children = children[parent][1]
+        children[attr] = (spec, {})
+    return tree
+
+
+ENDPOINT_TREE = build_tree(ENDPOINTS)
@@ -7,3 +7,30 @@ class RocketChatError(Exception):
         super(RocketChatError, self).__init__(error)
         self.errorType = errorType
         self.error = error
+
+
+class RateLimitError(RocketChatError):
+    """
+    Error raised if a Rocketchat api call is rejected by the server's rate limit.
+    """
+    def __init__(self, error, retry_after=None):
+        super(RateLimitError, self).__init__("error-too-many-requests", error)
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(RocketChatError):
+    """
+    Error raised if a call cannot complete before the current deadline.
+    """
+    def __init__(self, error="Deadline exceeded"):
+        super(DeadlineExceeded, self).__init__("error-deadline-exceeded", error)
+
+
+class CircuitOpenError(RocketChatError):
+    """
+    Error raised without sending the call while the server's circuit breaker
+    is open.
+    """
+    def __init__(self, error, retry_after=None):
+        super(CircuitOpenError, self).__init__("error-circuit-open", error)
+        self.retry_after = retry_after
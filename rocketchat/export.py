@@ -0,0 +1,261 @@
+"""Bulk export of room histories to compressed NDJSON files.
+
+Each room is written to ``<dest>/<type>-<room id>.ndjson.gz``, one message per
+line, newest first.  Rooms are exported concurrently and each history page is
+written as soon as it arrives, so memory use does not grow with room size.
+
+Every page is written as a separate gzip member, and the progress of a room is
+recorded next to it in ``<file>.state`` after each page.  An interrupted export
+resumes where it stopped when run again with the same destination; rooms whose
+file exists without a state file are complete and are skipped.
+
+>>> exporter = RoomExporter(api, 'export', oldest='2020-01-01T00:00:00.000Z')
+>>> stats = exporter.export(exporter.rooms())
+"""
+
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+from typing import TYPE_CHECKING, Iterable, List, Optional, Sequence, Union
+
+from .sync import HISTORY_PATHS, _timestamp
+
+if TYPE_CHECKING:
+    from .rocketchat import RocketChat
+
+LOG = logging.getLogger(__name__)
+
+#: A room to export.
+ExportRoom = namedtuple("ExportRoom", "id type name")
+
+#: Progress of a partially exported room: size of the file up to the last
+#: complete page, and the timestamp and ids of the oldest messages written.
+ExportState = namedtuple("ExportState", "offset cursor cursor_ids messages")
+
+#: Messages and compressed bytes written for a room by an export run.
+RoomResult = namedtuple("RoomResult", "room_id messages bytes skipped")
+
+
+class ExportStats(object):
+    """
+    Totals of an export run, updated while rooms are exported.
+    """
+
+    __slots__ = ("rooms", "skipped", "failed", "messages", "bytes", "started", "_lock")
+
+    def __init__(self):
+        self.rooms = 0
+        self.skipped = 0
+        self.failed = 0
+        self.messages = 0
+        self.bytes = 0
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add(self, messages: int, nbytes: int):
+        with self._lock:
+            self.messages += messages
+            self.bytes += nbytes
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def summary(self) -> str:
+        elapsed = max(self.elapsed, 1e-9)
+        return (
+            "{} rooms ({} skipped, {} failed), {} messages, {:.1f} MB in {:.1f}s: "
+            "{:.0f} messages/s, {:.2f} MB/s".format(
+                self.rooms,
+                self.skipped,
+                self.failed,
+                self.messages,
+                self.bytes / 1e6,
+                elapsed,
+                self.messages / elapsed,
+                self.bytes / 1e6 / elapsed,
+            )
+        )
+
+
+def _read_state(path: str) -> Optional[ExportState]:
+    try:
+        with open(path) as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return None
+    return ExportState(
+        state["offset"], state["cursor"], set(state["cursor_ids"]), state["messages"]
+    )
+
+
+def _write_state(path: str, state: ExportState):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(dict(state._asdict(), cursor_ids=sorted(state.cursor_ids)), f)
+    os.replace(tmp, path)
+
+
+class RoomExporter(object):
+    """
+    Exports room histories to a directory of gzipped NDJSON files.
+    """
+
+    def __init__(
+        self,
+        api: "RocketChat",
+        dest: str,
+        oldest: Optional[str] = None,
+        latest: Optional[str] = None,
+        fields: Optional[Sequence[str]] = None,
+        page_size: int = 500,
+        max_workers: int = 4,
+        compresslevel: int = 6,
+    ):
+        """
+        Args:
+            api: The api to read history from.
+            dest: Directory the files are written to.  It is created if needed.
+            oldest: Only export messages sent at or after this ISO timestamp.
+            latest: Only export messages sent at or before this ISO timestamp.
+            fields: Message fields to keep (e.g. ``["_id", "ts", "u", "msg"]``).
+                Every field is kept by default.
+            page_size: Number of messages requested per history page.  Each
+                page is one gzip member and one resume point.
+            max_workers: Number of rooms exported at the same time.
+            compresslevel: gzip compression level, 1 (fastest) to 9.
+        """
+        self.api = api
+        self.dest = dest
+        self.oldest = oldest
+        self.latest = latest
+        self.fields = tuple(fields) if fields else None
+        self.page_size = page_size
+        self.max_workers = max_workers
+        self.compresslevel = compresslevel
+        self.stats = ExportStats()
+
+    def rooms(
+        self, types: Iterable[str] = ("c", "p", "d"), all_rooms: bool = False
+    ) -> List[ExportRoom]:
+        """
+        List the rooms to export.
+
+        Args:
+            types: Room types to include: c (channels), p (private groups)
+                and d (direct messages).
+            all_rooms: List every room on the server with
+                ``rooms.adminRooms`` (needs the view-room-administration
+                permission) instead of the rooms the user belongs to.
+        """
+        types = [t for t in types if t in HISTORY_PATHS]
+        if all_rooms:
+            rooms = self.api.rooms.adminRooms.iter(
+                page_size=self.page_size, types=types
+            )
+        else:
+            rooms = self.api.rooms.get()["update"]
+        return [
+            ExportRoom(r["_id"], r["t"], r.get("name") or r.get("fname"))
+            for r in rooms
+            if r.get("t") in types
+        ]
+
+    def path(self, room: ExportRoom) -> str:
+        return os.path.join(self.dest, "{}-{}.ndjson.gz".format(room.type, room.id))
+
+    def _project(self, message: dict) -> dict:
+        if self.fields is None:
+            return message
+        return {k: message[k] for k in self.fields if k in message}
+
+    def _encode(self, messages: List[dict]) -> bytes:
+        dumps = self.api.codec.dumps
+        lines = []
+        for message in messages:
+            line = dumps(self._project(message))
+            if isinstance(line, str):
+                line = line.encode("utf-8")
+            lines.append(line)
+        lines.append(b"")
+        return b"\n".join(lines)
+
+    def export_room(self, room: Union[ExportRoom, tuple]) -> RoomResult:
+        """
+        Export (or resume exporting) the history of a single room.
+        """
+        room = ExportRoom(*room)
+        os.makedirs(self.dest, exist_ok=True)
+        path = self.path(room)
+        state_path = path + ".state"
+        state = _read_state(state_path)
+        if state is None and os.path.exists(path):
+            return RoomResult(room.id, 0, 0, True)
+        if state is None:
+            state = ExportState(0, None, set(), 0)
+            _write_state(state_path, state)
+
+        params = {"roomId": room.id, "inclusive": "true"}
+        if self.oldest is not None:
+            params["oldest"] = self.oldest
+        latest = state.cursor or self.latest
+        if latest is not None:
+            params["latest"] = latest
+        history = getattr(self.api, HISTORY_PATHS[room.type]).history
+
+        messages = nbytes = 0
+        with open(path, "ab") as f:
+            # Drop a page left incomplete by an interrupted run.
+            f.truncate(state.offset)
+            f.seek(state.offset)
+            page = []
+            for message in history.iter(page_size=self.page_size, **params):
+                if message["_id"] in state.cursor_ids:
+                    continue
+                page.append(message)
+                if len(page) >= self.page_size:
+                    state = self._write_page(f, state_path, state, page)
+                    messages += len(page)
+                    page = []
+            if page:
+                state = self._write_page(f, state_path, state, page)
+                messages += len(page)
+            nbytes = f.tell()
+        if os.path.exists(state_path):
+            os.remove(state_path)
+        return RoomResult(room.id, messages, nbytes, False)
+
+    def _write_page(self, f, state_path: str, state: ExportState, page: List[dict]):
+        start = f.tell()
+        f.write(gzip.compress(self._encode(page), self.compresslevel))
+        f.flush()
+        cursor = _timestamp(page[-1]["ts"])
+        ids = {m["_id"] for m in page if _timestamp(m["ts"]) == cursor}
+        if cursor == state.cursor:
+            ids |= state.cursor_ids
+        state = ExportState(f.tell(), cursor, ids, state.messages + len(page))
+        _write_state(state_path, state)
+        self.stats.add(len(page), f.tell() - start)
+        return state
+
+    def export(self, rooms: Iterable[Union[ExportRoom, tuple]]) -> List:
+        """
+        Export many rooms concurrently.
+
+        Returns a ``RoomResult`` per room, in order, or the exception raised
+        while exporting it.
+        """
+        calls = [(self.export_room, (room,), {}) for room in rooms]
+        results = self.api.batch(calls, max_workers=self.max_workers).results()
+        for result in results:
+            if isinstance(result, Exception):
+                LOG.error("Room export failed: %s", result)
+                self.stats.failed += 1
+            elif result.skipped:
+                self.stats.skipped += 1
+            self.stats.rooms += 1
+        return results
@@ -0,0 +1,245 @@
+"""Streaming multipart uploads and chunked downloads.
+
+Upload bodies are read from files, file objects or memory-mapped files a chunk
+at a time while they are sent, so payloads are never copied into memory.
+Downloads are streamed straight to disk.
+"""
+
+import io
+import mimetypes
+import os
+from typing import IO, Any, Callable, Dict, List, Optional, Union
+
+#: Called with ``(bytes_done, bytes_total)`` as a transfer progresses.
+#: ``bytes_total`` is None if the size is not known.
+Progress = Callable[[int, Optional[int]], Any]
+
+CHUNK_SIZE = 64 * 1024
+
+
+def _file_size(fileobj) -> int:
+    if hasattr(fileobj, "__len__"):
+        return len(fileobj) - fileobj.tell()
+    try:
+        return os.fstat(fileobj.fileno()).st_size - fileobj.tell()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        pos = fileobj.tell()
+        end = fileobj.seek(0, io.SEEK_END)
+        fileobj.seek(pos)
+        return end - pos
+
+
+class _Part(object):
+    __slots__ = ("header", "fileobj", "data", "start", "size")
+
+    def __init__(self, header: bytes, fileobj=None, data: bytes = b""):
+        self.header = header
+        self.fileobj = fileobj
+        self.data = data
+        self.start = fileobj.tell() if fileobj is not None else 0
+        self.size = _file_size(fileobj) if fileobj is not None else len(data)
+
+
+class MultipartEncoder(io.RawIOBase):
+    """
+    Streaming ``multipart/form-data`` request body.
+
+    Behaves as a readable, seekable file of known length, so it can be passed
+    as ``data`` to ``requests`` (which then streams it with a Content-Length
+    header) and be rewound to retry a request.
+    """
+
+    def __init__(
+        self,
+        fields: Dict[str, Any],
+        files: Dict[str, tuple],
+        progress: Optional[Progress] = None,
+        boundary: Optional[str] = None,
+        owned_files: Optional[List[IO]] = None,
+    ):
+        """
+        Args:
+            fields: Form fields.  Values are sent as strings.
+            files: ``{field: (filename, fileobj, content_type)}``.  ``fileobj``
+                is read from its current position.
+            progress: Called with ``(bytes_sent, total)`` as the body is read.
+            owned_files: Files to close when the encoder is closed.
+        """
+        super(MultipartEncoder, self).__init__()
+        self._owned_files = owned_files or []
+        self.boundary = boundary or os.urandom(16).hex()
+        self.content_type = "multipart/form-data; boundary={}".format(self.boundary)
+        self.progress = progress
+        self._parts = []  # type: List[_Part]
+        for name, value in fields.items():
+            header = self._header(name)
+            self._parts.append(_Part(header, data=str(value).encode("utf-8")))
+        for name, (filename, fileobj, content_type) in files.items():
+            header = self._header(name, filename, content_type)
+            self._parts.append(_Part(header, fileobj=fileobj))
+        self._closing = "--{}--\r\n".format(self.boundary).encode("ascii")
+        self.len = sum(len(p.header) + p.size + 2 for p in self._parts) + len(
+            self._closing
+        )
+        self._pos = 0
+
+    def _header(self, name: str, filename: Optional[str] = None, content_type=None):
+        disposition = 'form-data; name="{}"'.format(name)
+        if filename is not None:
+            disposition += '; filename="{}"'.format(filename.replace('"', "%22"))
+        lines = ["--" + self.boundary, "Content-Disposition: " + disposition]
+        if content_type is not None:
+            lines.append("Content-Type: " + content_type)
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("utf-8")
+
+    def __len__(self):
+        return self.len
+
+    def close(self):
+        for f in self._owned_files:
+            f.close()
+        self._owned_files = []
+        super(MultipartEncoder, self).close()
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += self.len
+        self._pos = max(0, min(offset, self.len))
+        return self._pos
+
+    def _read_span(self, size: int) -> bytes:
+        """
+        Read up to ``size`` bytes from the segment that contains the position.
+        """
+        pos = self._pos
+        for part in self._parts:
+            if pos < len(part.header):
+                return part.header[pos : pos + size]
+            pos -= len(part.header)
+            if pos < part.size:
+                size = min(size, part.size - pos)
+                if part.fileobj is None:
+                    return part.data[pos : pos + size]
+                part.fileobj.seek(part.start + pos)
+                return part.fileobj.read(size)
+            pos -= part.size
+            if pos < 2:
+                return b"\r\n"[pos : pos + size]
+            pos -= 2
+        return self._closing[pos : pos + size]
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = self.len - self._pos
+        chunks = []
+        while size > 0 and self._pos < self.len:
+            chunk = self._read_span(size)
+            if not chunk:
+                raise IOError("File shrank while it was being uploaded")
+            chunks.append(chunk)
+            self._pos += len(chunk)
+            size -= len(chunk)
+        if self.progress is not None and chunks:
+            self.progress(self._pos, self.len)
+        return b"".join(chunks)
+
+    def readinto(self, buffer) -> int:
+        data = self.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
+
+def multipart_body(
+    kwargs: dict, upload: str, progress: Optional[Progress] = None
+) -> MultipartEncoder:
+    """
+    Build the streaming body for an upload api call.
+
+    ``kwargs[upload]`` is the file to upload (see ``open_upload``), every other
+    keyword argument is sent as a form field.
+    """
+    fields = dict(kwargs)
+    try:
+        value = fields.pop(upload)
+    except KeyError:
+        raise TypeError("Missing file argument: {}".format(upload)) from None
+    filename, fileobj, content_type, opened = open_upload(value)
+    return MultipartEncoder(
+        {k: v for k, v in fields.items() if v is not None},
+        {upload: (filename, fileobj, content_type)},
+        progress=progress,
+        owned_files=[fileobj] if opened else None,
+    )
+
+
+def open_upload(value, name: Optional[str] = None) -> tuple:
+    """
+    Normalize an upload value to ``(filename, fileobj, content_type, opened)``.
+
+    ``value`` is a file path, a binary file object, a memory-mapped file or a
+    ``(filename, fileobj[, content_type])`` tuple.  ``opened`` is True if the
+    file was opened here and must be closed by the caller.
+    """
+    content_type = None
+    opened = False
+    if isinstance(value, tuple):
+        filename, fileobj = value[0], value[1]
+        if len(value) > 2:
+            content_type = value[2]
+    elif isinstance(value, (str, os.PathLike)):
+        filename = os.path.basename(os.fspath(value))
+        fileobj = open(value, "rb")
+        opened = True
+    else:
+        fileobj = value
+        filename = name or os.path.basename(getattr(value, "name", "") or "upload")
+    if content_type is None:
+        content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    return filename, fileobj, content_type, opened
+
+
+def stream_to(
+    response,
+    dest: Union[str, os.PathLike, IO[bytes]],
+    chunk_size: int = CHUNK_SIZE,
+    progress: Optional[Progress] = None,
+) -> int:
+    """
+    Write a streamed ``requests`` response body to ``dest`` a chunk at a time.
+
+    If ``dest`` is a path, the body is written to a temporary file next to it
+    that is renamed into place once the download completes.  Returns the
+    number of bytes written.
+    """
+    total = response.headers.get("Content-Length")
+    total = int(total) if total is not None else None
+    written = 0
+    if isinstance(dest, (str, os.PathLike)):
+        tmp = os.fspath(dest) + ".part"
+        try:
+            with open(tmp, "wb") as f:
+                written = stream_to(response, f, chunk_size, progress)
+            os.replace(tmp, dest)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        return written
+
+    for chunk in response.iter_content(chunk_size):
+        dest.write(chunk)
+        written += len(chunk)
+        if progress is not None:
+            progress(written, total)
+    return written
@@ -0,0 +1,220 @@
+"""Hedged requests for read-only calls.
+
+When a GET call takes longer than a high percentile of its endpoint's recent
+latencies, a second, identical request is sent and whichever response
+arrives first is used.  This trims the tail latency caused by a slow server
+node or a lost packet, for a small number of extra requests:
+
+>>> api = RocketChat(url, username, password, hedging=Hedging(percentile=0.95))
+>>> api.hedging.stats()
+{'calls': 1000, 'hedged': 48, 'hedge_wins': 31, ...}
+
+``AsyncRocketChat`` takes the same ``hedging`` argument and sends the hedged
+request as a second task, cancelling the slower one.
+"""
+
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable, Optional
+
+import requests
+
+
+def _close_response(future: Future):
+    if future.exception() is None:
+        future.result().close()
+
+
+class Hedging(object):
+    """
+    Sends a second request for GET calls slower than a latency percentile.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 0.95,
+        min_delay: float = 0.01,
+        max_delay: float = 2.0,
+        min_samples: int = 20,
+        window: int = 200,
+        paths: Optional[Iterable[str]] = None,
+        max_workers: int = 16,
+    ):
+        """
+        Args:
+            percentile: Latency percentile of an endpoint after which a call
+                is hedged.
+            min_delay: Never hedge calls sooner than this many seconds.
+            max_delay: Always hedge calls slower than this many seconds.
+            min_samples: Calls of an endpoint measured before its calls are
+                hedged.
+            window: Number of recent calls of each endpoint the percentile is
+                computed from.
+            paths: Api paths to hedge.  Every GET endpoint by default.
+            max_workers: Threads sending hedged calls.
+        """
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_samples = min_samples
+        self.window = window
+        self.paths = set(paths) if paths is not None else None
+        self.max_workers = max_workers
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self._latencies = {}  # type: Dict[str, deque]
+        self._delays = {}  # type: Dict[str, float]
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def enabled(self, path: str) -> bool:
+        return self.paths is None or path in self.paths
+
+    def delay(self, path: str) -> Optional[float]:
+        """
+        Return the seconds after which a call to ``path`` is hedged, or None
+        if not enough calls have been measured yet.
+        """
+        return self._delays.get(path)
+
+    def record(self, path: str, seconds: float):
+        """
+        Record the latency of a call.
+        """
+        with self._lock:
+            latencies = self._latencies.get(path)
+            if latencies is None:
+                latencies = self._latencies[path] = deque(maxlen=self.window)
+            latencies.append(seconds)
+            count = len(latencies)
+            # Recomputing the percentile on every call would sort the window
+            # each time; every tenth call is frequent enough.
+            if count < self.min_samples or count % 10:
+                return
+            ordered = sorted(latencies)
+        value = ordered[min(count - 1, int(self.percentile * count))]
+        self._delays[path] = min(self.max_delay, max(self.min_delay, value))
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix="rocketchat-hedge",
+                    )
+        return self._executor
+
+    def _submit(self, send: Callable, request_kwargs: dict) -> Future:
+        # Each request runs in a copy of the caller's context, so it keeps to
+        # the caller's deadline.
+        context = contextvars.copy_context()
+        return self._get_executor().submit(context.run, send, **request_kwargs)
+
+    def send(
+        self, path: str, send: Callable, request_kwargs: dict
+    ) -> requests.Response:
+        """
+        Send a request with ``send(**request_kwargs)``, hedging it if it is
+        slower than usual for ``path``.
+        """
+        with self._lock:
+            self.calls += 1
+        delay = self.delay(path)
+        start = time.perf_counter()
+        if delay is None:
+            r = send(**request_kwargs)
+            self.record(path, time.perf_counter() - start)
+            return r
+
+        first = self._submit(send, request_kwargs)
+        pending = {first}
+        if not wait(pending, timeout=delay).done:
+            with self._lock:
+                self.hedged += 1
+            pending.add(self._submit(send, request_kwargs))
+
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            winner = next((f for f in done if f.exception() is None), None)
+            if winner is None:
+                error = next(iter(done)).exception()
+                continue
+            for future in done | pending:
+                if future is not winner:
+                    future.add_done_callback(_close_response)
+            if winner is not first:
+                with self._lock:
+                    self.hedge_wins += 1
+            self.record(path, time.perf_counter() - start)
+            return winner.result()
+        raise error
+
+    async def send_async(self, path: str, send: Callable, request_kwargs: dict):
+        """
+        Coroutine version of ``send()``: return ``await send(**request_kwargs)``,
+        hedging it with a second task if it is slower than usual for ``path``.
+        The slower request is cancelled.
+        """
+        # Imported here so sync users do not pay for importing asyncio.
+        import asyncio
+
+        with self._lock:
+            self.calls += 1
+        delay = self.delay(path)
+        start = time.perf_counter()
+        if delay is None:
+            result = await send(**request_kwargs)
+            self.record(path, time.perf_counter() - start)
+            return result
+
+        first = asyncio.ensure_future(send(**request_kwargs))
+        pending = {first}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if not done:
+                with self._lock:
+                    self.hedged += 1
+                pending.add(asyncio.ensure_future(send(**request_kwargs)))
+
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                failed = {t for t in done if t.exception() is not None}
+                winner = next(iter(done - failed), None)
+                if winner is None:
+                    error = next(iter(failed)).exception()
+                    continue
+                if winner is not first:
+                    with self._lock:
+                        self.hedge_wins += 1
+                self.record(path, time.perf_counter() - start)
+                return winner.result()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def close(self):
+        """
+        Stop the threads sending hedged calls.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "hedged": self.hedged,
+                "hedge_wins": self.hedge_wins,
+                "delays": dict(self._delays),
+            }
@@ -0,0 +1,317 @@
+"""Request hooks and per-endpoint metrics.
+
+>>> instrumentation = Instrumentation()
+>>> @instrumentation.before_request
+... def add_trace_header(call):
+...     call.request_kwargs['headers']['X-Trace-Id'] = new_trace_id()
+>>> api = RocketChat(url, username, password, instrumentation=instrumentation)
+>>> api.users.info(username='bob')
+>>> instrumentation.metrics.snapshot()['users.info']['calls']
+1
+>>> print(instrumentation.metrics.prometheus())
+
+Instrumentation is disabled unless an ``Instrumentation`` is given, in which
+case api calls only pay for a single ``is None`` check.
+"""
+
+import bisect
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence
+
+from .errors import RocketChatError
+from .files import MultipartEncoder
+
+LOG = logging.getLogger(__name__)
+
+#: Upper bounds, in seconds, of the latency histogram buckets.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _body_size(data) -> int:
+    if data is None:
+        return 0
+    if isinstance(data, MultipartEncoder):
+        return data.len
+    if isinstance(data, str):
+        return len(data.encode("utf-8"))
+    if isinstance(data, (bytes, bytearray)):
+        return len(data)
+    return 0
+
+
+def error_type(exc: BaseException) -> str:
+    """
+    Return the label an exception is counted under in the error metrics.
+    """
+    if isinstance(exc, RocketChatError) and exc.errorType:
+        return exc.errorType
+    return type(exc).__name__
+
+
+class Call(object):
+    """
+    An instrumented api call, passed to the request hooks.
+
+    ``request_kwargs`` (method, url, params, data, headers) may be changed by
+    ``before_request`` hooks.  ``status``, ``bytes_received``, ``elapsed``
+    and ``error`` are set once the call completes.
+    """
+
+    __slots__ = (
+        "endpoint",
+        "request_kwargs",
+        "status",
+        "bytes_sent",
+        "bytes_received",
+        "started",
+        "elapsed",
+        "error",
+        "_instrumentation",
+    )
+
+    def __init__(self, instrumentation: "Instrumentation", endpoint: str):
+        self.endpoint = endpoint
+        self.request_kwargs = None
+        self.status = None
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.started = time.perf_counter()
+        self.elapsed = None
+        self.error = None
+        self._instrumentation = instrumentation
+
+    def start(self, request_kwargs: dict):
+        """
+        Run the ``before_request`` hooks just before the request is sent.
+        """
+        self.request_kwargs = request_kwargs
+        for hook in self._instrumentation._before:
+            hook(self)
+        self.bytes_sent = _body_size(request_kwargs.get("data"))
+        self.started = time.perf_counter()
+
+    def received(self, status: int, body: bytes):
+        self.status = status
+        self.bytes_received = len(body)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.elapsed = time.perf_counter() - self.started
+        self.error = exc
+        self._instrumentation._finish(self)
+
+    def __repr__(self):
+        return "Call({}, status={}, elapsed={})".format(
+            repr(self.endpoint), self.status, self.elapsed
+        )
+
+
+class _EndpointMetrics(object):
+    __slots__ = ("calls", "errors", "buckets", "latency_sum", "sent", "received")
+
+    def __init__(self, size: int):
+        self.calls = 0
+        self.errors = {}  # type: Dict[str, int]
+        self.buckets = [0] * size
+        self.latency_sum = 0.0
+        self.sent = 0
+        self.received = 0
+
+
+class Metrics(object):
+    """
+    Per-endpoint call counts, error counts by ``errorType``, latency
+    histograms and bytes sent and received.  Safe to share between threads.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        """
+        Args:
+            buckets: Upper bounds, in seconds, of the latency histogram
+                buckets.  A final +Inf bucket is always added.
+        """
+        self.buckets = tuple(sorted(buckets))
+        self._endpoints = {}  # type: Dict[str, _EndpointMetrics]
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        endpoint: str,
+        elapsed: float,
+        sent: int = 0,
+        received: int = 0,
+        error: Optional[str] = None,
+    ):
+        """
+        Record a completed call to ``endpoint``.
+        """
+        index = bisect.bisect_left(self.buckets, elapsed)
+        with self._lock:
+            m = self._endpoints.get(endpoint)
+            if m is None:
+                m = self._endpoints[endpoint] = _EndpointMetrics(len(self.buckets) + 1)
+            m.calls += 1
+            m.buckets[index] += 1
+            m.latency_sum += elapsed
+            m.sent += sent
+            m.received += received
+            if error is not None:
+                m.errors[error] = m.errors.get(error, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+    def snapshot(self) -> Dict[str, dict]:
+        """
+        Return the metrics of every endpoint called so far.
+
+        Histogram buckets are cumulative, keyed by their upper bound.
+        """
+        bounds = self.buckets + (float("inf"),)
+        snapshot = {}
+        with self._lock:
+            for endpoint, m in self._endpoints.items():
+                cumulative, total = [], 0
+                for count in m.buckets:
+                    total += count
+                    cumulative.append(total)
+                snapshot[endpoint] = {
+                    "calls": m.calls,
+                    "errors": dict(m.errors),
+                    "latency": {
+                        "sum": m.latency_sum,
+                        "buckets": dict(zip(bounds, cumulative)),
+                    },
+                    "bytes_sent": m.sent,
+                    "bytes_received": m.received,
+                }
+        return snapshot
+
+    def prometheus(self, prefix: str = "rocketchat") -> str:
+        """
+        Return the metrics in the Prometheus text exposition format.
+        """
+        snapshot = self.snapshot()
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append("# HELP {}_{} {}".format(prefix, name, help_text))
+            lines.append("# TYPE {}_{} {}".format(prefix, name, kind))
+            for suffix, labels, value in samples:
+                label_text = ",".join(
+                    '{}="{}"'.format(k, _escape(v)) for k, v in labels
+                )
+                lines.append(
+                    "{}_{}{}{{{}}} {}".format(prefix, name, suffix, label_text, value)
+                )
+
+        endpoints = sorted(snapshot.items())
+        metric(
+            "requests_total",
+            "counter",
+            "Api calls by endpoint.",
+            [("", [("endpoint", e)], m["calls"]) for e, m in endpoints],
+        )
+        metric(
+            "request_errors_total",
+            "counter",
+            "Failed api calls by endpoint and error type.",
+            [
+                ("", [("endpoint", e), ("error_type", t)], n)
+                for e, m in endpoints
+                for t, n in sorted(m["errors"].items())
+            ],
+        )
+        samples = []
+        for e, m in endpoints:
+            for bound, count in m["latency"]["buckets"].items():
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                samples.append(("_bucket", [("endpoint", e), ("le", le)], count))
+            samples.append(("_sum", [("endpoint", e)], m["latency"]["sum"]))
+            samples.append(("_count", [("endpoint", e)], m["calls"]))
+        metric(
+            "request_duration_seconds",
+            "histogram",
+            "Api call latency in seconds.",
+            samples,
+        )
+        metric(
+            "request_bytes_sent_total",
+            "counter",
+            "Request body bytes sent.",
+            [("", [("endpoint", e)], m["bytes_sent"]) for e, m in endpoints],
+        )
+        metric(
+            "response_bytes_received_total",
+            "counter",
+            "Response body bytes received.",
+            [("", [("endpoint", e)], m["bytes_received"]) for e, m in endpoints],
+        )
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Instrumentation(object):
+    """
+    Request hooks and metrics for an api.
+
+    ``before_request`` hooks are called with the ``Call`` just before it is
+    sent and may change ``call.request_kwargs``.  ``after_response`` hooks are
+    called once the call completes, including when it failed.  Exceptions
+    raised by ``after_response`` hooks are logged and ignored.
+    """
+
+    def __init__(self, metrics: Optional[Metrics] = None, enable_metrics: bool = True):
+        """
+        Args:
+            metrics: Where to record metrics.  Defaults to a new ``Metrics``.
+            enable_metrics: If False, only the hooks are run.
+        """
+        if metrics is None and enable_metrics:
+            metrics = Metrics()
+        self.metrics = metrics
+        self._before = []  # type: List[Callable[[Call], None]]
+        self._after = []  # type: List[Callable[[Call], None]]
+
+    def before_request(self, hook: Callable[[Call], None]) -> Callable:
+        """
+        Register a hook run before each request.  Usable as a decorator.
+        """
+        self._before.append(hook)
+        return hook
+
+    def after_response(self, hook: Callable[[Call], None]) -> Callable:
+        """
+        Register a hook run after each call.  Usable as a decorator.
+        """
+        self._after.append(hook)
+        return hook
+
+    def call(self, endpoint: str) -> Call:
+        """
+        Start instrumenting a call to ``endpoint``.  Use as a context manager.
+        """
+        return Call(self, endpoint)
+
+    def _finish(self, call: Call):
+        if self.metrics is not None:
+            self.metrics.record(
+                call.endpoint,
+                call.elapsed,
+                call.bytes_sent,
+                call.bytes_received,
+                error_type(call.error) if call.error is not None else None,
+            )
+        for hook in self._after:
+            try:
+                hook(call)
+            except Exception:
+                LOG.exception("Error in after_response hook %s", hook)
@@ -0,0 +1,114 @@
+"""Compact records for users, rooms and messages.
+
+Records keep a fixed set of fields in ``__slots__`` instead of the full
+response dict, which takes a fraction of the memory when millions of items
+are held at once:
+
+>>> users = list(api.users.list.stream(model=User))
+>>> users[0].username
+
+Each record class knows the response fields it reads, and ``stream()`` uses
+them to ask the server for only those fields.
+"""
+
+from typing import Dict, Tuple
+
+
+class Record(object):
+    """
+    Base class of the compact records.
+
+    ``FIELDS`` maps each attribute to the key of the response item it is read
+    from.  Nested keys are separated with dots (e.g. ``u._id``).
+    """
+
+    __slots__ = ()
+    FIELDS = {}  # type: Dict[str, str]
+    _KEYS = ()  # type: Tuple[Tuple[str, Tuple[str, ...]], ...]
+
+    def __init_subclass__(cls, **kwargs):
+        super(Record, cls).__init_subclass__(**kwargs)
+        cls._KEYS = tuple(
+            (name, tuple(key.split("."))) for name, key in cls.FIELDS.items()
+        )
+
+    def __init__(self, *args, **kwargs):
+        for name, value in zip(self.__slots__, args):
+            setattr(self, name, value)
+        for name in self.__slots__[len(args) :]:
+            setattr(self, name, kwargs.pop(name, None))
+        if kwargs:
+            raise TypeError("Unknown fields: {}".format(", ".join(kwargs)))
+
+    @classmethod
+    def from_dict(cls, item: dict) -> "Record":
+        """
+        Create a record from a response item.
+        """
+        record = cls.__new__(cls)
+        for name, key in cls._KEYS:
+            value = item
+            for part in key:
+                value = value.get(part) if isinstance(value, dict) else None
+            setattr(record, name, value)
+        return record
+
+    @classmethod
+    def api_fields(cls) -> Dict[str, int]:
+        """
+        Return the ``fields`` projection selecting the record's fields.
+        """
+        return {key.split(".")[0]: 1 for key in cls.FIELDS.values()}
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        attrs = ", ".join(
+            "{}={}".format(name, repr(getattr(self, name))) for name in self.__slots__
+        )
+        return "{}({})".format(self.__class__.__name__, attrs)
+
+
+class User(Record):
+    __slots__ = ("id", "username", "name", "status", "active", "type", "roles")
+    FIELDS = {
+        "id": "_id",
+        "username": "username",
+        "name": "name",
+        "status": "status",
+        "active": "active",
+        "type": "type",
+        "roles": "roles",
+    }
+
+
+class Room(Record):
+    __slots__ = ("id", "name", "type", "topic", "messages", "users", "updated_at")
+    FIELDS = {
+        "id": "_id",
+        "name": "name",
+        "type": "t",
+        "topic": "topic",
+        "messages": "msgs",
+        "users": "usersCount",
+        "updated_at": "_updatedAt",
+    }
+
+
+class Message(Record):
+    __slots__ = ("id", "room_id", "text", "ts", "user_id", "username", "updated_at")
+    FIELDS = {
+        "id": "_id",
+        "room_id": "rid",
+        "text": "msg",
+        "ts": "ts",
+        "user_id": "u._id",
+        "username": "u.username",
+        "updated_at": "_updatedAt",
+    }
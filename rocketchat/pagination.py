@@ -0,0 +1,99 @@
+import logging
+from typing import List, Optional
+
+LOG = logging.getLogger(__name__)
+
+
+class Paginator(object):
+    """
+    Tracks the request params for walking a paginated api endpoint.
+
+    Two strategies are supported:
+
+    * offset: pages are requested with ``count`` and ``offset``, which
+      advances by the number of items actually returned.  The walk stops on
+      an empty page or once ``total`` items have been returned.
+    * cursor: pages are requested with ``count`` and ``latest`` set to the
+      ``cursor`` field of the last item on the previous page, for endpoints
+      that return items newest first (e.g. channels.history).  The request is
+      inclusive of ``latest`` and offset past the items already returned for
+      that timestamp, so messages sharing a timestamp are never lost.  The
+      walk stops on an empty page or a page without new items.
+
+    A page shorter than ``page_size`` does not end the walk by itself: the
+    server caps ``count`` (at 100 by default), so it may just be a capped
+    page.  Only a page shorter than an earlier page of the walk is known to be
+    the last one.
+    """
+
+    def __init__(
+        self,
+        params: dict,
+        items_key: str,
+        page_size: int = 100,
+        cursor: Optional[str] = None,
+    ):
+        if page_size < 1:
+            raise ValueError("page_size must be at least 1")
+        self.params = dict(params)
+        self.items_key = items_key
+        self.page_size = page_size
+        self.cursor = cursor
+        self._offset = int(self.params.pop("offset", 0))
+        self._latest = self.params.pop("latest", None)
+        self._seen_at_latest = set()
+        self._longest = 0
+
+    def first_params(self) -> dict:
+        """
+        Return the request params for the first page.
+        """
+        return self._page_params()
+
+    def _page_params(self) -> dict:
+        params = dict(self.params, count=self.page_size)
+        if self.cursor is None:
+            params["offset"] = self._offset
+        elif self._latest is not None:
+            params["latest"] = self._latest
+            if self._seen_at_latest:
+                params["inclusive"] = "true"
+                params["offset"] = len(self._seen_at_latest)
+        return params
+
+    def items(self, page: dict) -> List[dict]:
+        """
+        Return the new items on ``page``.
+        """
+        items = page[self.items_key]
+        if self.cursor is not None and self._seen_at_latest:
+            items = [i for i in items if i.get("_id") not in self._seen_at_latest]
+        return items
+
+    def next_params(self, page: dict) -> Optional[dict]:
+        """
+        Advance past ``page`` and return the params for the next page, or None
+        if ``page`` was the last one.
+        """
+        raw_items = page[self.items_key]
+        if len(raw_items) < max(self._longest, 1):
+            return None
+        self._longest = len(raw_items)
+
+        if self.cursor is None:
+            self._offset += len(raw_items)
+            total = page.get("total")
+            if total is not None and self._offset >= total:
+                return None
+            return self._page_params()
+
+        latest = raw_items[-1][self.cursor]
+        seen = {i.get("_id") for i in raw_items if i[self.cursor] == latest}
+        if latest == self._latest:
+            if seen <= self._seen_at_latest:
+                LOG.warning("Stopping pagination, no new items at %r", latest)
+                return None
+            seen |= self._seen_at_latest
+        self._latest = latest
+        self._seen_at_latest = seen
+        return self._page_params()
@@ -0,0 +1,366 @@
+"""A pool of RocketChat clients for several servers or workspaces.
+
+``RocketChatPool`` fronts several ``RocketChat`` clients and exposes the same
+endpoint tree.  Each call is routed to one of the healthy nodes by the pool's
+policy, and nodes are health-checked in the background through the
+unauthenticated ``info`` endpoint.
+
+>>> pool = RocketChatPool.from_urls(
+...     ['https://chat1.server.com', 'https://chat2.server.com'],
+...     username='bot', password='secret', policy='least_outstanding',
+... )
+>>> pool.users.info(username='bob')
+>>> pool.pin(room_id).chat.postMessage(roomId=room_id, text='hi')
+>>> pool['https://chat1.server.com'].channels.list()
+"""
+
+import itertools
+import logging
+import threading
+import zlib
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple, Union
+
+import requests
+
+from .endpoints import ALIASES
+from .errors import CircuitOpenError
+from .rocketchat import RocketChat
+
+LOG = logging.getLogger(__name__)
+
+#: Routing policies.
+ROUND_ROBIN = "round_robin"
+LEAST_OUTSTANDING = "least_outstanding"
+PINNED = "pinned"
+POLICIES = (ROUND_ROBIN, LEAST_OUTSTANDING, PINNED)
+
+#: Errors that count as a node failure.
+CONNECTION_ERRORS = (requests.ConnectionError, requests.Timeout, CircuitOpenError)
+
+
+class PoolNode(object):
+    """
+    A client in the pool and its health.
+    """
+
+    __slots__ = ("name", "api", "healthy", "outstanding", "failures", "last_error")
+
+    def __init__(self, name: str, api: RocketChat):
+        self.name = name
+        self.api = api
+        self.healthy = True
+        self.outstanding = 0
+        self.failures = 0
+        self.last_error = None
+
+    def __repr__(self):
+        return "PoolNode({}, healthy={}, outstanding={})".format(
+            repr(self.name), self.healthy, self.outstanding
+        )
+
+
+class PoolPath(object):
+    """
+    An endpoint of the pool's api tree.  Calls are sent to a node chosen by
+    the pool.
+    """
+
+    __slots__ = ("_pool", "_names", "_key")
+
+    def __init__(self, pool: "RocketChatPool", names: Tuple[str, ...], key=None):
+        self._pool = pool
+        self._names = names
+        self._key = key
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        names = self._names + (name,)
+        self._pool._resolve(self._pool._nodes[0], names)
+        return PoolPath(self._pool, names, self._key)
+
+    def __repr__(self):
+        return "PoolPath({})".format(".".join(self._names))
+
+    def __call__(self, *args, **kwargs):
+        return self._pool._call(self._names, None, args, kwargs, self._key)
+
+    def raw(self, *args, **kwargs) -> bytes:
+        return self._pool._call(self._names, "raw", args, kwargs, self._key)
+
+    def download(self, *args, **kwargs) -> int:
+        return self._pool._call(self._names, "download", args, kwargs, self._key)
+
+    def iter(self, *args, **kwargs):
+        """
+        Iterate over the items of a paginated endpoint.  Every page is
+        requested from the same node.
+        """
+        node = self._pool._choose(self._key)
+        path = self._pool._resolve(node, self._names)
+        with self._pool._outstanding(node):
+            yield from path.iter(*args, **kwargs)
+
+
+class _PinnedView(object):
+    __slots__ = ("_pool", "_key")
+
+    def __init__(self, pool: "RocketChatPool", key):
+        self._pool = pool
+        self._key = key
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        self._pool._resolve(self._pool._nodes[0], (name,))
+        return PoolPath(self._pool, (name,), self._key)
+
+
+class RocketChatPool(object):
+    """
+    Routes api calls over several ``RocketChat`` clients.
+    """
+
+    def __init__(
+        self,
+        nodes: Union[Mapping[str, RocketChat], Iterable[RocketChat]],
+        policy: str = ROUND_ROBIN,
+        health_interval: Optional[float] = 30.0,
+        health_timeout: float = 5.0,
+        max_failures: int = 2,
+    ):
+        """
+        Args:
+            nodes: The clients to route calls to, as a list or as a mapping of
+                names (e.g. workspace names) to clients.  Nodes in a list
+                are named by their url.
+            policy: How calls are routed: "round_robin", "least_outstanding"
+                (the node with the fewest calls in flight) or "pinned" (every
+                call goes to the first healthy node, the others are
+                standbys).  Calls made through ``pin(key)`` are always routed
+                by their key.
+            health_interval: Seconds between background health checks.  None
+                disables them.
+            health_timeout: Timeout of each health check request.
+            max_failures: Consecutive failed health checks or connection
+                errors after which a node is ejected.  Ejected nodes are
+                added back once a health check succeeds.
+        """
+        if policy not in POLICIES:
+            raise ValueError("Unknown routing policy: {}".format(policy))
+        if isinstance(nodes, Mapping):
+            self._nodes = [PoolNode(name, api) for name, api in nodes.items()]
+        else:
+            self._nodes = [PoolNode(api.url, api) for api in nodes]
+        if not self._nodes:
+            raise ValueError("A pool needs at least one node")
+        self._by_name = {node.name: node for node in self._nodes}
+        self.policy = policy
+        self.health_interval = health_interval
+        self.health_timeout = health_timeout
+        self.max_failures = max_failures
+        self._round_robin = itertools.count()
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._health_thread = None
+        if health_interval:
+            self._health_thread = threading.Thread(
+                target=self._health_loop, name="rocketchat-pool-health", daemon=True
+            )
+            self._health_thread.start()
+
+    @classmethod
+    def from_urls(
+        cls, urls: Iterable[str], username=None, password=None, **kwargs
+    ) -> "RocketChatPool":
+        """
+        Create a pool with a client for each url.
+
+        Keyword arguments of ``RocketChatPool`` are passed to the pool, all
+        others to each ``RocketChat`` client.
+        """
+        pool_args = ("policy", "health_interval", "health_timeout", "max_failures")
+        pool_kwargs = {k: kwargs.pop(k) for k in pool_args if k in kwargs}
+        clients = [RocketChat(url, username, password, **kwargs) for url in urls]
+        return cls(clients, **pool_kwargs)
+
+    @property
+    def nodes(self) -> List[PoolNode]:
+        return list(self._nodes)
+
+    def __getitem__(self, name: str) -> RocketChat:
+        """
+        Return the client of the node called ``name``.
+        """
+        return self._by_name[name].api
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        self._resolve(self._nodes[0], (name,))
+        return PoolPath(self, (name,))
+
+    def __dir__(self):
+        api = self._nodes[0].api
+        return sorted(set(object.__dir__(self)).union(api.endpoints, ALIASES))
+
+    def pin(self, key) -> _PinnedView:
+        """
+        Return a view of the api tree whose calls all go to the node that
+        ``key`` (e.g. a room id or user id) maps to.
+
+        Keys are spread over the nodes by rendezvous hashing, so ejecting a
+        node only moves the keys that were pinned to it.
+        """
+        return _PinnedView(self, key)
+
+    def close(self):
+        """
+        Stop the health checks and close every client.
+        """
+        self._closed.set()
+        if self._health_thread is not None:
+            self._health_thread.join()
+        for node in self._nodes:
+            node.api.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @staticmethod
+    def _resolve(node: PoolNode, names: Tuple[str, ...]):
+        target = node.api
+        for name in names:
+            target = getattr(target, name)
+        return target
+
+    def _candidates(self) -> List[PoolNode]:
+        healthy = [node for node in self._nodes if node.healthy]
+        if not healthy:
+            # Fail open: a pool with every node ejected still tries them all.
+            LOG.warning("No healthy nodes in pool, trying all nodes")
+            return self._nodes
+        return healthy
+
+    def _choose(self, key=None, exclude: Optional[PoolNode] = None) -> PoolNode:
+        candidates = self._candidates()
+        if exclude is not None and len(candidates) > 1:
+            candidates = [node for node in candidates if node is not exclude]
+        if key is not None:
+            return max(candidates, key=lambda node: _rendezvous(node.name, key))
+        if self.policy == PINNED:
+            return candidates[0]
+        if self.policy == LEAST_OUTSTANDING:
+            with self._lock:
+                fewest = min(node.outstanding for node in candidates)
+                candidates = [n for n in candidates if n.outstanding == fewest]
+        return candidates[next(self._round_robin) % len(candidates)]
+
+    def _outstanding(self, node: PoolNode) -> "_Outstanding":
+        return _Outstanding(self, node)
+
+    def _call(self, names, method: Optional[str], args, kwargs, key=None) -> Any:
+        node = self._choose(key)
+        try:
+            return self._call_node(node, names, method, args, kwargs)
+        except CONNECTION_ERRORS:
+            # Reads are safe to send again, writes may have reached the server.
+            if self._resolve(node, names)._method != "GET":
+                raise
+            retry = self._choose(key, exclude=node)
+            if retry is node:
+                raise
+            LOG.info("Retrying %s on %s", ".".join(names), retry.name)
+            return self._call_node(retry, names, method, args, kwargs)
+
+    def _call_node(self, node: PoolNode, names, method, args, kwargs) -> Any:
+        target = self._resolve(node, names)
+        if method is not None:
+            target = getattr(target, method)
+        with self._outstanding(node):
+            try:
+                result = target(*args, **kwargs)
+            except CONNECTION_ERRORS as exc:
+                self._record_failure(node, exc)
+                raise
+        if node.failures:
+            with self._lock:
+                node.failures = 0
+        return result
+
+    def _record_failure(self, node: PoolNode, exc: Union[Exception, str]):
+        with self._lock:
+            node.failures += 1
+            node.last_error = exc
+            if node.healthy and node.failures >= self.max_failures:
+                node.healthy = False
+                LOG.warning("Ejecting %s from pool: %s", node.name, exc)
+
+    def check_health(self):
+        """
+        Health-check every node once through the ``info`` endpoint.
+        """
+        for node in self._nodes:
+            try:
+                r = node.api._send(
+                    "GET", node.api.info._url(), timeout=self.health_timeout
+                )
+            except (requests.RequestException, CircuitOpenError) as exc:
+                self._record_failure(node, exc)
+                continue
+            if r.status_code >= 400:
+                self._record_failure(node, "HTTP {}".format(r.status_code))
+                continue
+            with self._lock:
+                node.failures = 0
+                if not node.healthy:
+                    LOG.info("Node %s is healthy again", node.name)
+                    node.healthy = True
+
+    def _health_loop(self):
+        while not self._closed.wait(self.health_interval):
+            try:
+                self.check_health()
+            except Exception:
+                LOG.exception("Pool health check failed")
+
+    def stats(self) -> Dict[str, dict]:
+        """
+        Return the health and calls in flight of every node.
+        """
+        with self._lock:
+            return {
+                node.name: {
+                    "healthy": node.healthy,
+                    "outstanding": node.outstanding,
+                    "failures": node.failures,
+                }
+                for node in self._nodes
+            }
+
+
+class _Outstanding(object):
+    """
+    Counts a call in flight on a node.
+    """
+
+    __slots__ = ("pool", "node")
+
+    def __init__(self, pool: RocketChatPool, node: PoolNode):
+        self.pool = pool
+        self.node = node
+
+    def __enter__(self):
+        with self.pool._lock:
+            self.node.outstanding += 1
+
+    def __exit__(self, *exc_info):
+        with self.pool._lock:
+            self.node.outstanding -= 1
+
+
+def _rendezvous(name: str, key) -> int:
+    return zlib.crc32("{}:{}".format(name, key).encode("utf-8"))
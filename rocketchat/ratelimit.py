@@ -0,0 +1,161 @@
+import random
+import threading
+import time
+from typing import Mapping, Optional
+
+
+def reset_delay(headers: Mapping[str, str]) -> Optional[float]:
+    """
+    Return the seconds until the rate limit window in ``headers`` resets.
+
+    Uses ``Retry-After`` if present, otherwise ``X-RateLimit-Reset``, which
+    RocketChat sends as a unix timestamp in milliseconds.
+    """
+    retry_after = headers.get("Retry-After")
+    if retry_after is not None:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            pass
+    reset = headers.get("X-RateLimit-Reset")
+    if reset is None:
+        return None
+    try:
+        reset = float(reset)
+    except ValueError:
+        return None
+    if reset > 1e11:
+        reset /= 1000.0
+    return max(0.0, reset - time.time())
+
+
+class TokenBucket(object):
+    """
+    Token bucket that hands out reservations instead of blocking.
+
+    Not thread-safe, callers must hold a lock.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.last = time.monotonic()
+
+    def reserve(self, now: float) -> float:
+        """
+        Take a token and return the seconds to wait before it may be used.
+        """
+        self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class _EndpointLimit(object):
+    __slots__ = ("remaining", "reset_at", "next_at")
+
+    def __init__(self, remaining: int, reset_at: float):
+        self.remaining = remaining
+        self.reset_at = reset_at
+        self.next_at = 0.0
+
+
+class RateLimiter(object):
+    """
+    Schedules api calls within the server's rate limits.
+
+    The limit state of each endpoint is tracked from the ``X-RateLimit-*``
+    response headers.  Endpoints are keyed by their url without the path
+    argument (e.g. ``settings/<id>``), as the server limits every call to an
+    endpoint together.  Calls to an endpoint are spread evenly over what is
+    left of the current window (or held until it resets once no calls
+    remain), and an optional client-wide token bucket caps the overall rate.
+    Calls rejected with HTTP 429 are retried after a jittered backoff.
+
+    >>> api = RocketChat(url, username, password, rate_limiter=RateLimiter(rate=20))
+    """
+
+    def __init__(
+        self,
+        rate: Optional[float] = None,
+        burst: Optional[float] = None,
+        smooth: bool = True,
+        max_retries: int = 5,
+        backoff: float = 0.5,
+        max_backoff: float = 60.0,
+    ):
+        """
+        Args:
+            rate: Maximum calls per second for the whole client.  None means
+                only the server's per endpoint limits are applied.
+            burst: Number of calls that may be sent at once before ``rate``
+                applies.  Defaults to ``rate``.
+            smooth: Spread the calls remaining in an endpoint's window evenly
+                over the window instead of sending them as fast as possible.
+            max_retries: How many times to retry a call rejected with HTTP 429.
+            backoff: Base delay, in seconds, of the exponential retry backoff.
+            max_backoff: Maximum delay between retries.
+        """
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.smooth = smooth
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.throttled = 0
+        self._limits = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, key: str) -> float:
+        """
+        Reserve a call to endpoint ``key`` and return the seconds to wait
+        before sending it.
+        """
+        with self._lock:
+            now = time.monotonic()
+            delay = self.bucket.reserve(now) if self.bucket is not None else 0.0
+            limit = self._limits.get(key)
+            if limit is None:
+                return delay
+            if limit.reset_at <= now:
+                del self._limits[key]
+                return delay
+            if limit.remaining <= 0:
+                delay = max(delay, limit.reset_at - now)
+            elif self.smooth:
+                start = max(now, limit.next_at)
+                limit.next_at = start + (limit.reset_at - start) / limit.remaining
+                delay = max(delay, start - now)
+            limit.remaining -= 1
+            return delay
+
+    def update(self, key: str, status: int, headers: Mapping[str, str]):
+        """
+        Record the rate limit state of endpoint ``key`` from a response.
+        """
+        remaining = headers.get("X-RateLimit-Remaining")
+        delay = reset_delay(headers)
+        if status == 429:
+            with self._lock:
+                self.throttled += 1
+            remaining = 0
+        if remaining is None or delay is None:
+            return
+        with self._lock:
+            limit = _EndpointLimit(int(remaining), time.monotonic() + delay)
+            previous = self._limits.get(key)
+            if previous is not None and previous.reset_at > time.monotonic():
+                limit.next_at = previous.next_at
+            self._limits[key] = limit
+
+    def retry_delay(self, attempt: int, headers: Mapping[str, str]) -> float:
+        """
+        Return the seconds to wait before retry number ``attempt`` (from 0) of
+        a call rejected with HTTP 429.
+        """
+        backoff = min(self.max_backoff, self.backoff * 2**attempt)
+        delay = random.uniform(backoff / 2, backoff)
+        reset = reset_delay(headers)
+        if reset is not None:
+            delay = max(delay, min(self.max_backoff, reset) + random.uniform(0, 0.1))
+        return delay
@@ -0,0 +1,415 @@
+"""Realtime (DDP over WebSocket) client for RocketChat.
+
+``RealtimeClient`` logs in with the auth token of a REST api, subscribes to
+room message streams and user notifications, and delivers each event to a
+callback or through ``async for``.  Dropped connections are reconnected with
+backoff and every subscription is restored.
+
+>>> api = RocketChat('http://server.com', 'username', 'password')
+>>> async with RealtimeClient.from_api(api) as rt:
+...     await rt.subscribe_room_messages('GENERAL')
+...     async for event in rt:
+...         print(event.args[0]['msg'])
+
+Requires the optional ``aiohttp`` dependency (``pip install rocketchat[async]``).
+"""
+
+import asyncio
+import importlib.util
+import inspect
+import itertools
+import json
+import logging
+import random
+from collections import namedtuple
+from typing import Any, Callable, Dict, Optional
+
+from .errors import RocketChatError
+
+LOG = logging.getLogger(__name__)
+
+#: A stream event. ``stream`` is the DDP collection (e.g. stream-room-messages),
+#: ``name`` the event name (e.g. the room id) and ``args`` the event payload.
+Event = namedtuple("Event", "stream name args")
+
+
+def websocket_url(url: str) -> str:
+    """
+    Return the DDP websocket url for a RocketChat server url.
+    """
+    if url.startswith("https://"):
+        url = "wss://" + url[len("https://") :]
+    elif url.startswith("http://"):
+        url = "ws://" + url[len("http://") :]
+    return url.rstrip("/") + "/websocket"
+
+
+class Subscription(object):
+    """
+    A stream subscription, restored automatically after a reconnect.
+    """
+
+    __slots__ = ("id", "stream", "params", "callback")
+
+    def __init__(
+        self, id: str, stream: str, params: list, callback: Optional[Callable]
+    ):
+        self.id = id
+        self.stream = stream
+        self.params = params
+        self.callback = callback
+
+    @property
+    def event_name(self) -> Optional[str]:
+        return self.params[0] if self.params else None
+
+    def __repr__(self):
+        return "Subscription({}, {})".format(repr(self.stream), repr(self.params))
+
+
+class RealtimeClient(object):
+    """
+    Realtime client for the RocketChat DDP websocket api.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        auth_token: str,
+        user_id: Optional[str] = None,
+        reconnect: bool = True,
+        reconnect_delay: float = 1.0,
+        max_reconnect_delay: float = 60.0,
+        max_queue: int = 10000,
+        session=None,
+    ):
+        """
+        Args:
+            url: Base url of the RocketChat server (e.g. https://chat.server.com)
+            auth_token: Auth token of a logged in user (``RocketChat.auth_token``)
+            user_id: Id of the logged in user, needed for user notifications.
+            reconnect: Whether to reconnect and resubscribe if the connection drops.
+            reconnect_delay: Initial delay, in seconds, before reconnecting.
+                Doubled after every failed attempt.
+            max_reconnect_delay: Maximum delay between reconnect attempts.
+            max_queue: Maximum number of events buffered for ``async for``.
+                Newer events are dropped while the buffer is full.
+            session: An existing ``aiohttp.ClientSession`` to connect with.
+        """
+        if importlib.util.find_spec("aiohttp") is None:
+            raise ImportError("RealtimeClient requires the aiohttp package")
+        self.url = websocket_url(url)
+        self.auth_token = auth_token
+        self.user_id = user_id
+        self.reconnect = reconnect
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.max_queue = max_queue
+        self.reconnects = 0
+        self.dropped_events = 0
+        self._session = session
+        self._owns_session = session is None
+        self._ids = itertools.count(1)
+        self._subscriptions = {}  # type: Dict[str, Subscription]
+        self._pending = {}  # type: Dict[str, asyncio.Future]
+        # Created by connect(): before Python 3.10 a queue is bound to the
+        # event loop current when it is created.
+        self._queue = None  # type: Optional[asyncio.Queue]
+        self._ws = None
+        self._task = None
+        self._connected = None
+        self._closed = False
+
+    @classmethod
+    def from_api(cls, api, **kwargs) -> "RealtimeClient":
+        """
+        Create a realtime client that logs in with the token of a ``RocketChat`` api.
+        """
+        if not asyncio.iscoroutinefunction(api._ensure_login):
+            api._ensure_login()
+        if api.auth_token is None:
+            raise ValueError("The api must be logged in")
+        return cls(api.url, api.auth_token, api.user_id, **kwargs)
+
+    @property
+    def connected(self) -> bool:
+        return self._ws is not None and not self._ws.closed
+
+    async def connect(self):
+        """
+        Connect and login.  Raises if the first connection attempt fails.
+        """
+        if self._task is None:
+            self._closed = False
+            if self._queue is None:
+                self._queue = asyncio.Queue(self.max_queue)
+            self._connected = asyncio.get_event_loop().create_future()
+            self._task = asyncio.ensure_future(self._run())
+        await asyncio.shield(self._connected)
+
+    async def close(self):
+        """
+        Close the connection and stop reconnecting.
+        """
+        self._closed = True
+        if self._ws is not None:
+            await self._ws.close()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._owns_session and self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Event:
+        if self._queue is None:
+            raise RuntimeError("RealtimeClient is not connected")
+        return await self._queue.get()
+
+    def _next_id(self) -> str:
+        return str(next(self._ids))
+
+    async def _send(self, message: dict):
+        if not self.connected:
+            raise ConnectionError("Not connected to {}".format(self.url))
+        await self._ws.send_str(json.dumps(message))
+
+    async def call(self, method: str, *params) -> Any:
+        """
+        Call a DDP method on the server and return its result.
+        """
+        id = self._next_id()
+        future = asyncio.get_event_loop().create_future()
+        self._pending[id] = future
+        try:
+            await self._send(
+                {"msg": "method", "method": method, "id": id, "params": list(params)}
+            )
+            return await future
+        finally:
+            self._pending.pop(id, None)
+
+    async def subscribe(
+        self, stream: str, *params, callback: Optional[Callable[[Event], Any]] = None
+    ) -> Subscription:
+        """
+        Subscribe to a stream.
+
+        Events are passed to ``callback`` (a function or coroutine function),
+        or queued for ``async for`` if no callback is given.  If the client is
+        connected, waits until the server confirms the subscription.
+        """
+        sub = Subscription(self._next_id(), stream, list(params), callback)
+        self._subscriptions[sub.id] = sub
+        if self.connected:
+            try:
+                await self._subscribe(sub)
+            except Exception:
+                self._subscriptions.pop(sub.id, None)
+                raise
+        return sub
+
+    async def _subscribe(self, sub: Subscription):
+        future = asyncio.get_event_loop().create_future()
+        self._pending[sub.id] = future
+        try:
+            await self._send(
+                {"msg": "sub", "id": sub.id, "name": sub.stream, "params": sub.params}
+            )
+            await future
+        finally:
+            self._pending.pop(sub.id, None)
+
+    async def unsubscribe(self, sub: Subscription):
+        """
+        Stop receiving events for a subscription.
+        """
+        self._subscriptions.pop(sub.id, None)
+        if self.connected:
+            await self._send({"msg": "unsub", "id": sub.id})
+
+    async def subscribe_room_messages(
+        self, room_id: str, callback: Optional[Callable[[Event], Any]] = None
+    ) -> Subscription:
+        """
+        Subscribe to new and edited messages in a room.
+        """
+        return await self.subscribe(
+            "stream-room-messages", room_id, False, callback=callback
+        )
+
+    async def subscribe_user_notifications(
+        self,
+        event: str = "notification",
+        callback: Optional[Callable[[Event], Any]] = None,
+    ) -> Subscription:
+        """
+        Subscribe to the logged in user's notifications.
+
+        ``event`` is one of notification, message, rooms-changed or
+        subscriptions-changed.
+        """
+        if self.user_id is None:
+            raise ValueError("user_id is required for user notifications")
+        name = "{}/{}".format(self.user_id, event)
+        return await self.subscribe(
+            "stream-notify-user", name, False, callback=callback
+        )
+
+    async def _run(self):
+        delay = self.reconnect_delay
+        while not self._closed:
+            reader = None
+            try:
+                await self._open()
+                reader = asyncio.ensure_future(self._read())
+                reader.add_done_callback(self._reader_done)
+                await self.call("login", {"resume": self.auth_token})
+                for sub in list(self._subscriptions.values()):
+                    try:
+                        await self._subscribe(sub)
+                    except RocketChatError as exc:
+                        LOG.warning("Could not restore %s: %s", sub, exc)
+                if not self._connected.done():
+                    self._connected.set_result(None)
+                delay = self.reconnect_delay
+                await reader
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                if not self._connected.done():
+                    self._connected.set_exception(exc)
+                    return
+                LOG.warning("Realtime connection to %s failed: %s", self.url, exc)
+            finally:
+                if reader is not None:
+                    reader.cancel()
+                self._fail_pending(
+                    ConnectionError("Connection to {} lost".format(self.url))
+                )
+                if self._ws is not None:
+                    await self._ws.close()
+                    self._ws = None
+
+            if self._closed or not self.reconnect:
+                break
+            sleep = random.uniform(delay / 2, delay)
+            LOG.info("Reconnecting to %s in %.1fs", self.url, sleep)
+            await asyncio.sleep(sleep)
+            delay = min(self.max_reconnect_delay, delay * 2)
+            self.reconnects += 1
+
+    async def _open(self):
+        """
+        Open the websocket and complete the DDP handshake.
+        """
+        if self._session is None:
+            import aiohttp
+
+            self._session = aiohttp.ClientSession()
+        self._ws = await self._session.ws_connect(self.url)
+        await self._ws.send_str(
+            json.dumps({"msg": "connect", "version": "1", "support": ["1"]})
+        )
+        while True:
+            message = json.loads(await self._ws.receive_str())
+            if message.get("msg") == "connected":
+                return
+            if message.get("msg") == "failed":
+                raise ConnectionError(
+                    "DDP version not supported by {}".format(self.url)
+                )
+            await self._handle(message)
+
+    async def _read(self):
+        import aiohttp
+
+        async for msg in self._ws:
+            if msg.type == aiohttp.WSMsgType.TEXT:
+                await self._handle(json.loads(msg.data))
+            elif msg.type == aiohttp.WSMsgType.ERROR:
+                raise ConnectionError(
+                    "Websocket error: {}".format(self._ws.exception())
+                )
+
+    async def _handle(self, message: dict):
+        kind = message.get("msg")
+        if kind == "ping":
+            await self._ws.send_str(json.dumps({"msg": "pong"}))
+        elif kind == "changed":
+            await self._dispatch(message)
+        elif kind == "result":
+            future = self._pending.get(message.get("id"))
+            if future is not None and not future.done():
+                error = message.get("error")
+                if error is not None:
+                    future.set_exception(
+                        RocketChatError(
+                            error.get("error"),
+                            error.get("reason", error.get("message")),
+                        )
+                    )
+                else:
+                    future.set_result(message.get("result"))
+        elif kind == "ready":
+            for id in message.get("subs", ()):
+                future = self._pending.get(id)
+                if future is not None and not future.done():
+                    future.set_result(None)
+        elif kind == "nosub":
+            error = message.get("error") or {}
+            future = self._pending.get(message.get("id"))
+            self._subscriptions.pop(message.get("id"), None)
+            if future is not None and not future.done():
+                future.set_exception(
+                    RocketChatError(
+                        error.get("error"), error.get("reason", "Subscription refused")
+                    )
+                )
+        elif kind == "error":
+            LOG.warning("Realtime error from %s: %s", self.url, message.get("reason"))
+
+    async def _dispatch(self, message: dict):
+        fields = message.get("fields") or {}
+        event = Event(
+            message.get("collection"), fields.get("eventName"), fields.get("args", [])
+        )
+        for sub in list(self._subscriptions.values()):
+            if sub.stream != event.stream or sub.event_name != event.name:
+                continue
+            if sub.callback is None:
+                try:
+                    self._queue.put_nowait(event)
+                except asyncio.QueueFull:
+                    self.dropped_events += 1
+                continue
+            try:
+                result = sub.callback(event)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception:
+                LOG.exception("Error in realtime callback for %s", sub)
+
+    def _reader_done(self, reader: asyncio.Future):
+        # Calls waiting on a reply can never complete once the reader stops.
+        self._fail_pending(ConnectionError("Connection to {} lost".format(self.url)))
+
+    def _fail_pending(self, exc: Exception):
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(exc)
+        self._pending.clear()
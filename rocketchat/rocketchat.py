@@ -1,9 +1,30 @@
 import logging
-from typing import Optional
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Optional, Union
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from .apipath import APIPath
+from .codec import JSONCodec, get_codec
+from .endpoints import ALIASES, ENDPOINT_TREE
+from .files import CHUNK_SIZE, MultipartEncoder, Progress, stream_to
+from .timeouts import DEFAULT_TIMEOUT, Timeout, bounded, check_wait, deadline
+
+if TYPE_CHECKING:
+    # Only needed for annotations; the modules are imported by the callers
+    # that create these objects, or on first use below.
+    from .batch import Batch
+    from .breaker import CircuitBreaker
+    from .cache import ResponseCache
+    from .coalesce import Coalescer
+    from .dispatch import Dispatcher
+    from .hedge import Hedging
+    from .metrics import Instrumentation
+    from .ratelimit import RateLimiter
+    from .tokens import FileTokenStore
 
 LOG = logging.getLogger(__name__)
 
@@ -11,264 +32,309 @@ LOG = logging.getLogger(__name__)
 class RocketChat(object):
     """
     Python interface to the RocketChat REST API.
+
+    All api calls are sent through a single pooled ``requests.Session``, so
+    connections to the server are kept alive and reused between calls.  The
+    session is safe to share between threads.  Call ``close()`` (or use the
+    instance as a context manager) to release the pooled connections.
+
+    Endpoints are created from the ``endpoints`` tree when first accessed, and
+    login is deferred until the first call that requires authorization.
+
+    >>> with RocketChat('http://server.com', 'username', 'password') as api:
+    ...     api.users.info(username='username')
     """
 
+    #: Class used to create each endpoint in the api tree.
+    path_class = APIPath
+
+    #: Tree of api endpoints, see ``rocketchat.endpoints``.
+    endpoints = ENDPOINT_TREE
+
     def __init__(
-        self, url: str, username: Optional[str] = None, password: Optional[str] = None
+        self,
+        url: str,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        pool_block: bool = False,
+        max_retries: Union[int, Retry] = 0,
+        keep_alive: bool = True,
+        session: Optional[requests.Session] = None,
+        cache: Optional["ResponseCache"] = None,
+        rate_limiter: Optional["RateLimiter"] = None,
+        codec: Union[str, JSONCodec] = "json",
+        instrumentation: Optional["Instrumentation"] = None,
+        auth_token: Optional[str] = None,
+        user_id: Optional[str] = None,
+        token_store: Optional["FileTokenStore"] = None,
+        coalescer: Optional["Coalescer"] = None,
+        timeout: Timeout = DEFAULT_TIMEOUT,
+        timeouts: Optional[Dict[str, Timeout]] = None,
+        hedging: Optional["Hedging"] = None,
+        circuit_breaker: Optional["CircuitBreaker"] = None,
+    ):
+        """
+        Args:
+            url: Base url of the RocketChat server (e.g. https://chat.server.com)
+            username: Username to login with.
+            password: Password to login with.
+            pool_connections: Number of host connection pools to cache.
+            pool_maxsize: Maximum number of connections kept open per host.
+            pool_block: If True, callers wait for a free connection once
+                ``pool_maxsize`` connections are in use, instead of opening
+                extra, unpooled connections.
+            max_retries: Number of retries for failed connections, or a
+                ``urllib3.util.retry.Retry`` instance for finer control.
+            keep_alive: If False, connections are closed after every request.
+            session: An existing ``requests.Session`` to send requests through.
+                It is used as-is and is not closed by ``close()``.
+            cache: A ``ResponseCache`` for responses from read-only endpoints.
+                Responses are not cached by default.
+            rate_limiter: A ``RateLimiter`` that paces calls within the
+                server's rate limits and retries calls rejected with HTTP 429.
+            codec: JSON codec for request and response bodies: "json" (the
+                default), "orjson", "ujson", "auto" for the fastest one
+                installed, or a codec object, see ``rocketchat.codec``.
+            instrumentation: An ``Instrumentation`` to run request hooks and
+                record per-endpoint metrics.  Disabled by default.
+            auth_token: Auth token of an existing session, or a personal
+                access token, used instead of logging in.  If ``username``
+                and ``password`` are also given, they are used to login again
+                once the token expires.
+            user_id: Id of the user ``auth_token`` belongs to.
+            token_store: A ``FileTokenStore`` to share auth tokens between
+                processes, so a login is only needed once the stored token
+                has expired.
+            coalescer: A ``Coalescer`` so concurrent identical GET calls
+                share a single request.  Disabled by default.
+            timeout: Timeout of every request, in seconds or as a
+                ``(connect, read)`` tuple.  None waits forever.
+            timeouts: Timeouts of specific api paths (e.g.
+                ``{"users.list": (5, 300)}``), overriding ``timeout``.
+            hedging: A ``Hedging`` that sends a second request for GET calls
+                slower than usual.  Disabled by default.
+            circuit_breaker: A ``CircuitBreaker`` that fails calls fast while
+                the server is failing.  Disabled by default.
+        """
+        self._init_state(
+            url,
+            username,
+            password,
+            cache=cache,
+            rate_limiter=rate_limiter,
+            codec=codec,
+            instrumentation=instrumentation,
+            auth_token=auth_token,
+            user_id=user_id,
+            token_store=token_store,
+            coalescer=coalescer,
+            timeout=timeout,
+            timeouts=timeouts,
+            hedging=hedging,
+            circuit_breaker=circuit_breaker,
+        )
+        self._owns_session = session is None
+        if session is None:
+            session = self._create_session(
+                pool_connections=pool_connections,
+                pool_maxsize=pool_maxsize,
+                pool_block=pool_block,
+                max_retries=max_retries,
+                keep_alive=keep_alive,
+            )
+        self.session = session
+        self._login_lock = threading.Lock()
+
+    def _init_state(
+        self,
+        url: str,
+        username: Optional[str],
+        password: Optional[str],
+        cache: Optional["ResponseCache"],
+        rate_limiter: Optional["RateLimiter"],
+        codec: Union[str, JSONCodec],
+        instrumentation: Optional["Instrumentation"],
+        auth_token: Optional[str],
+        user_id: Optional[str],
+        token_store: Optional["FileTokenStore"],
+        coalescer: Optional["Coalescer"],
+        timeout: Timeout,
+        timeouts: Optional[Dict[str, Timeout]],
+        hedging: Optional["Hedging"],
+        circuit_breaker: Optional["CircuitBreaker"],
     ):
+        """
+        Set the state shared with ``AsyncRocketChat``: everything but the
+        session and the login lock.
+        """
         self.url = url
         self.api_v1_path = "/api/v1/"
-        self.user_id = None
-        self.auth_token = None
-        self.login(username=username, password=password)
-
-        # fmt:off
-        self.me = APIPath(self, "me")
-        self.info = APIPath(self, "info", result_key="info", auth=False, api_root="/api/")
-        self.directory = APIPath(self, "directory")
-        self.spotlight = APIPath(self, "spotlight")
-        self.statistics = APIPath(self, "statistics")
-        self.statistics.list = APIPath(self, "statistics.list")
-
-        self.assets = APIPath(self, "assets", None)
-        self.assets.setAsset = APIPath(self, "assets.setAsset", "POST", result_key="success")
-        self.assets.unsetAsset = APIPath(self, "assets.unsetAsset", "POST", result_key="success")
-
-        self.autotranslate = APIPath(self, "autotranslate", None)
-        self.autotranslate.getSupportedLanguages = APIPath(self, "autotranslate.getSupportedLanguages", result_key="languages")
-        self.autotranslate.saveSettings = APIPath(self, "autotranslate.saveSettings", "POST", result_key="success")
-        self.autotranslate.translateMessage = APIPath(self, "autotranslate.translateMessage", "POST", result_key="message")
-
-        self.logout = APIPath(self, "logout", "POST")
-
-        self.users = APIPath(self, "users", None)
-        self.users.presence = APIPath(self, "users.presence")
-        self.users.create = APIPath(self, "users.create", "POST", result_key="user")
-        self.users.createToken = APIPath(self, "users.createToken", "POST", result_key="data")
-        self.users.delete = APIPath(self, "users.delete", "POST", result_key="success")
-        self.users.deleteOwnAccount = APIPath(self, "users.deleteOwnAccount", "POST")
-        self.users.forgotPassword = APIPath(self, "users.forgotPassword", "POST")
-        self.users.generatePersonalAccessToken = APIPath(self, "users.generatePersonalAccessToken", "POST")
-        self.users.getAvatar = APIPath(self, "users.getAvatar", "GET")
-        self.users.getPersonalAccessTokens = APIPath(self, "users.getPersonalAccessTokens", "GET")
-        self.users.getPreferences = APIPath(self, "users.getPreferences", "GET")
-        self.users.getPresence = APIPath(self, "users.getPresence", "GET", result_key="presence")
-        self.users.getUsernameSuggestion = APIPath(self, "users.getUsernameSuggestion", "GET")
-        self.users.info = APIPath(self, "users.info", "GET", result_key="user")
-        self.users.list = APIPath(self, "users.list", "GET")
-        self.users.regeneratePersonalAccessToken = APIPath(self, "users.regeneratePersonalAccessToken", "POST")
-        self.users.register = APIPath(self, "users.register", "POST", result_key="user")
-        self.users.removePersonalAccessToken = APIPath(self, "users.removePersonalAccessToken", "POST")
-        self.users.requestDataDownload = APIPath(self, "users.requestDataDownload")
-        self.users.resetAvatar = APIPath(self, "users.resetAvatar", "POST", result_key="success")
-        self.users.setAvatar = APIPath(self, "users.setAvatar", "POST", result_key="success")
-        self.users.setPreferences = APIPath(self, "users.setPreferences", "POST")
-        self.users.setActiveStatus = APIPath(self, "users.setActiveStatus", "POST")
-        self.users.update = APIPath(self, "users.update", "POST", result_key="user")
-        self.users.updateOwnBasicInfo = APIPath(self, "users.updateOwnBasicInfo", "POST")
-
-        self.channels = APIPath(self, "channels", None)
-        self.channels.addAll = APIPath(self, "channels.addAll", "POST", result_key="channel")
-        self.channels.addLeader = APIPath(self, "channels.addLeader", "POST")
-        self.channels.anonymousread  = APIPath(self, "channels.anonymousread")
-        self.channels.archive = APIPath(self, "channels.archive", "POST", result_key="success")
-        self.channels.cleanHistory = APIPath(self, "channels.cleanHistory", "POST", result_key="success")
-        self.channels.close = APIPath(self, "channels.close", "POST", result_key="success")
-        self.channels.counters = APIPath(self, "channels.counters")
-        self.channels.create = APIPath(self, "channels.create", "POST", result_key="channel")
-        self.channels.delete = APIPath(self, "channels.delete", "POST")
-        self.channels.files = APIPath(self, "channels.files")
-        self.channels.getAllUserMentionsByChannel = APIPath(self, "channels.getAllUserMentionsByChannel")
-        self.channels.getIntegrations = APIPath(self, "channels.getIntegrations", "GET", result_key="integrations")
-        self.channels.history = APIPath(self, "channels.history", "GET", result_key="messages")
-        self.channels.info = APIPath(self, "channels.info", "GET", result_key="channel")
-        self.channels.invite = APIPath(self, "channels.invite", "POST", result_key="channel")
-        self.channels.join = APIPath(self, "channels.join", "POST")
-        self.channels.kick = APIPath(self, "channels.kick", "POST", result_key="channel")
-        self.channels.leave = APIPath(self, "channels.leave", "POST", result_key="channel")
-        self.channels.list = APIPath(self, "channels.list", "GET", result_key="channels")
-        self.channels.list.joined = APIPath(self, "channels.list.joined", "GET", result_key="channels")
-        self.channels.members = APIPath(self, "channels.members")
-        self.channels.messages = APIPath(self, "channels.mesages")
-        self.channels.moderators = APIPath(self, "channels.moderators")
-        self.channels.online = APIPath(self, "channels.online")
-        self.channels.open = APIPath(self, "channels.open", "POST", result_key="success")
-        self.channels.removeLeader = APIPath(self, "channels.removeLeader", "POST")
-        self.channels.rename = APIPath(self, "channels.rename", "POST", result_key="channel")
-        self.channels.roles = APIPath(self, "channels.roles")
-        self.channels.setCustomFields = APIPath(self, "channels.setCustomFields", "POST")
-        self.channels.setAnnouncement = APIPath(self, "channels.setAnnouncement", "POST")
-        self.channels.setDefault = APIPath(self, "channels.setDefault", "POST")
-        self.channels.setDescription = APIPath(self, "channels.setDescription", "POST", result_key="description")
-        self.channels.setJoinCode = APIPath(self, "channels.setJoinCode", "POST", result_key="channel")
-        self.channels.setPurpose = APIPath(self, "channels.setPurpose", "POST", result_key="purpose")
-        self.channels.setReadOnly = APIPath(self, "channels.setReadOnly", "POST", result_key="channel")
-        self.channels.setTopic = APIPath(self, "channels.setTopic", "POST", result_key="topic")
-        self.channels.setType = APIPath(self, "channels.setType", "POST", result_key="channel")
-        self.channels.unarchive = APIPath(self, "channels.unarchive", "POST", result_key="success")
-
-        self.groups = APIPath(self, "groups", None)
-        self.groups.archive = APIPath(self, "groups.archive", "POST")
-        self.groups.addLeader = APIPath(self, "groups.addLeader", "POST")
-        self.groups.close = APIPath(self, "groups.close", "POST")
-        self.groups.create = APIPath(self, "groups.create", "POST")
-        self.groups.delete = APIPath(self, "groups.delete", "POST")
-        self.groups.files = APIPath(self, "groups.files", "POST")
-        self.groups.history = APIPath(self, "groups.history", "GET")
-        self.groups.info = APIPath(self, "groups.info", "GET")
-        self.groups.invite = APIPath(self, "groups.invite", "POST")
-        self.groups.kick = APIPath(self, "groups.kick", "POST")
-        self.groups.leave = APIPath(self, "groups.leave", "POST")
-        self.groups.list = APIPath(self, "groups.list", "GET")
-        self.groups.listAll = APIPath(self, "groups.listAll")
-        self.groups.members = APIPath(self, "groups.members")
-        self.groups.messages = APIPath(self, "groups.messages")
-        self.groups.moderators = APIPath(self, "groups.moderators")
-        self.groups.open = APIPath(self, "groups.open", "POST")
-        self.groups.removeLeader = APIPath(self, "groups.removeLeader", "POST")
-        self.groups.rename = APIPath(self, "groups.rename", "POST")
-        self.groups.roles = APIPath(self, "groups.roles")
-        self.groups.setAnnouncement = APIPath(self, "groups.setAnnouncement", "POST")
-        self.groups.setCustomFields = APIPath(self, "groups.setCustomFields", "POST")
-        self.groups.setDescription = APIPath(self, "groups.setDescription", "POST")
-        self.groups.setPurpose = APIPath(self, "groups.setPurpose", "POST")
-        self.groups.setReadOnly = APIPath(self, "groups.setReadOnly", "POST")
-        self.groups.setTopic = APIPath(self, "groups.setTopic", "POST")
-        self.groups.setType = APIPath(self, "groups.setType", "POST", result_key="group")
-        self.groups.unarchive = APIPath(self, "groups.unarchive", "POST")
-
-        self.chat = APIPath(self, "chat", None)
-        self.chat.delete = APIPath(self, "chat.delete", "POST")
-        self.chat.followMessage = APIPath(self, "chat.followMessage", "POST")
-        self.chat.getDeletedMessages = APIPath(self, "chat.getDeletedMessages")
-        self.chat.getDiscussions = APIPath(self, "chat.getDiscussions")
-        self.chat.getMentionedMessages = APIPath(self, "chat.getMentionedMessages")
-        self.chat.getMessage = APIPath(self, "chat.getMessage", "POST")
-        self.chat.getMessageReadReceipts = APIPath(self, "chat.getMessageReadReceipts")
-        self.chat.getPinnedMessages = APIPath(self, "chat.getPinnedMessages")
-        self.chat.getSnippetedMessages = APIPath(self, "chat.getSnippetedMessages")
-        self.chat.getSnippetedMessageById = APIPath(self, "chat.getSnippetedMessageById")
-        self.chat.getStarredMessages = APIPath(self, "chat.getStarredMessages")
-        self.chat.getThreadsList = APIPath(self, "chat.getThreadsList")
-        self.chat.ignoreUser = APIPath(self, "chat.ignoreUser")
-        self.chat.pinMessage = APIPath(self, "chat.pinMessage", "POST")
-        self.chat.postMessage = APIPath(self, "chat.postMessage", "POST")
-        self.chat.react = APIPath(self, "chat.react", "POST")
-        self.chat.reportMessage = APIPath(self, "chat.reportMessage", "POST")
-        self.chat.search = APIPath(self, "chat.search", "POST")
-        self.chat.starMessage = APIPath(self, "chat.starMessage", "POST")
-        self.chat.sendMessage = APIPath(self, "chat.sendMessage", "POST")
-        self.chat.syncThreadMessages = APIPath(self, "chat.syncThreadMessages", "POST")
-        self.chat.syncThreadsList = APIPath(self, "chat.syncThreadsList", "POST")
-        self.chat.unfollowMessage = APIPath(self, "chat.unfollowMessage", "POST")
-        self.chat.unPinMessage = APIPath(self, "chat.unPinMessage", "POST")
-        self.chat.unStarMessage = APIPath(self, "chat.unStarMessage", "POST")
-        self.chat.update = APIPath(self, "chat.update", "POST")
-
-        self.custom_sounds = APIPath(self, "custom-sounds", None)
-        self.custom_sounds.list = APIPath(self, "custom-sounds.list")
-
-        self.im = APIPath(self, "im")
-        self.im.close = APIPath(self, "im.close", "POST")
-        self.im.counters = APIPath(self, "im.counters")
-        self.im.create = APIPath(self, "im.create", "POST")
-        self.im.history = APIPath(self, "im.history", "GET")
-        self.im.files = APIPath(self, "im.files")
-        self.im.members = APIPath(self, "im.members")
-        self.im.messages = APIPath(self, "im.messages")
-        self.im.messages.others = APIPath(self, "im.messages.others", "GET")
-        self.im.list = APIPath(self, "im.list", "GET")
-        self.im.list.everyone = APIPath(self, "im.list.everyone", "GET")
-        self.im.open = APIPath(self, "im.open", "POST")
-        self.im.setTopic = APIPath(self, "im.setTopic", "POST")
-        self.dm = self.im
-
-        self.integrations = APIPath(self, "integrations", None)
-        self.integrations.create = APIPath(self, "integrations.create", "POST")
-        self.integrations.get = APIPath(self, "integrations.get")
-        self.integrations.history = APIPath(self, "integrations.history")
-        self.integrations.list = APIPath(self, "integrations.list")
-        self.integrations.remove = APIPath(self, "integrations.remove", "POST")
-        
-        self.findOrCreateInvite = APIPath(self, "findOrCreateInvite", "POST")
-        self.listInvites = APIPath(self, "listInvites")
-        self.removeInvite = APIPath(self, "removeInvite", "POST")
-        self.useInviteToken = APIPath(self, "useInviteToken", "POST")
-        self.validateInviteToken = APIPath(self, "validateInviteToken", "POST")
-
-        self.livechat = APIPath(self, "livechat", None)
-        self.livechat.inquiries = APIPath(self, "livechat/inquiries", None)
-        self.livechat.inquiries.list = APIPath(self, "livechat/inquiries.list")
-        self.livechat.inquiries.take = APIPath(self, "livechat/inquiries.take", "POST")
-        self.livechat.rooms = APIPath(self, "livechat/rooms")
-
-        self.oauth_apps = APIPath(self, "oauth-apps", None)
-        self.oauth_apps.get = APIPath(self, "oauth-apps.get")
-        self.oauth_apps.list = APIPath(self, "oauth-apps.list")
-
-        self.permissions = APIPath(self, "permissions", None)
-        self.permissions.listAll = APIPath(self, "permissions.listAll")
-        self.permissions.update = APIPath(self, "permissions.update", "POST")
-
-        self.roles = APIPath(self, "roles", None)
-        self.roles.create = APIPath(self, "roles.create", "POST")
-        self.roles.list = APIPath(self, "roles.list")
-        self.roles.addUserToRole = APIPath(self, "roles.addUserToRole", "POST")
-        self.roles.getUsersInRole = APIPath(self, "roles.getUsersInRole")
-
-        self.push = APIPath(self, "push", None)
-        self.push.token = APIPath(self, "push.token", None)
-        self.push.token.save = APIPath(self, "push.token", "POST")
-        self.push.token.delete = APIPath(self, "push.token", "DELETE")
-
-        self.rooms = APIPath(self, "rooms", None)
-        self.rooms.adminRooms = APIPath(self, "rooms.adminRooms")
-        self.rooms.cleanHistory = APIPath(self, "rooms.cleanHistory", "POST")
-        self.rooms.createDiscussion = APIPath(self, "rooms.createDiscussion", "POST")
-        self.rooms.favorite = APIPath(self, "rooms.favorite", "POST")
-        self.rooms.get = APIPath(self, "rooms.get")
-        self.rooms.getDiscussions = APIPath(self, "rooms.getDiscussions")
-        self.rooms.info = APIPath(self, "rooms.info")
-        self.rooms.leave = APIPath(self, "rooms.leave", "POST")
-        self.rooms.saveNotification = APIPath(self, "rooms.saveNotification", "POST")
-        self.rooms.upload = APIPath(self, "rooms.upload", "POST", arg_endpoint=True)
-
-        self.commands = APIPath(self, "commands")
-        self.commands.get = APIPath(self, "commands.get", "GET")
-        self.commands.list = APIPath(self, "commands.list", "GET")
-        self.commands.run = APIPath(self, "commands.run", "POST")
-
-        self.custom_user_status = APIPath(self, "custom-user-status", None)
-        self.custom_user_status.list = APIPath(self, "custom-user-status.list")
-
-        self.emoji_custom = APIPath(self, "emoji-custom", None)
-        self.emoji_custom.list = APIPath(self, "emoji-custom.list")
-        self.emoji_custom.create = APIPath(self, "emoji-custom.create", "POST")
-        self.emoji_custom.delete = APIPath(self, "emoji-custom.delete", "POST")
-        self.emoji_custom.update = APIPath(self, "emoji-custom.update", "POST")
-
-        self.settings = APIPath(self, "settings", None)
-        self.settings.public = APIPath(self, "settings.public")
-        self.settings.oauth = APIPath(self, "settings.oauth")
-        self.settings.get = APIPath(self, "settings", "GET", arg_endpoint=True)
-        self.settings.set = APIPath(self, "settings", "POST", arg_endpoint=True)
-
-        self.service = APIPath(self, "service", None)
-        self.service.configurations = APIPath(self, "service.configurations")
-
-        self.subscriptions = APIPath(self, "subscriptions", None)
-        self.subscriptions.get = APIPath(self, "subscriptions.get")
-        self.subscriptions.getOne = APIPath(self, "subscriptions.getOne")
-        self.subscriptions.read = APIPath(self, "subscriptions.read", "POST")
-        self.subscriptions.unread = APIPath(self, "subscriptions.unread", "POST")
-
-        self.video_conference = APIPath(self, "video-conference", None)
-        self.video_conference.jitsi = APIPath(self, "video-conference/jitsi", None)
-        self.video_conference.jitsi.update_timeout = APIPath(self, "video-conference/jitsi.update-timeout", "POST")
-
-        self.webdav = APIPath(self, "webdav", None)
-        self.webdav.getMyAccounts = APIPath(self, "webdav.getMyAccounts")
-        # fmt:on
+        self.user_id = user_id
+        self.auth_token = auth_token
+        self.token_store = token_store
+        self.coalescer = coalescer
+        self.timeout = timeout
+        self.timeouts = dict(timeouts or {})
+        self.hedging = hedging
+        self.circuit_breaker = circuit_breaker
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.codec = get_codec(codec)
+        self.instrumentation = instrumentation
+        self._credentials = {"username": username, "password": password}
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        node_name = ALIASES.get(name, name)
+        try:
+            node = self.endpoints[node_name]
+        except KeyError:
+            raise AttributeError(
+                "{} object has no attribute {}".format(
+                    repr(self.__class__.__name__), repr(name)
+                )
+            ) from None
+        path = self.__dict__.setdefault(
+            node_name, self.path_class._from_node(self, node)
+        )
+        self.__dict__[name] = path
+        return path
+
+    def __dir__(self):
+        return sorted(set(object.__dir__(self)).union(self.endpoints, ALIASES))
+
+    @staticmethod
+    def _create_session(
+        pool_connections: int,
+        pool_maxsize: int,
+        pool_block: bool,
+        max_retries: Union[int, Retry],
+        keep_alive: bool,
+    ) -> requests.Session:
+        """
+        Create a ``requests.Session`` with a pooled HTTP adapter.
+        """
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+            max_retries=max_retries,
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        if not keep_alive:
+            session.headers["Connection"] = "close"
+        return session
+
+    def _send(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Send a request through the pooled session.
+
+        The request's ``timeout`` (the client's by default) is shortened to
+        the current deadline, and the result is recorded by the circuit
+        breaker.
+        """
+        timeout = kwargs.pop("timeout", self.timeout)
+        breaker = self.circuit_breaker
+        if breaker is None:
+            return self._send_limited(method, url, timeout, kwargs)
+        breaker.before(self.url)
+        try:
+            r = self._send_limited(method, url, timeout, kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            breaker.failure()
+            raise
+        breaker.record(r.status_code)
+        return r
+
+    def _send_limited(
+        self, method: str, url: str, timeout: Timeout, kwargs: dict
+    ) -> requests.Response:
+        # Calls to an endpoint share its rate limit, whatever its argument.
+        key = kwargs.pop("rate_key", url)
+        limiter = self.rate_limiter
+        if limiter is None:
+            return self.session.request(
+                method=method, url=url, timeout=bounded(timeout), **kwargs
+            )
+
+        attempt = 0
+        while True:
+            if attempt and isinstance(kwargs.get("data"), MultipartEncoder):
+                kwargs["data"].seek(0)
+            delay = limiter.reserve(key)
+            if delay > 0:
+                check_wait(delay)
+                time.sleep(delay)
+            r = self.session.request(
+                method=method, url=url, timeout=bounded(timeout), **kwargs
+            )
+            limiter.update(key, r.status_code, r.headers)
+            if r.status_code != 429 or attempt >= limiter.max_retries:
+                return r
+            delay = limiter.retry_delay(attempt, r.headers)
+            check_wait(delay)
+            LOG.debug("Rate limited by %s, retrying in %.2fs", url, delay)
+            time.sleep(delay)
+            attempt += 1
+
+    def deadline(self, seconds: float):
+        """
+        Return a context manager giving the calls made within it ``seconds``
+        to complete, see ``rocketchat.timeouts``.
+
+        >>> with api.deadline(2.0):
+        ...     api.users.info(username='bob')
+        """
+        return deadline(seconds)
+
+    def batch(
+        self,
+        calls: Iterable[tuple],
+        max_workers: int = 10,
+        progress: Optional[Callable[[int, Optional[int]], Any]] = None,
+    ) -> "Batch":
+        """
+        Create a ``Batch`` that runs many api calls concurrently.
+
+        >>> calls = [(api.channels.kick, {'roomId': rid, 'userId': uid}) for rid in rooms]
+        >>> for index, result in api.batch(calls, max_workers=20).as_completed():
+        ...     if isinstance(result, RocketChatError):
+        ...         print(rooms[index], result)
+        """
+        from .batch import Batch
+
+        return Batch(calls, max_workers=max_workers, progress=progress)
+
+    def dispatcher(
+        self, workers: int = 4, maxsize: int = 10000, **kwargs
+    ) -> "Dispatcher":
+        """
+        Create a ``Dispatcher`` that sends messages in the background.
+
+        >>> with api.dispatcher(workers=8, overflow='drop_oldest') as dispatcher:
+        ...     dispatcher.post_message(channel='#alerts', text='disk full')
+        """
+        from .dispatch import Dispatcher
+
+        return Dispatcher(self, workers=workers, maxsize=maxsize, **kwargs)
+
+    def close(self):
+        """
+        Close the pooled connections held by this api.
+        """
+        if self._owns_session:
+            self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
 
     def auth_header(self):
         """
@@ -280,12 +346,94 @@ class RocketChat(object):
             "Content-type": "application/json",
         }
 
+    def download(
+        self,
+        url: str,
+        dest,
+        chunk_size: int = CHUNK_SIZE,
+        progress: Optional[Progress] = None,
+    ) -> int:
+        """
+        Download a file from the server (e.g. the ``url`` of a message
+        attachment) to ``dest``, a path or binary file object, without loading
+        it into memory.  Returns the number of bytes written.
+
+        >>> api.download(message['attachments'][0]['title_link'], 'report.pdf')
+        """
+        self._ensure_login()
+        if url.startswith("/"):
+            url = self.url + url
+        headers = self.auth_header()
+        del headers["Content-type"]
+        with self._send("GET", url, headers=headers, stream=True) as r:
+            r.raise_for_status()
+            return stream_to(r, dest, chunk_size, progress)
+
+    def _ensure_login(self):
+        """
+        Login with the stored credentials if this api is not authenticated yet.
+
+        Concurrent callers wait for a single login request.
+        """
+        if self.auth_token is not None or self._credentials["username"] is None:
+            return
+        with self._login_lock:
+            if self.auth_token is None:
+                self._authenticate()
+
+    def _token_key(self) -> str:
+        return "{}|{}".format(self.url, self._credentials["username"])
+
+    def _authenticate(self, stale_token: Optional[str] = None):
+        """
+        Use the token in the token store, unless it is ``stale_token``, or
+        login and store the new token.  Must hold the login lock.
+        """
+        store = self.token_store
+        if store is None:
+            self.login(**self._credentials)
+            return
+        key = self._token_key()
+        with store.lock():
+            stored = store.get(key)
+            if stored is not None and stored["authToken"] != stale_token:
+                self.user_id = stored["userId"]
+                self.auth_token = stored["authToken"]
+                return
+            if stale_token is not None:
+                # Other processes must not pick up the rejected token if this
+                # login fails.
+                store.discard(key, stale_token)
+            self.login(**self._credentials)
+            store.set(key, self.user_id, self.auth_token)
+
+    def _reauthenticate(self, stale_token: Optional[str]) -> bool:
+        """
+        Replace ``stale_token`` after the server rejected it.  Returns True if
+        the rejected call should be retried with the current token.
+
+        Only the first of several threads whose calls were rejected with the
+        same token logs in, the others reuse its new token.
+        """
+        with self._login_lock:
+            if self.auth_token != stale_token:
+                return True
+            if self._credentials["username"] is None:
+                return False
+            LOG.info("Auth token for %s expired, logging in again", self.url)
+            self._authenticate(stale_token)
+            return True
+
     def login(self, **kwargs):
         """
         Authenticate this Rocketchat API.
+
+        Uses the username and password given to the constructor unless other
+        credentials are passed.
         """
+        kwargs = kwargs or self._credentials
         url = self.url + self.api_v1_path + "login"
-        r = requests.post(url, data=kwargs)
+        r = self._send("POST", url, data=kwargs)
         j = r.json()
         if j["status"] != "success":
             raise Exception(j["message"])
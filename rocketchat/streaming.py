@@ -0,0 +1,137 @@
+"""Incremental parsing of large JSON responses.
+
+``iter_items`` yields the items of the array under a top-level key of a JSON
+object while the response body is still being received, so only one item
+(plus one chunk of the body) is held in memory at a time:
+
+>>> for user in iter_items(response.iter_content(65536), 'users'):
+...     print(user['username'])
+
+The other top-level keys of the object (``count``, ``total``, ``error``, ...)
+are collected into the ``rest`` dict passed in, once the array has been read.
+"""
+
+import codecs
+import json
+from typing import Iterable, Iterator, Optional
+
+_WHITESPACE = " \t\n\r"
+_DELIMITERS = _WHITESPACE + ",]}"
+_DECODER = json.JSONDecoder()
+
+
+class _Buffer(object):
+    """
+    Decoded text of a chunked body, read on demand.
+    """
+
+    __slots__ = ("_chunks", "_decoder", "text", "pos", "eof")
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """
+        Read the next chunk.  Returns False at the end of the body.
+        """
+        if self.eof:
+            return False
+        try:
+            chunk = next(self._chunks)
+        except StopIteration:
+            self.eof = True
+            self.text = self.text[self.pos :] + self._decoder.decode(b"", final=True)
+            self.pos = 0
+            return False
+        # Drop the text already parsed so the buffer does not grow.
+        self.text = self.text[self.pos :] + self._decoder.decode(chunk)
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """
+        Skip whitespace and return the next character ("" at the end).
+        """
+        while True:
+            text, pos = self.text, self.pos
+            while pos < len(text) and text[pos] in _WHITESPACE:
+                pos += 1
+            self.pos = pos
+            if pos < len(text):
+                return text[pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, chars: str) -> str:
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError(
+                "Expected one of {} in JSON stream, got {}".format(
+                    repr(chars), repr(char)
+                )
+            )
+        self.pos += 1
+        return char
+
+    def value(self):
+        """
+        Decode the next complete JSON value.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.text, self.pos)
+            except ValueError:
+                if not self.fill():
+                    raise
+                continue
+            # A number is only complete once the character after it is read.
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                if end == len(self.text) or self.text[end] not in _DELIMITERS:
+                    if self.fill():
+                        continue
+            self.pos = end
+            return value
+
+
+def iter_items(
+    chunks: Iterable[bytes], key: str, rest: Optional[dict] = None
+) -> Iterator:
+    """
+    Yield the items of the array under ``key`` in the JSON object streamed as
+    ``chunks`` of bytes.
+
+    Args:
+        chunks: The response body, in chunks of any size.
+        key: Top-level key of the array to stream.
+        rest: If given, the other top-level keys of the object are added to
+            it.  Keys that follow the array are only added once every item
+            has been yielded.
+    """
+    buf = _Buffer(chunks)
+    rest = {} if rest is None else rest
+    buf.expect("{")
+    if buf.peek() == "}":
+        return
+    while True:
+        name = buf.value()
+        if not isinstance(name, str):
+            raise ValueError("Expected an object key in JSON stream")
+        buf.expect(":")
+        if name == key and buf.peek() == "[":
+            buf.pos += 1
+            if buf.peek() == "]":
+                buf.pos += 1
+            else:
+                while True:
+                    yield buf.value()
+                    if buf.expect(",]") == "]":
+                        break
+        else:
+            rest[name] = buf.value()
+        if buf.expect(",}") == "}":
+            return
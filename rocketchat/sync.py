@@ -0,0 +1,299 @@
+"""Incremental, checkpointed sync of room message history.
+
+``HistorySync`` keeps a local archive of room history up to date.  Each room
+has a high-water mark (timestamp and message id of the newest synced message),
+so every run only fetches messages newer than the last one, plus the messages
+edited or deleted since the previous run.
+
+>>> store = SQLiteStore('archive.db')
+>>> HistorySync(api, store, max_workers=8).sync_all()
+"""
+
+import datetime
+import json
+import logging
+import sqlite3
+import threading
+from collections import namedtuple
+from typing import TYPE_CHECKING, Iterable, Iterator, List, Optional, Union
+
+if TYPE_CHECKING:
+    from .rocketchat import RocketChat
+
+LOG = logging.getLogger(__name__)
+
+#: Sync state of a room.  ``ts``/``message_id`` are the high-water mark.  While
+#: a run is walking a room's history (newest to oldest), ``window_ts`` and
+#: ``window_id`` hold the newest message of the run and ``cursor`` how far down
+#: the walk has progressed, so an interrupted run resumes where it stopped.
+Checkpoint = namedtuple(
+    "Checkpoint", "room_id ts message_id window_ts window_id cursor synced_at"
+)
+
+#: Counts of messages written for a room by a sync run.
+SyncResult = namedtuple("SyncResult", "room_id new updated deleted")
+
+#: History endpoint for each room type.
+HISTORY_PATHS = {"c": "channels", "p": "groups", "d": "im"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    room_id TEXT PRIMARY KEY,
+    ts TEXT,
+    message_id TEXT,
+    window_ts TEXT,
+    window_id TEXT,
+    cursor TEXT,
+    synced_at TEXT
+);
+CREATE TABLE IF NOT EXISTS messages (
+    id TEXT PRIMARY KEY,
+    room_id TEXT NOT NULL,
+    ts TEXT,
+    updated_at TEXT,
+    deleted INTEGER NOT NULL DEFAULT 0,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS messages_room_ts ON messages (room_id, ts);
+"""
+
+
+def _isoformat(dt: datetime.datetime) -> str:
+    return dt.replace(tzinfo=None).isoformat(timespec="milliseconds") + "Z"
+
+
+def _now() -> str:
+    return _isoformat(datetime.datetime.now(datetime.timezone.utc))
+
+
+def _timestamp(value) -> Optional[str]:
+    # REST responses use ISO strings, realtime/sync responses {"$date": ms}.
+    if isinstance(value, dict) and "$date" in value:
+        seconds = value["$date"] / 1000.0
+        return _isoformat(
+            datetime.datetime.fromtimestamp(seconds, datetime.timezone.utc)
+        )
+    return value
+
+
+class SQLiteStore(object):
+    """
+    SQLite archive of room messages and sync checkpoints.
+
+    Safe to share between threads.  Messages are upserted by id, so replaying
+    part of a sync after a crash never creates duplicates.
+    """
+
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self):
+        self._conn.close()
+
+    def checkpoint(self, room_id: str) -> Checkpoint:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM checkpoints WHERE room_id = ?", (room_id,)
+            ).fetchone()
+        if row is None:
+            return Checkpoint(room_id, None, None, None, None, None, None)
+        return Checkpoint(*row)
+
+    def save_checkpoint(self, checkpoint: Checkpoint):
+        with self._lock, self._conn:
+            self._save_checkpoint(checkpoint)
+
+    def _save_checkpoint(self, checkpoint: Checkpoint):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?)",
+            checkpoint,
+        )
+
+    def save_messages(
+        self,
+        room_id: str,
+        messages: List[dict],
+        checkpoint: Optional[Checkpoint] = None,
+    ):
+        """
+        Upsert ``messages`` and save ``checkpoint`` in a single transaction.
+        """
+        rows = [
+            (
+                m["_id"],
+                room_id,
+                _timestamp(m.get("ts")),
+                _timestamp(m.get("_updatedAt")),
+                json.dumps(m),
+            )
+            for m in messages
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO messages (id, room_id, ts, updated_at, data) "
+                "VALUES (?, ?, ?, ?, ?) ON CONFLICT(id) DO UPDATE SET "
+                "ts = excluded.ts, updated_at = excluded.updated_at, "
+                "data = excluded.data, deleted = 0",
+                rows,
+            )
+            if checkpoint is not None:
+                self._save_checkpoint(checkpoint)
+
+    def mark_deleted(self, message_ids: Iterable[str]) -> int:
+        """
+        Flag archived messages as deleted.  Returns the number of messages flagged.
+        """
+        with self._lock, self._conn:
+            cursor = self._conn.executemany(
+                "UPDATE messages SET deleted = 1 WHERE id = ? AND deleted = 0",
+                [(i,) for i in message_ids],
+            )
+            return cursor.rowcount
+
+    def messages(self, room_id: str, include_deleted: bool = False) -> Iterator[dict]:
+        """
+        Yield the archived messages of a room, oldest first.
+        """
+        sql = "SELECT data FROM messages WHERE room_id = ?"
+        if not include_deleted:
+            sql += " AND deleted = 0"
+        with self._lock:
+            rows = self._conn.execute(sql + " ORDER BY ts, id", (room_id,)).fetchall()
+        for (data,) in rows:
+            yield json.loads(data)
+
+
+class HistorySync(object):
+    """
+    Incrementally syncs room histories into a store.
+    """
+
+    def __init__(
+        self,
+        api: "RocketChat",
+        store: SQLiteStore,
+        page_size: int = 100,
+        max_workers: int = 4,
+        track_updates: bool = True,
+        clock_skew: float = 60.0,
+    ):
+        """
+        Args:
+            api: The api to read history from.
+            store: Where messages and checkpoints are saved.
+            page_size: Number of messages requested per history page.  Each
+                page is committed to the store together with the sync progress.
+            max_workers: Number of rooms synced at the same time.
+            track_updates: Also fetch messages edited since the last run
+                (with chat.syncMessages).
+            clock_skew: Seconds of overlap between runs when asking for edits
+                and deletions, to allow for clock differences with the server.
+        """
+        self.api = api
+        self.store = store
+        self.page_size = page_size
+        self.max_workers = max_workers
+        self.track_updates = track_updates
+        self.clock_skew = clock_skew
+
+    def _since(self, synced_at: str) -> str:
+        dt = datetime.datetime.strptime(synced_at, "%Y-%m-%dT%H:%M:%S.%fZ")
+        return _isoformat(dt - datetime.timedelta(seconds=self.clock_skew))
+
+    def sync_room(self, room_id: str, room_type: str = "c") -> SyncResult:
+        """
+        Sync the history of a single room.
+
+        ``room_type`` is the RocketChat room type: c (channel), p (private
+        group) or d (direct message).
+        """
+        history = getattr(self.api, HISTORY_PATHS[room_type]).history
+        started_at = _now()
+        cp = self.store.checkpoint(room_id)
+        updated = deleted = 0
+        if cp.synced_at is not None:
+            since = self._since(cp.synced_at)
+            if self.track_updates:
+                changes = self.api.chat.syncMessages(roomId=room_id, lastUpdate=since)
+                # New messages are picked up by the history walk below.
+                messages = [
+                    m
+                    for m in changes.get("updated", [])
+                    if cp.ts is not None and _timestamp(m["ts"]) <= cp.ts
+                ]
+                self.store.save_messages(room_id, messages)
+                updated = len(messages)
+            deleted_ids = (
+                m["_id"]
+                for m in self.api.chat.getDeletedMessages.iter(
+                    roomId=room_id, since=since, page_size=self.page_size
+                )
+            )
+            deleted = self.store.mark_deleted(deleted_ids)
+
+        new = 0
+        params = {"roomId": room_id, "inclusive": "true"}
+        if cp.ts is not None:
+            params["oldest"] = cp.ts
+        if cp.cursor is not None:
+            params["latest"] = cp.cursor
+        window_ts, window_id = cp.window_ts, cp.window_id
+        page = []
+        for message in history.iter(page_size=self.page_size, **params):
+            if message["_id"] == cp.message_id:
+                continue
+            if window_ts is None:
+                window_ts, window_id = _timestamp(message["ts"]), message["_id"]
+            page.append(message)
+            if len(page) >= self.page_size:
+                new += self._save_page(room_id, cp, window_ts, window_id, page)
+                page = []
+        if page:
+            new += self._save_page(room_id, cp, window_ts, window_id, page)
+
+        ts, message_id = cp.ts, cp.message_id
+        if window_ts is not None:
+            ts, message_id = window_ts, window_id
+        self.store.save_checkpoint(
+            Checkpoint(room_id, ts, message_id, None, None, None, started_at)
+        )
+        return SyncResult(room_id, new, updated, deleted)
+
+    def _save_page(self, room_id, cp, window_ts, window_id, page) -> int:
+        cursor = _timestamp(page[-1]["ts"])
+        checkpoint = cp._replace(
+            window_ts=window_ts, window_id=window_id, cursor=cursor
+        )
+        self.store.save_messages(room_id, page, checkpoint)
+        return len(page)
+
+    def sync(
+        self, rooms: Iterable[Union[dict, tuple]]
+    ) -> List[Union[SyncResult, Exception]]:
+        """
+        Sync many rooms concurrently.
+
+        ``rooms`` are room objects (with ``_id`` and ``t``) or
+        ``(room_id, room_type)`` tuples.  Returns a ``SyncResult`` per room, in
+        order, or the exception raised while syncing it.
+        """
+        calls = []
+        for room in rooms:
+            if isinstance(room, dict):
+                room = (room["_id"], room.get("t", "c"))
+            calls.append((self.sync_room, room, {}))
+        results = self.api.batch(calls, max_workers=self.max_workers).results()
+        for result in results:
+            if isinstance(result, Exception):
+                LOG.error("History sync failed: %s", result)
+        return results
+
+    def sync_all(self) -> List[Union[SyncResult, Exception]]:
+        """
+        Sync every room the logged in user belongs to.
+        """
+        rooms = self.api.rooms.get()["update"]
+        return self.sync([r for r in rooms if r.get("t") in HISTORY_PATHS])
@@ -0,0 +1,87 @@
+"""Request timeouts and per-call deadlines.
+
+Every request is sent with a ``(connect, read)`` timeout: the client's
+``timeout``, or the one set for the endpoint in ``timeouts``.
+
+A deadline bounds the total time of everything called within it, including
+every page of ``iter()``, rate limit retries and logins.  Each request's
+timeout is shortened to the time left, and ``DeadlineExceeded`` is raised
+once it has run out:
+
+>>> with deadline(2.5):
+...     users = list(api.users.list.iter())
+
+Deadlines are kept in a context variable, so they apply to the current thread
+or asyncio task (and to the page prefetching of ``iter()``).  Nested deadlines
+can only shorten the current one.
+"""
+
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional, Tuple, Union
+
+from .errors import DeadlineExceeded
+
+#: A timeout in seconds for both connecting and reading, a ``(connect, read)``
+#: tuple, or None to wait forever.
+Timeout = Union[None, float, Tuple[Optional[float], Optional[float]]]
+
+#: Timeout used when none is given to the client.
+DEFAULT_TIMEOUT = (10.0, 60.0)
+
+_DEADLINE = contextvars.ContextVar("rocketchat_deadline", default=None)
+
+
+@contextmanager
+def deadline(seconds: float) -> Iterator[None]:
+    """
+    Give the calls made within the block ``seconds`` to complete.
+    """
+    at = time.monotonic() + seconds
+    current = _DEADLINE.get()
+    if current is not None and current < at:
+        at = current
+    token = _DEADLINE.set(at)
+    try:
+        yield
+    finally:
+        _DEADLINE.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """
+    Return the seconds left before the current deadline, or None if there
+    is no deadline.
+    """
+    at = _DEADLINE.get()
+    if at is None:
+        return None
+    return at - time.monotonic()
+
+
+def bounded(timeout: Timeout) -> Timeout:
+    """
+    Return ``timeout`` shortened to the time left before the current
+    deadline.  Raises ``DeadlineExceeded`` if it has passed.
+    """
+    left = remaining()
+    if left is None:
+        return timeout
+    if left <= 0:
+        raise DeadlineExceeded()
+    if isinstance(timeout, tuple):
+        return tuple(left if t is None else min(t, left) for t in timeout)
+    return left if timeout is None else min(timeout, left)
+
+
+def check_wait(delay: float):
+    """
+    Raise ``DeadlineExceeded`` if waiting ``delay`` seconds would pass the
+    current deadline.
+    """
+    left = remaining()
+    if left is not None and delay >= left:
+        raise DeadlineExceeded(
+            "Deadline exceeded, {:.2f}s left but waiting {:.2f}s".format(left, delay)
+        )
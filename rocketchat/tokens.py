@@ -0,0 +1,168 @@
+"""Auth token storage shared between processes.
+
+With a token store, clients reuse the auth token of an earlier login instead
+of logging in again, and processes starting at the same time wait for a
+single login:
+
+>>> store = FileTokenStore()
+>>> api = RocketChat(url, username, password, token_store=store)
+"""
+
+import json
+import os
+import threading
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Dict, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+DEFAULT_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "rocketchat", "tokens.json"
+)
+
+#: Seconds between attempts to take the lock from a coroutine.
+POLL_INTERVAL = 0.01
+
+
+def _try_flock(f) -> bool:
+    """
+    Take an exclusive lock on ``f`` without blocking.  Returns False if another
+    process holds it.
+    """
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return False
+    return True
+
+
+class FileTokenStore(object):
+    """
+    Stores auth tokens in a JSON file, guarded by an exclusive file lock.
+
+    The file is readable by the current user only.  On platforms without
+    ``fcntl`` the lock only applies within the current process.
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH):
+        """
+        Args:
+            path: Location of the token file.  Its directory is created if
+                needed.
+        """
+        self.path = path
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._lock_file = None
+        # One asyncio.Lock per event loop, as a lock is bound to its loop.
+        self._async_locks = weakref.WeakKeyDictionary()
+
+    @contextmanager
+    def lock(self) -> Iterator[None]:
+        """
+        Hold the store's lock.  Reentrant within a process.
+        """
+        with self._lock:
+            if self._depth == 0:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                self._lock_file = open(self.path + ".lock", "a")
+                if fcntl is not None:
+                    fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._release()
+
+    @asynccontextmanager
+    async def async_lock(self) -> AsyncIterator[None]:
+        """
+        Coroutine version of ``lock()``.
+
+        Waiting for another thread or process to release the lock does not
+        block the event loop, and coroutines of the same loop take the lock
+        one at a time.
+        """
+        import asyncio
+
+        loop = asyncio.get_event_loop()
+        loop_lock = self._async_locks.get(loop)
+        if loop_lock is None:
+            loop_lock = self._async_locks[loop] = asyncio.Lock()
+        async with loop_lock:
+            while not self._lock.acquire(blocking=False):
+                await asyncio.sleep(POLL_INTERVAL)
+            try:
+                if self._depth == 0:
+                    os.makedirs(
+                        os.path.dirname(os.path.abspath(self.path)), exist_ok=True
+                    )
+                    lock_file = open(self.path + ".lock", "a")
+                    try:
+                        while not _try_flock(lock_file):
+                            await asyncio.sleep(POLL_INTERVAL)
+                    except BaseException:
+                        lock_file.close()
+                        raise
+                    self._lock_file = lock_file
+                self._depth += 1
+                try:
+                    yield
+                finally:
+                    self._release()
+            finally:
+                self._lock.release()
+
+    def _release(self):
+        self._depth -= 1
+        if self._depth == 0:
+            # Closing the file releases the lock.
+            self._lock_file.close()
+            self._lock_file = None
+
+    def _read(self) -> Dict[str, dict]:
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _write(self, tokens: Dict[str, dict]):
+        tmp = "{}.{}.tmp".format(self.path, os.getpid())
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump(tokens, f)
+        os.replace(tmp, self.path)
+
+    def get(self, key: str) -> Optional[dict]:
+        """
+        Return the stored ``{"userId": ..., "authToken": ...}`` for ``key``.
+        """
+        return self._read().get(key)
+
+    def set(self, key: str, user_id: str, auth_token: str):
+        with self.lock():
+            tokens = self._read()
+            tokens[key] = {"userId": user_id, "authToken": auth_token}
+            self._write(tokens)
+
+    def discard(self, key: str, auth_token: Optional[str] = None):
+        """
+        Remove the token stored for ``key``, only if it is ``auth_token`` when
+        given (so a token refreshed by another process is kept).
+        """
+        with self.lock():
+            tokens = self._read()
+            stored = tokens.get(key)
+            if stored is None:
+                return
+            if auth_token is not None and stored["authToken"] != auth_token:
+                return
+            del tokens[key]
+            self._write(tokens)
@@ -0,0 +1,91 @@
+import json
+
+import pytest
+from mock import patch
+
+from rocketchat import RocketChat
+
+
+class FakeResponse(object):
+    """
+    Minimal stand-in for ``requests.Response``.
+    """
+
+    def __init__(self, payload=None, status_code=200, headers=None):
+        self.payload = payload if payload is not None else {"success": True}
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.text = json.dumps(self.payload)
+        self.content = self.text.encode("utf-8")
+
+    def json(self):
+        return json.loads(self.text)
+
+
+def ts(i):
+    return "2020-01-01T00:{:02d}:{:02d}.000Z".format(i // 60, i % 60)
+
+
+class FakeHistoryServer(object):
+    """
+    In-memory RocketChat history endpoints.
+    """
+
+    def __init__(self):
+        self.rooms = {"r1": [], "r2": []}
+        self.deleted = []
+        self.updated = []
+        self.fail_after = None
+        self.calls = 0
+
+    def post(self, room_id, i):
+        self.rooms[room_id].append({"_id": "{}-{}".format(room_id, i), "ts": ts(i)})
+
+    def history(self, params):
+        self.calls += 1
+        if self.fail_after is not None and self.calls > self.fail_after:
+            raise ConnectionError("server went away")
+        # Like the server, only the string "true" makes the bounds inclusive.
+        inclusive = params.get("inclusive") == "true"
+        messages = sorted(self.rooms[params["roomId"]], key=lambda m: m["ts"])[::-1]
+        if "oldest" in params:
+            messages = [
+                m
+                for m in messages
+                if m["ts"] > params["oldest"] or inclusive and m["ts"] == params["oldest"]
+            ]
+        if "latest" in params:
+            messages = [
+                m
+                for m in messages
+                if m["ts"] < params["latest"] or inclusive and m["ts"] == params["latest"]
+            ]
+        offset = params.get("offset", 0)
+        return {"messages": messages[offset : offset + params["count"]]}
+
+    def send(self, method, url, params=None, **kwargs):
+        endpoint = url.rsplit("/", 1)[1]
+        if endpoint in ("channels.history", "groups.history"):
+            return FakeResponse(self.history(params))
+        if endpoint == "chat.getDeletedMessages":
+            deleted = [{"_id": i} for i in self.deleted]
+            offset = params["offset"]
+            return FakeResponse({"messages": deleted[offset : offset + params["count"]]})
+        if endpoint == "chat.syncMessages":
+            return FakeResponse({"result": {"updated": self.updated, "deleted": []}})
+        if endpoint == "rooms.get":
+            rooms = [{"_id": "r1", "t": "c"}, {"_id": "r2", "t": "p"}, {"_id": "x", "t": "l"}]
+            return FakeResponse({"update": rooms, "remove": []})
+        raise AssertionError(url)
+
+
+@pytest.fixture
+def offline_api():
+    """
+    A RocketChat instance that never talks to a server.
+    """
+    with patch.object(RocketChat, "login"):
+        api = RocketChat("http://rocket.test")
+    api.user_id = "uid"
+    api.auth_token = "token"
+    return api
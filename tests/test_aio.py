@@ -0,0 +1,268 @@
+import asyncio
+import json
+
+import pytest
+
+aiohttp = pytest.importorskip("aiohttp")
+from aiohttp import web
+
+from rocketchat import AsyncRocketChat, Coalescer, Hedging
+from rocketchat.aio import _encode_params
+from rocketchat.errors import RocketChatError
+
+
+def run_with_server(routes, coro_fn):
+    """
+    Start a local aiohttp server with ``routes`` and run ``coro_fn(url)``.
+    """
+
+    async def main():
+        app = web.Application()
+        app.add_routes(routes)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = runner.addresses[0][1]
+        try:
+            return await coro_fn("http://127.0.0.1:{}".format(port))
+        finally:
+            await runner.cleanup()
+
+    return asyncio.run(main())
+
+
+async def login(request):
+    form = await request.post()
+    assert form["username"] == "bob"
+    return web.json_response(
+        {"status": "success", "data": {"userId": "u1", "authToken": "t1"}}
+    )
+
+
+async def users_info(request):
+    assert request.headers["X-Auth-Token"] == "t1"
+    if request.query["username"] == "missing":
+        return web.json_response({"success": False, "error": "nope", "errorType": "e"})
+    return web.json_response({"user": {"username": request.query["username"]}})
+
+
+async def channels_create(request):
+    body = await request.json()
+    return web.json_response({"channel": {"name": body["name"]}})
+
+
+async def settings_get(request):
+    return web.json_response({"_id": request.match_info["name"], "value": 1})
+
+
+ROUTES = [
+    web.post("/api/v1/login", login),
+    web.get("/api/v1/users.info", users_info),
+    web.post("/api/v1/channels.create", channels_create),
+    web.get("/api/v1/settings/{name}", settings_get),
+]
+
+
+def test_endpoint_tree_mirrors_sync_client():
+    api = AsyncRocketChat("http://rocket.test")
+    assert api.channels.history._path == "channels.history"
+    assert api.channels.history._result_key == "messages"
+    assert api.dm is api.im
+    assert asyncio.iscoroutinefunction(type(api.users.info).__call__)
+
+
+def test_calls_are_awaitable():
+    async def go(url):
+        async with AsyncRocketChat(url, "bob", "secret") as api:
+            users = await asyncio.gather(
+                *[api.users.info(username="user{}".format(i)) for i in range(50)]
+            )
+            channel = await api.channels.create(name="room", readOnly=False)
+            setting = await api.settings.get("Site_Name")
+        return users, channel, setting
+
+    users, channel, setting = run_with_server(ROUTES, go)
+    assert [u["username"] for u in users] == ["user{}".format(i) for i in range(50)]
+    assert channel == {"name": "room"}
+    assert setting == {"_id": "Site_Name", "value": 1}
+
+
+def test_errors_raise_rocketchat_error():
+    async def go(url):
+        async with AsyncRocketChat(url, "bob", "secret") as api:
+            await api.users.info(username="missing")
+
+    with pytest.raises(RocketChatError) as excinfo:
+        run_with_server(ROUTES, go)
+    assert excinfo.value.errorType == "e"
+
+
+def test_invalid_endpoint():
+    api = AsyncRocketChat("http://rocket.test")
+    with pytest.raises(ValueError):
+        asyncio.run(api.users())
+
+
+def test_upload_streams_multipart_body(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_bytes(b"z" * 300000)
+
+    async def rooms_upload(request):
+        assert request.headers["Content-Length"] == str(request.content_length)
+        form = await request.post()
+        upload = form["file"]
+        return web.json_response(
+            {
+                "message": {
+                    "rid": request.match_info["rid"],
+                    "msg": form["msg"],
+                    "name": upload.filename,
+                    "size": len(upload.file.read()),
+                }
+            }
+        )
+
+    async def go(url):
+        async with AsyncRocketChat(url, "bob", "secret") as api:
+            return await api.rooms.upload("GENERAL", file=str(path), msg="hi")
+
+    routes = ROUTES + [web.post("/api/v1/rooms.upload/{rid}", rooms_upload)]
+    result = run_with_server(routes, go)
+    assert result["message"] == {
+        "rid": "GENERAL",
+        "msg": "hi",
+        "name": "notes.txt",
+        "size": 300000,
+    }
+
+
+def test_raw_and_codec():
+    async def go(url):
+        async with AsyncRocketChat(url, "bob", "secret", codec="auto") as api:
+            raw = await api.users.info.raw(username="alice")
+            channel = await api.channels.create(name="room")
+            return raw, channel
+
+    raw, channel = run_with_server(ROUTES, go)
+    assert json.loads(raw) == {"user": {"username": "alice"}}
+    assert channel == {"name": "room"}
+
+
+def test_instrumentation():
+    from rocketchat import Instrumentation
+
+    instrumentation = Instrumentation()
+
+    async def go(url):
+        async with AsyncRocketChat(
+            url, "bob", "secret", instrumentation=instrumentation
+        ) as api:
+            await api.users.info(username="alice")
+            with pytest.raises(RocketChatError):
+                await api.users.info(username="missing")
+
+    run_with_server(ROUTES, go)
+    info = instrumentation.metrics.snapshot()["users.info"]
+    assert info["calls"] == 2
+    assert info["errors"] == {"e": 1}
+    assert info["bytes_received"] > 0
+
+
+def test_expired_token_relogin():
+    async def me(request):
+        if request.headers["X-Auth-Token"] != "t1":
+            return web.json_response({"status": "error"}, status=401)
+        return web.json_response({"username": "bob", "success": True})
+
+    async def go(url):
+        async with AsyncRocketChat(
+            url, "bob", "secret", auth_token="stale", user_id="u1"
+        ) as api:
+            results = await asyncio.gather(*[api.me() for _ in range(5)])
+            return api.auth_token, results
+
+    token, results = run_with_server(ROUTES + [web.get("/api/v1/me", me)], go)
+    assert token == "t1"
+    assert [r["username"] for r in results] == ["bob"] * 5
+
+
+def test_coalesced_calls():
+    requests = []
+
+    async def slow_info(request):
+        requests.append(request.query["username"])
+        await asyncio.sleep(0.05)
+        return await users_info(request)
+
+    async def go(url):
+        async with AsyncRocketChat(url, "bob", "secret", coalescer=Coalescer()) as api:
+            calls = [api.users.info(username="alice") for _ in range(5)]
+            calls.append(api.users.info(username="carol"))
+            return await asyncio.gather(*calls), api.coalescer.stats()
+
+    routes = [
+        web.post("/api/v1/login", login),
+        web.get("/api/v1/users.info", slow_info),
+    ]
+    results, stats = run_with_server(routes, go)
+    assert [r["username"] for r in results] == ["alice"] * 5 + ["carol"]
+    assert sorted(requests) == ["alice", "carol"]
+    assert stats["coalesced"] == 4
+
+
+def test_hedged_requests():
+    hedging = Hedging(min_samples=10, min_delay=0.01, max_delay=0.02)
+    slow = asyncio.Event()
+    requests = []
+
+    async def hedged_info(request):
+        requests.append(request.query["username"])
+        if slow.is_set() and len(requests) % 2:
+            await asyncio.sleep(0.5)
+        return await users_info(request)
+
+    async def go(url):
+        async with AsyncRocketChat(url, "bob", "secret", hedging=hedging) as api:
+            for _ in range(10):
+                await api.users.info(username="alice")
+            assert hedging.stats()["hedged"] == 0
+
+            slow.set()
+            requests.clear()
+            start = asyncio.get_running_loop().time()
+            user = await api.users.info(username="carol")
+            return user, asyncio.get_running_loop().time() - start
+
+    routes = [
+        web.post("/api/v1/login", login),
+        web.get("/api/v1/users.info", hedged_info),
+    ]
+    user, elapsed = run_with_server(routes, go)
+    assert user == {"username": "carol"}
+    assert elapsed < 0.4
+    assert requests == ["carol", "carol"]
+    stats = hedging.stats()
+    assert (stats["hedged"], stats["hedge_wins"]) == (1, 1)
+
+
+def test_sync_only_features_raise_type_error():
+    api = AsyncRocketChat("http://rocket.test", timeouts={"users.list": 5})
+    assert api.timeouts == {"users.list": 5}
+    for call in (
+        api.batch,
+        api.download,
+        api.users.list.stream,
+        api.users.info.download,
+    ):
+        with pytest.raises(TypeError):
+            call()
+
+
+def test_encode_params():
+    params = {"inclusive": True, "unreads": False, "count": 5, "x": None}
+    assert _encode_params(params) == [
+        ("inclusive", "true"),
+        ("unreads", "false"),
+        ("count", "5"),
+    ]
@@ -0,0 +1,83 @@
+import threading
+import time
+from concurrent.futures import CancelledError
+
+import pytest
+from mock import patch
+
+from rocketchat.errors import RocketChatError
+
+from conftest import FakeResponse
+
+
+def fake_users_info(method, url, params=None, **kwargs):
+    time.sleep(0.01)
+    if params["username"].startswith("bad"):
+        return FakeResponse({"error": "no user", "errorType": "error-invalid-user"})
+    return FakeResponse({"user": {"username": params["username"]}})
+
+
+def test_results_in_input_order(offline_api):
+    names = ["user{}".format(i) for i in range(40)] + ["bad"]
+    calls = [(offline_api.users.info, {"username": n}) for n in names]
+    progress = []
+    with patch.object(offline_api, "_send", side_effect=fake_users_info):
+        results = offline_api.batch(
+            calls, max_workers=8, progress=lambda *a: progress.append(a)
+        ).results()
+
+    assert [r["username"] for r in results[:-1]] == names[:-1]
+    assert isinstance(results[-1], RocketChatError)
+    assert results[-1].errorType == "error-invalid-user"
+    assert progress[-1] == (41, 41)
+
+
+def test_runs_concurrently(offline_api):
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def send(*args, **kwargs):
+        with lock:
+            running.append(1)
+            peak.append(len(running))
+        try:
+            return fake_users_info(*args, **kwargs)
+        finally:
+            with lock:
+                running.pop()
+
+    calls = ((offline_api.users.info, {"username": str(i)}) for i in range(50))
+    with patch.object(offline_api, "_send", side_effect=send):
+        completed = list(offline_api.batch(calls, max_workers=5).as_completed())
+
+    assert sorted(index for index, _ in completed) == list(range(50))
+    assert max(peak) <= 5
+    assert max(peak) > 1
+
+
+def test_positional_args(offline_api):
+    with patch.object(offline_api, "_send", return_value=FakeResponse({"value": 1})):
+        results = offline_api.batch([(offline_api.settings.get, ("Site_Name",), {})])
+        assert results.results() == [{"value": 1}]
+
+
+def test_cancel(offline_api):
+    calls = [(offline_api.users.info, {"username": str(i)}) for i in range(100)]
+    batch = offline_api.batch(
+        calls, max_workers=2, progress=lambda done, total: done == 5 and batch.cancel()
+    )
+    with patch.object(offline_api, "_send", side_effect=fake_users_info) as send:
+        results = batch.results()
+
+    assert len(results) == 100
+    assert send.call_count < 20
+    assert isinstance(results[-1], CancelledError)
+    assert batch.completed == send.call_count
+
+
+def test_batch_runs_once(offline_api):
+    batch = offline_api.batch([])
+    assert batch.results() == []
+    with pytest.raises(RuntimeError):
+        batch.results()
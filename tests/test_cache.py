@@ -0,0 +1,126 @@
+import time
+
+import pytest
+from mock import patch
+
+from rocketchat import ResponseCache, RocketChat
+from rocketchat.errors import RocketChatError
+
+from conftest import FakeResponse
+
+
+def make_api(cache):
+    with patch.object(RocketChat, "login"):
+        return RocketChat("http://rocket.test", cache=cache)
+
+
+def fake_send(method, url, params=None, data=None, **kwargs):
+    if url.endswith("users.info"):
+        return FakeResponse({"user": {"username": params["username"]}})
+    if url.endswith("channels.info"):
+        return FakeResponse({"channel": {"name": params["roomName"]}})
+    if url.endswith("channels.history"):
+        return FakeResponse({"messages": []})
+    return FakeResponse({"channel": {"name": "renamed"}})
+
+
+def test_cache_hits_and_misses():
+    api = make_api(ResponseCache())
+    with patch.object(api, "_send", side_effect=fake_send) as send:
+        first = api.users.info(username="bob")
+        first["mutated"] = True
+        assert api.users.info(username="bob") == {"username": "bob"}
+        api.users.info(username="alice")
+        api.channels.info(roomName="general")
+        api.channels.history(roomId="r1")
+        api.channels.history(roomId="r1")
+        # Uncached reads do not invalidate the cached reads of their namespace.
+        api.channels.info(roomName="general")
+    assert send.call_count == 5
+    stats = api.cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (2, 3, 3)
+    assert stats["invalidations"] == 0
+
+
+def test_key_ignores_argument_order():
+    assert ResponseCache.key("a", (), {"x": 1, "y": 2}) == ResponseCache.key(
+        "a", (), {"y": 2, "x": 1}
+    )
+
+
+def test_key_includes_server_and_user():
+    key = ResponseCache.key("me", (), {}, "http://a.test", "u1")
+    assert key != ResponseCache.key("me", (), {}, "http://a.test", "u2")
+    assert key != ResponseCache.key("me", (), {}, "http://b.test", "u1")
+
+
+def test_shared_cache_is_not_shared_between_users():
+    cache = ResponseCache()
+    bob, alice = make_api(cache), make_api(cache)
+    bob.user_id, alice.user_id = "bob", "alice"
+    with patch.object(bob, "_send", side_effect=fake_send) as bob_send:
+        bob.users.info(username="carol")
+    with patch.object(alice, "_send", side_effect=fake_send) as alice_send:
+        alice.users.info(username="carol")
+    assert bob_send.call_count == alice_send.call_count == 1
+
+
+def test_first_read_is_cached_under_the_logged_in_user():
+    def send(method, url, params=None, data=None, headers=None, **kwargs):
+        if url.endswith("/login"):
+            user = data["username"]
+            auth = {"userId": user, "authToken": user + "-token"}
+            return FakeResponse({"status": "success", "data": auth})
+        if headers["X-Auth-Token"] != "alice-token":
+            return FakeResponse({"success": False, "error": "no access"})
+        return FakeResponse({"group": {"name": params["roomName"]}})
+
+    cache = ResponseCache(ttls={"groups.info": 60})
+    alice = RocketChat("http://rocket.test", "alice", "secret", cache=cache)
+    bob = RocketChat("http://rocket.test", "bob", "secret", cache=cache)
+    with patch.object(alice, "_send", side_effect=send) as alice_send:
+        assert alice.groups.info(roomName="secret")["group"] == {"name": "secret"}
+        assert alice.groups.info(roomName="secret")["group"] == {"name": "secret"}
+    with patch.object(bob, "_send", side_effect=send):
+        with pytest.raises(RocketChatError):
+            bob.groups.info(roomName="secret")
+    # One login and one read for alice, the second read is a cache hit.
+    assert alice_send.call_count == 2
+    assert cache.stats()["hits"] == 1
+
+
+def test_writes_invalidate_namespace():
+    api = make_api(ResponseCache())
+    with patch.object(api, "_send", side_effect=fake_send) as send:
+        api.channels.info(roomName="general")
+        api.users.info(username="bob")
+        api.channels.rename(roomId="r1", name="renamed")
+        api.channels.info(roomName="general")
+        api.users.info(username="bob")
+    assert send.call_count == 4
+    assert api.cache.stats()["invalidations"] == 1
+
+
+def test_ttl_and_lru():
+    cache = ResponseCache(maxsize=2, ttls={"users.info": 0.05})
+    api = make_api(cache)
+    with patch.object(api, "_send", side_effect=fake_send) as send:
+        api.users.info(username="a")
+        time.sleep(0.1)
+        api.users.info(username="a")
+        assert send.call_count == 2
+
+        api.users.info(username="b")
+        api.users.info(username="c")
+        assert cache.stats()["evictions"] == 1
+        api.users.info(username="a")
+        assert send.call_count == 5
+
+
+def test_invalidation_during_read_is_not_cached():
+    cache = ResponseCache()
+    key = cache.key("channels.info", (), {"roomName": "general"})
+    generation = cache.generation("channels.info")
+    cache.invalidate("channels.rename")
+    cache.set(key, {"channel": {}}, generation)
+    assert cache.get(key) is None
@@ -0,0 +1,107 @@
+import threading
+import time
+
+import pytest
+
+from rocketchat import Coalescer, ResponseCache
+from rocketchat.errors import RocketChatError
+
+from conftest import FakeResponse
+
+
+class SlowServer(object):
+    def __init__(self, payload=None):
+        self.payload = payload or {"user": {"username": "bob"}, "success": True}
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def send(self, method, url, **kwargs):
+        with self.lock:
+            self.requests += 1
+        time.sleep(0.1)
+        return FakeResponse(self.payload)
+
+
+def run_threads(count, target):
+    results = [None] * count
+
+    def run(i):
+        try:
+            results[i] = target()
+        except Exception as exc:
+            results[i] = exc
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+@pytest.fixture
+def api(offline_api):
+    offline_api.coalescer = Coalescer()
+    return offline_api
+
+
+def test_identical_calls_share_a_request(api):
+    server = SlowServer()
+    api._send = server.send
+    results = run_threads(10, lambda: api.users.info(username="bob"))
+
+    assert server.requests == 1
+    assert all(r == {"username": "bob"} for r in results)
+    # Every caller gets its own copy.
+    assert len({id(r) for r in results}) == 10
+    stats = api.coalescer.stats()
+    assert stats["calls"] == 10
+    assert stats["requests"] == 1
+    assert stats["coalesced"] == 9
+    assert stats["in_flight"] == 0
+
+
+def test_errors_are_shared(api):
+    server = SlowServer({"success": False, "error": "nope", "errorType": "e"})
+    api._send = server.send
+    results = run_threads(5, lambda: api.users.info(username="bob"))
+    assert server.requests == 1
+    assert all(isinstance(r, RocketChatError) for r in results)
+    assert api.coalescer.stats()["coalesced_errors"] == 4
+
+
+def test_only_identical_gets_on_enabled_paths(api):
+    server = SlowServer()
+    api._send = server.send
+    run_threads(4, lambda: api.users.info(username="bob"))
+    run_threads(4, lambda: api.users.info(username="alice"))
+    assert server.requests == 2
+
+    server.requests = 0
+    run_threads(4, lambda: api.chat.postMessage(channel="#general", text="hi"))
+    run_threads(4, lambda: api.users.list())
+    assert server.requests == 8
+
+    api.coalescer.paths.add("users.list")
+    server.requests = 0
+    run_threads(4, lambda: api.users.list())
+    assert server.requests == 1
+
+
+def test_sequential_calls_are_not_shared(api):
+    server = SlowServer()
+    api._send = server.send
+    api.users.info(username="bob")
+    api.users.info(username="bob")
+    assert server.requests == 2
+
+
+def test_uncached_gets_are_coalesced_with_a_cache(api):
+    api.cache = ResponseCache()
+    server = SlowServer({"subscription": {"rid": "r1"}, "success": True})
+    api._send = server.send
+    results = run_threads(5, lambda: api.subscriptions.getOne(roomId="r1"))
+    assert server.requests == 1
+    assert all(r["subscription"] == {"rid": "r1"} for r in results)
+    assert api.coalescer.stats()["coalesced"] == 4
+    assert api.cache.stats()["size"] == 0
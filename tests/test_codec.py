@@ -0,0 +1,66 @@
+import json
+
+import pytest
+from mock import patch
+
+from conftest import FakeResponse
+from rocketchat import RocketChat
+from rocketchat.codec import JSONCodec, get_codec
+from rocketchat.errors import RocketChatError
+
+
+def test_get_codec():
+    assert get_codec().name == "json"
+    assert get_codec("auto").name in ("orjson", "ujson", "json")
+    codec = JSONCodec()
+    assert get_codec(codec) is codec
+    with pytest.raises(ValueError):
+        get_codec("yaml")
+
+
+@pytest.mark.parametrize("name", ["json", "orjson"])
+def test_codec_round_trip(offline_api, name):
+    if name != "json":
+        pytest.importorskip(name)
+    offline_api.codec = get_codec(name)
+    payload = {"channel": {"name": "général", "_id": "c1"}, "success": True}
+    with patch.object(offline_api, "_send", return_value=FakeResponse(payload)) as send:
+        channel = offline_api.channels.create(name="général", members=["a"])
+    assert channel == payload["channel"]
+    body = send.call_args[1]["data"]
+    assert json.loads(body) == {"name": "général", "members": ["a"]}
+
+
+def test_custom_codec_is_used():
+    class CountingCodec(JSONCodec):
+        calls = 0
+
+        def loads(self, data):
+            CountingCodec.calls += 1
+            return super(CountingCodec, self).loads(data)
+
+    with patch.object(RocketChat, "login"):
+        api = RocketChat("http://rocket.test", codec=CountingCodec())
+    api.auth_token = "token"
+    with patch.object(api, "_send", return_value=FakeResponse({"success": True})):
+        api.me()
+    assert CountingCodec.calls == 1
+
+
+def test_raw_returns_undecoded_body(offline_api):
+    response = FakeResponse({"users": [{"_id": "u1"}], "success": True})
+    with patch.object(offline_api, "_send", return_value=response):
+        with patch.object(offline_api.codec, "loads") as loads:
+            assert offline_api.users.list.raw(count=10) == response.content
+    loads.assert_not_called()
+
+
+def test_raw_raises_api_errors(offline_api):
+    response = FakeResponse(
+        {"success": False, "error": "Not allowed", "errorType": "error-not-allowed"},
+        status_code=403,
+    )
+    with patch.object(offline_api, "_send", return_value=response):
+        with pytest.raises(RocketChatError) as exc_info:
+            offline_api.users.list.raw()
+    assert exc_info.value.errorType == "error-not-allowed"
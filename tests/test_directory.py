@@ -0,0 +1,128 @@
+import json
+from urllib.parse import urlsplit
+
+import pytest
+
+from conftest import FakeResponse
+from rocketchat.directory import Directory
+
+
+class FakeServer(object):
+    def __init__(self):
+        self.users = [
+            {"_id": "u{}".format(i), "username": "user{}".format(i), "name": "U"}
+            for i in range(250)
+        ]
+        self.users.append({"_id": "me", "username": "bot", "name": "Bot"})
+        self.channels = [{"_id": "c1", "name": "general", "t": "c"}]
+        self.groups = [{"_id": "g1", "name": "secret", "t": "p"}]
+        self.rooms = {
+            "update": [
+                {"_id": "c1", "name": "general", "t": "c"},
+                {"_id": "d1", "t": "d", "usernames": ["bot", "user1"]},
+            ],
+            "remove": [],
+        }
+        self.groups_forbidden = False
+        self.requests = []
+
+    def send(self, method, url, params=None, data=None, **kwargs):
+        path = urlsplit(url).path.rsplit("/", 1)[1]
+        params = params or {}
+        self.requests.append((path, params))
+        if path == "users.list":
+            return self.page("users", self.users, params)
+        if path == "channels.list":
+            return self.page("channels", self.channels, params)
+        if path == "groups.listAll":
+            if self.groups_forbidden:
+                return FakeResponse(
+                    {"success": False, "error": "unauthorized", "errorType": "e"}
+                )
+            return self.page("groups", self.groups, params)
+        if path == "rooms.get":
+            return FakeResponse(dict(self.rooms, success=True))
+        if path == "im.create":
+            username = json.loads(data)["username"]
+            room = {"_id": "d-" + username, "rid": "d-" + username, "t": "d"}
+            return FakeResponse({"room": room, "success": True})
+        raise AssertionError(path)
+
+    def page(self, key, items, params):
+        assert "fields" in params
+        offset, count = params["offset"], params["count"]
+        page = items[offset : offset + count]
+        return FakeResponse({key: page, "total": len(items), "success": True})
+
+
+@pytest.fixture
+def server(offline_api):
+    server = FakeServer()
+    offline_api._credentials["username"] = "bot"
+    offline_api._send = server.send
+    return server
+
+
+def test_load_and_lookup(offline_api, server):
+    directory = Directory(offline_api, page_size=100)
+    directory.load()
+    assert directory.user_id("user42") == "u42"
+    assert directory.username("u42") == "user42"
+    assert directory.user(user_id="u7").username == "user7"
+    assert directory.room_id("general") == "c1"
+    assert directory.room_id("#secret") == "g1"
+    assert directory.room(room_id="d1").type == "d"
+    assert directory.room() is None
+    assert directory.user() is None
+    assert directory.direct_room_id("user1") == "d1"
+    assert directory.direct_room_id("bot", create=False) is None
+    assert directory.stats()["users"] == 251
+    assert sum(1 for path, _ in server.requests if path == "users.list") == 3
+
+
+def test_lookups_do_not_hit_server(offline_api, server):
+    directory = Directory(offline_api)
+    directory.load()
+    count = len(server.requests)
+    for i in range(100):
+        directory.user_id("user{}".format(i))
+        directory.room_id("general")
+    assert len(server.requests) == count
+
+
+def test_refresh_is_incremental(offline_api, server):
+    directory = Directory(offline_api)
+    directory.load()
+    loaded_at = directory.loaded_at
+    server.requests = []
+    server.users = [{"_id": "u3", "username": "renamed", "name": "U"}]
+    server.channels = [{"_id": "c2", "name": "random", "t": "c"}]
+    server.rooms = {"update": [], "remove": [{"_id": "c1"}]}
+    directory.refresh()
+
+    queries = {path: params for path, params in server.requests}
+    assert "query" in queries["users.list"]
+    assert "$gt" in json.loads(queries["channels.list"]["query"])["_updatedAt"]
+    assert "updatedSince" in queries["rooms.get"]
+    assert directory.loaded_at > loaded_at
+
+    assert directory.user_id("renamed") == "u3"
+    assert directory.user_id("user3") is None
+    assert directory.user_id("user4") == "u4"
+    assert directory.room_id("random") == "c2"
+    assert directory.room_id("general") is None
+
+
+def test_private_groups_need_permission(offline_api, server):
+    server.groups_forbidden = True
+    directory = Directory(offline_api)
+    directory.load()
+    assert directory.room_id("secret") is None
+    assert directory.private_groups is False
+
+
+def test_direct_room_is_created_once(offline_api, server):
+    directory = Directory(offline_api)
+    assert directory.direct_room_id("user9") == "d-user9"
+    assert directory.direct_room_id("user9") == "d-user9"
+    assert [p for p, _ in server.requests].count("im.create") == 1
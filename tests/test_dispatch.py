@@ -0,0 +1,176 @@
+import json
+import queue
+import threading
+import time
+from collections import defaultdict
+
+import pytest
+from mock import patch
+
+from conftest import FakeResponse
+from rocketchat.dispatch import Dispatcher
+from rocketchat.errors import RocketChatError
+
+
+def recording_send(delay=0.0, fail=()):
+    """
+    A ``_send`` replacement that records the text posted to each room.
+    """
+    posted = defaultdict(list)
+    lock = threading.Lock()
+
+    def send(method, url, **kwargs):
+        body = json.loads(kwargs["data"])
+        if delay:
+            time.sleep(delay)
+        if body["text"] in fail:
+            return FakeResponse({"success": False, "error": "boom", "errorType": "e"})
+        with lock:
+            posted[body["channel"]].append(body["text"])
+        return FakeResponse({"success": True, "message": {}})
+
+    return posted, send
+
+
+def test_keeps_order_per_room(offline_api):
+    posted, send = recording_send()
+    with patch.object(offline_api, "_send", side_effect=send):
+        with offline_api.dispatcher(workers=4) as dispatcher:
+            for i in range(200):
+                for room in ("#a", "#b", "#c"):
+                    dispatcher.post_message(channel=room, text=str(i))
+    expected = [str(i) for i in range(200)]
+    assert posted == {"#a": expected, "#b": expected, "#c": expected}
+    assert dispatcher.stats() == {"queued": 0, "sent": 600, "failed": 0, "dropped": 0}
+
+
+def test_collects_failures(offline_api):
+    errors = []
+    posted, send = recording_send(fail={"bad"})
+    with patch.object(offline_api, "_send", side_effect=send):
+        dispatcher = offline_api.dispatcher(workers=2, on_error=errors.append)
+        dispatcher.post_message(channel="#a", text="good")
+        dispatcher.post_message(channel="#a", text="bad")
+        assert dispatcher.flush(timeout=5)
+        dispatcher.close()
+    assert posted["#a"] == ["good"]
+    assert len(dispatcher.failures) == 1
+    failure = dispatcher.failures[0]
+    assert failure.kwargs == {"channel": "#a", "text": "bad"}
+    assert isinstance(failure.error, RocketChatError)
+    assert errors == [failure]
+    assert dispatcher.failed == 1
+
+
+def blocked_dispatcher(api, **kwargs):
+    """
+    A single worker dispatcher whose worker is stuck on the first call.
+    """
+    release = threading.Event()
+    started = threading.Event()
+    posted, send = recording_send()
+
+    def blocking_send(method, url, **kw):
+        started.set()
+        release.wait(5)
+        return send(method, url, **kw)
+
+    patcher = patch.object(api, "_send", side_effect=blocking_send)
+    patcher.start()
+    dispatcher = api.dispatcher(workers=1, **kwargs)
+    dispatcher.post_message(channel="#a", text="first")
+    assert started.wait(5)
+    return dispatcher, release, posted, patcher
+
+
+@pytest.mark.parametrize(
+    "overflow, expected",
+    [
+        ("drop_new", ["first", "0", "1"]),
+        ("drop_oldest", ["first", "3", "4"]),
+    ],
+)
+def test_drop_policies(offline_api, overflow, expected):
+    dispatcher, release, posted, patcher = blocked_dispatcher(
+        offline_api, maxsize=2, overflow=overflow
+    )
+    try:
+        results = [dispatcher.post_message(channel="#a", text=str(i)) for i in range(5)]
+        assert len(dispatcher) == 2
+        assert dispatcher.dropped == 3
+        assert results == (
+            [True, True, False, False, False] if overflow == "drop_new" else [True] * 5
+        )
+        release.set()
+        dispatcher.close()
+    finally:
+        patcher.stop()
+    assert posted["#a"] == expected
+
+
+def test_block_and_raise_policies(offline_api):
+    dispatcher, release, posted, patcher = blocked_dispatcher(
+        offline_api, maxsize=1, block_timeout=0.05
+    )
+    try:
+        dispatcher.post_message(channel="#a", text="queued")
+        with pytest.raises(queue.Full):
+            dispatcher.post_message(channel="#a", text="late")
+        dispatcher.overflow = "raise"
+        with pytest.raises(queue.Full):
+            dispatcher.post_message(channel="#a", text="late")
+
+        # A blocked producer resumes once a worker frees a slot.
+        dispatcher.overflow = "block"
+        dispatcher.block_timeout = 5
+        threading.Timer(0.05, release.set).start()
+        assert dispatcher.post_message(channel="#a", text="last")
+        dispatcher.close()
+    finally:
+        patcher.stop()
+    assert posted["#a"] == ["first", "queued", "last"]
+
+
+def test_close_without_wait_discards_queue(offline_api):
+    dispatcher, release, posted, patcher = blocked_dispatcher(offline_api)
+    try:
+        for i in range(10):
+            dispatcher.post_message(channel="#a", text=str(i))
+        release.set()
+        dispatcher.close(wait=False)
+    finally:
+        patcher.stop()
+    assert posted["#a"] == ["first"]
+    assert dispatcher.dropped == 10
+    with pytest.raises(RuntimeError):
+        dispatcher.post_message(channel="#a", text="closed")
+
+
+def test_throughput_scales_with_workers(offline_api):
+    def elapsed(workers):
+        posted, send = recording_send(delay=0.01)
+        with patch.object(offline_api, "_send", side_effect=send):
+            start = time.perf_counter()
+            with Dispatcher(offline_api, workers=workers) as dispatcher:
+                for i in range(40):
+                    dispatcher.post_message(channel="#{}".format(i), text="x")
+            return time.perf_counter() - start
+
+    assert elapsed(8) < elapsed(1) / 3
+
+
+def test_rejects_async_api(offline_api):
+    pytest.importorskip("aiohttp")
+    from rocketchat import AsyncRocketChat
+
+    api = AsyncRocketChat("http://rocket.test")
+    with pytest.raises(TypeError):
+        api.dispatcher()
+    with pytest.raises(TypeError):
+        Dispatcher(api)
+
+    # Async calls submitted to a RocketChat dispatcher are never counted as sent.
+    with offline_api.dispatcher(workers=1) as dispatcher:
+        dispatcher.submit(api.chat.postMessage, {"channel": "#a", "text": "hi"})
+    assert (dispatcher.sent, dispatcher.failed) == (0, 1)
+    assert isinstance(dispatcher.failures[0].error, TypeError)
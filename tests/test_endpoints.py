@@ -0,0 +1,112 @@
+import subprocess
+import sys
+import threading
+
+import pytest
+from mock import patch
+
+import rocketchat
+from rocketchat import RocketChat
+from rocketchat.apipath import APIPath
+from rocketchat.endpoints import ENDPOINTS, Endpoint, build_tree
+
+from conftest import FakeResponse
+
+LOGIN = FakeResponse({"status": "success", "data": {"userId": "u1", "authToken": "t1"}})
+
+
+def test_endpoints_are_created_lazily(offline_api):
+    assert "channels" not in offline_api.__dict__
+    joined = offline_api.channels.list.joined
+    assert joined is offline_api.channels.list.joined
+    assert joined._path == "channels.list.joined"
+    assert joined._result_key == "channels"
+    assert "channels" in offline_api.__dict__
+    assert offline_api.dm is offline_api.im
+
+
+def test_every_endpoint_resolves(offline_api):
+    for name, spec in ENDPOINTS.items():
+        path = offline_api
+        for attr in name.split("."):
+            path = getattr(path, attr)
+        assert isinstance(path, APIPath)
+        assert (path._path, path._method) == (spec.path, spec.method)
+
+
+def test_apipath_has_no_instance_dict(offline_api):
+    assert not hasattr(offline_api.users.info, "__dict__")
+
+
+def test_unknown_endpoint(offline_api):
+    with pytest.raises(AttributeError):
+        offline_api.nope
+    with pytest.raises(AttributeError):
+        offline_api.users.nope
+
+
+def test_runtime_child_endpoints(offline_api):
+    offline_api.users.custom = APIPath(offline_api, "users.custom")
+    assert offline_api.users.custom._path == "users.custom"
+    assert "custom" in dir(offline_api.users)
+    assert "channels" in dir(offline_api)
+
+
+def test_build_tree():
+    tree = build_tree({"a": Endpoint("a", None), "a.b": Endpoint("a.b", "POST")})
+    assert tree["a"][1]["b"][0].method == "POST"
+
+
+def test_login_is_deferred_and_single_flight():
+    def send(method, url, **kwargs):
+        if url.endswith("login"):
+            return LOGIN
+        assert kwargs["headers"]["X-Auth-Token"] == "t1"
+        return FakeResponse({"user": {}})
+
+    with patch("requests.Session.request", side_effect=send) as request:
+        api = RocketChat("http://rocket.test", "bob", "secret")
+        assert request.call_count == 0
+
+        threads = [
+            threading.Thread(target=api.users.info, kwargs={"username": "x"})
+            for _ in range(10)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    logins = [c for c in request.call_args_list if c[1]["url"].endswith("login")]
+    assert len(logins) == 1
+    assert request.call_count == 11
+
+
+def test_unauthenticated_endpoint_skips_login():
+    with patch(
+        "requests.Session.request", return_value=FakeResponse({"info": {}})
+    ) as request:
+        api = RocketChat("http://rocket.test", "bob", "secret")
+        api.info()
+    assert request.call_count == 1
+    assert api.auth_token is None
+
+
+def test_optional_modules_are_imported_lazily():
+    code = (
+        "import sys, rocketchat; "
+        "print(' '.join(m for m in sys.modules if m.startswith(('asyncio', 'rocketchat'))))"
+    )
+    modules = subprocess.check_output([sys.executable, "-c", code]).decode().split()
+    assert "asyncio" not in modules
+    for name in ("aio", "pool", "realtime", "hedge", "coalesce", "tokens"):
+        assert "rocketchat." + name not in modules
+
+
+def test_lazy_exports():
+    from rocketchat.ratelimit import RateLimiter
+
+    assert rocketchat.RateLimiter is RateLimiter
+    assert "RocketChatPool" in dir(rocketchat)
+    with pytest.raises(AttributeError):
+        rocketchat.Missing
@@ -0,0 +1,89 @@
+import gzip
+import json
+import os
+
+import pytest
+from mock import patch
+
+from rocketchat import cli
+from rocketchat.export import ExportRoom, RoomExporter
+
+from conftest import FakeHistoryServer, ts
+
+
+@pytest.fixture
+def server(offline_api):
+    server = FakeHistoryServer()
+    for i in range(25):
+        server.post("r1", i)
+        # Messages sharing a timestamp must survive a resume.
+        server.rooms["r1"].append({"_id": "r1-{}b".format(i), "ts": ts(i)})
+    for i in range(3):
+        server.post("r2", i)
+    with patch.object(offline_api, "_send", side_effect=server.send):
+        yield server
+
+
+def read(path):
+    with gzip.open(path, "rt") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_export_rooms(offline_api, server, tmpdir):
+    exporter = RoomExporter(offline_api, str(tmpdir), page_size=7, fields=["_id"])
+    rooms = exporter.rooms()
+    assert rooms == [ExportRoom("r1", "c", None), ExportRoom("r2", "p", None)]
+    results = exporter.export(rooms)
+
+    assert [r.messages for r in results] == [50, 3]
+    messages = read(exporter.path(rooms[0]))
+    assert len({m["_id"] for m in messages}) == 50
+    assert messages[0]["_id"] in ("r1-24", "r1-24b")
+    assert read(exporter.path(rooms[1])) == [
+        {"_id": "r2-2"},
+        {"_id": "r2-1"},
+        {"_id": "r2-0"},
+    ]
+    assert sorted(os.listdir(str(tmpdir))) == ["c-r1.ndjson.gz", "p-r2.ndjson.gz"]
+    assert exporter.stats.messages == 53
+    assert exporter.stats.rooms == 2
+
+
+def test_date_range(offline_api, server, tmpdir):
+    exporter = RoomExporter(offline_api, str(tmpdir), oldest=ts(10), latest=ts(12))
+    exporter.export_room(("r1", "c", "general"))
+    messages = read(exporter.path(ExportRoom("r1", "c", None)))
+    assert {m["ts"] for m in messages} == {ts(10), ts(11), ts(12)}
+    assert len(messages) == 6
+
+
+def test_resume_after_interruption(offline_api, server, tmpdir):
+    exporter = RoomExporter(offline_api, str(tmpdir), page_size=7)
+    room = ExportRoom("r1", "c", None)
+    server.fail_after = 3
+    with pytest.raises(ConnectionError):
+        exporter.export_room(room)
+    assert os.path.exists(exporter.path(room) + ".state")
+
+    # Simulate a crash half way through writing a page.
+    with open(exporter.path(room), "ab") as f:
+        f.write(gzip.compress(b'{"_id": "partial"}\n')[:10])
+
+    server.fail_after = None
+    result = exporter.export_room(room)
+    assert not os.path.exists(exporter.path(room) + ".state")
+    ids = [m["_id"] for m in read(exporter.path(room))]
+    assert len(ids) == len(set(ids)) == 50
+    assert result.messages < 50
+
+    calls = server.calls
+    assert exporter.export_room(room).skipped
+    assert server.calls == calls
+
+
+def test_cli_export(offline_api, server, tmpdir, capsys):
+    with patch.object(cli, "_connect", return_value=offline_api):
+        code = cli.main(["export", str(tmpdir), "--types", "c", "--progress", "0"])
+    assert code == 0
+    assert os.listdir(str(tmpdir)) == ["c-r1.ndjson.gz"]
+    assert "1 rooms (0 skipped, 0 failed), 50 messages" in capsys.readouterr().out
@@ -0,0 +1,183 @@
+import io
+import mmap
+
+import pytest
+from mock import patch
+
+from conftest import FakeResponse
+from rocketchat.files import MultipartEncoder, multipart_body, open_upload
+
+
+def expected_body(boundary, fields, name, filename, content_type, data):
+    body = b""
+    for key, value in fields.items():
+        body += (
+            '--{}\r\nContent-Disposition: form-data; name="{}"\r\n\r\n{}\r\n'.format(
+                boundary, key, value
+            ).encode("utf-8")
+        )
+    body += (
+        '--{}\r\nContent-Disposition: form-data; name="{}"; filename="{}"\r\n'
+        "Content-Type: {}\r\n\r\n".format(boundary, name, filename, content_type)
+    ).encode("utf-8")
+    return body + data + b"\r\n--" + boundary.encode("ascii") + b"--\r\n"
+
+
+@pytest.fixture
+def upload_file(tmp_path):
+    path = tmp_path / "report.txt"
+    path.write_bytes(b"x" * 200000)
+    return path
+
+
+def test_encoder_matches_multipart_format(upload_file):
+    data = upload_file.read_bytes()
+    expected = expected_body(
+        "b0und", {"msg": "hello"}, "file", "report.txt", "text/plain", data
+    )
+    sources = [
+        open(str(upload_file), "rb"),
+        ("report.txt", io.BytesIO(data), "text/plain"),
+    ]
+    for source in sources:
+        if isinstance(source, tuple):
+            filename, fileobj, content_type = source
+        else:
+            filename, fileobj, content_type, _ = open_upload(source)
+        with MultipartEncoder(
+            {"msg": "hello"},
+            {"file": (filename, fileobj, content_type)},
+            boundary="b0und",
+            owned_files=[fileobj],
+        ) as encoder:
+            assert len(encoder) == len(expected)
+            assert encoder.read() == expected
+        assert fileobj.closed
+
+
+def test_encoder_reads_mmap_in_chunks(upload_file):
+    with open(str(upload_file), "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    expected = expected_body(
+        "b0und", {}, "file", "data.bin", "application/octet-stream", mapped[:]
+    )
+    progress = []
+    encoder = MultipartEncoder(
+        {},
+        {"file": ("data.bin", mapped, "application/octet-stream")},
+        progress=lambda done, total: progress.append((done, total)),
+        boundary="b0und",
+    )
+    chunks = iter(lambda: encoder.read(4096), b"")
+    assert b"".join(chunks) == expected
+    assert progress[-1] == (len(expected), len(expected))
+    assert all(done <= total for done, total in progress)
+
+    # Rewinding replays the same body, as needed to retry a request.
+    encoder.seek(0)
+    assert encoder.read() == expected
+    mapped.close()
+
+
+def test_multipart_body_requires_file():
+    with pytest.raises(TypeError):
+        multipart_body({"msg": "hi"}, "file")
+
+
+def test_upload_streams_file(offline_api, upload_file):
+    sent = {}
+    progress = []
+
+    def send(method, url, **kwargs):
+        body = kwargs["data"]
+        sent.update(kwargs, method=method, url=url, body=body.read())
+        return FakeResponse({"success": True, "message": {"_id": "m1"}})
+
+    with patch.object(offline_api, "_send", side_effect=send):
+        result = offline_api.rooms.upload(
+            "GENERAL",
+            file=str(upload_file),
+            msg="hello",
+            progress=lambda done, total: progress.append(done),
+        )
+
+    assert result["message"]["_id"] == "m1"
+    assert sent["method"] == "POST"
+    assert sent["url"].endswith("/api/v1/rooms.upload/GENERAL")
+    content_type = sent["headers"]["Content-type"]
+    assert content_type.startswith("multipart/form-data; boundary=")
+    assert sent["headers"]["X-Auth-Token"] == "token"
+    boundary = content_type.split("=", 1)[1]
+    assert sent["body"] == expected_body(
+        boundary,
+        {"msg": "hello"},
+        "file",
+        "report.txt",
+        "text/plain",
+        upload_file.read_bytes(),
+    )
+    assert progress[-1] == len(sent["body"])
+    assert sent["data"].closed
+
+
+class StreamedResponse(FakeResponse):
+    def __init__(self, content, status_code=200):
+        super(StreamedResponse, self).__init__(status_code=status_code)
+        self.body = content
+        self.headers = {"Content-Length": str(len(content))}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise IOError(self.status_code)
+
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.body), chunk_size):
+            yield self.body[i : i + chunk_size]
+
+
+def test_download_to_path(offline_api, tmp_path):
+    content = b"y" * 100000
+    dest = tmp_path / "file.bin"
+    progress = []
+    response = StreamedResponse(content)
+    with patch.object(offline_api, "_send", return_value=response) as send:
+        written = offline_api.download(
+            "/file-upload/abc/file.bin",
+            str(dest),
+            chunk_size=4096,
+            progress=lambda done, total: progress.append((done, total)),
+        )
+
+    assert written == len(content)
+    assert dest.read_bytes() == content
+    assert progress[-1] == (len(content), len(content))
+    args, kwargs = send.call_args
+    assert args == ("GET", "http://rocket.test/file-upload/abc/file.bin")
+    assert kwargs["stream"] is True
+    assert "Content-type" not in kwargs["headers"]
+
+
+def test_failed_download_leaves_no_file(offline_api, tmp_path):
+    dest = tmp_path / "file.bin"
+    with patch.object(
+        offline_api, "_send", return_value=StreamedResponse(b"", status_code=404)
+    ):
+        with pytest.raises(IOError):
+            offline_api.download("/file-upload/abc/file.bin", str(dest))
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_endpoint_download(offline_api):
+    dest = io.BytesIO()
+    with patch.object(
+        offline_api, "_send", return_value=StreamedResponse(b"png")
+    ) as send:
+        assert offline_api.users.getAvatar.download(dest, username="bob") == 3
+    assert dest.getvalue() == b"png"
+    assert send.call_args[1]["params"] == {"username": "bob"}
@@ -0,0 +1,97 @@
+import pytest
+from mock import patch
+
+from conftest import FakeResponse
+from rocketchat import Instrumentation, RocketChat
+from rocketchat.errors import RocketChatError
+from rocketchat.metrics import Metrics
+
+
+@pytest.fixture
+def instrumented_api(offline_api):
+    offline_api.instrumentation = Instrumentation(Metrics(buckets=(0.1, 1.0)))
+    return offline_api
+
+
+def test_records_calls_errors_and_bytes(instrumented_api):
+    api = instrumented_api
+    ok = FakeResponse({"user": {"_id": "u1"}, "success": True})
+    error = FakeResponse(
+        {"success": False, "error": "No user", "errorType": "error-invalid-user"},
+        status_code=400,
+    )
+    with patch.object(api, "_send", side_effect=[ok, ok, error]):
+        api.users.info(username="a")
+        api.users.info(username="b")
+        with pytest.raises(RocketChatError):
+            api.users.info(username="c")
+    with patch.object(api, "_send", return_value=FakeResponse()):
+        api.chat.postMessage(channel="#a", text="hi")
+
+    snapshot = api.instrumentation.metrics.snapshot()
+    info = snapshot["users.info"]
+    assert info["calls"] == 3
+    assert info["errors"] == {"error-invalid-user": 1}
+    assert info["bytes_sent"] == 0
+    assert info["bytes_received"] == 2 * len(ok.content) + len(error.content)
+    assert info["latency"]["buckets"] == {0.1: 3, 1.0: 3, float("inf"): 3}
+    post = snapshot["chat.postMessage"]
+    assert post["bytes_sent"] == len('{"channel": "#a", "text": "hi"}')
+
+
+def test_hooks(instrumented_api):
+    api = instrumented_api
+    seen = []
+
+    @api.instrumentation.before_request
+    def add_header(call):
+        call.request_kwargs["headers"]["X-Trace"] = "t1"
+
+    @api.instrumentation.after_response
+    def record(call):
+        seen.append((call.endpoint, call.status, type(call.error)))
+
+    @api.instrumentation.after_response
+    def broken(call):
+        raise ValueError("ignored")
+
+    with patch.object(api, "_send", return_value=FakeResponse()) as send:
+        api.me()
+    assert send.call_args[1]["headers"]["X-Trace"] == "t1"
+    with patch.object(api, "_send", side_effect=ConnectionError("down")):
+        with pytest.raises(ConnectionError):
+            api.me()
+    assert seen == [("me", 200, type(None)), ("me", None, ConnectionError)]
+    errors = api.instrumentation.metrics.snapshot()["me"]["errors"]
+    assert errors == {"ConnectionError": 1}
+
+
+def test_prometheus_format():
+    metrics = Metrics(buckets=(0.5,))
+    metrics.record("users.info", 0.2, sent=0, received=10)
+    metrics.record("users.info", 0.7, sent=0, received=5, error='bad"type')
+    text = metrics.prometheus()
+    lines = text.splitlines()
+    assert "# TYPE rocketchat_requests_total counter" in lines
+    assert 'rocketchat_requests_total{endpoint="users.info"} 2' in lines
+    assert (
+        'rocketchat_request_errors_total{endpoint="users.info",error_type="bad\\"type"} 1'
+        in lines
+    )
+    assert (
+        'rocketchat_request_duration_seconds_bucket{endpoint="users.info",le="0.5"} 1'
+        in lines
+    )
+    assert (
+        'rocketchat_request_duration_seconds_bucket{endpoint="users.info",le="+Inf"} 2'
+        in lines
+    )
+    assert 'rocketchat_request_duration_seconds_count{endpoint="users.info"} 2' in lines
+    assert 'rocketchat_response_bytes_received_total{endpoint="users.info"} 15' in lines
+    assert text.endswith("\n")
+
+
+def test_disabled_by_default():
+    with patch.object(RocketChat, "login"):
+        api = RocketChat("http://rocket.test")
+    assert api.instrumentation is None
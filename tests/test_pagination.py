@@ -0,0 +1,134 @@
+import asyncio
+import threading
+
+import pytest
+from mock import patch
+
+from rocketchat.pagination import Paginator
+
+from conftest import FakeResponse
+
+USERS = [{"_id": str(i), "username": "user{}".format(i)} for i in range(257)]
+
+# Newest first, with several messages sharing a timestamp across page boundaries.
+MESSAGES = [{"_id": "m{}".format(i), "ts": str(5000 - i // 3)} for i in range(50)]
+
+
+def fake_users_list(method, url, params=None, **kwargs):
+    offset, count = params["offset"], params["count"]
+    page = USERS[offset : offset + count]
+    return FakeResponse(
+        {"users": page, "count": len(page), "offset": offset, "total": len(USERS)}
+    )
+
+
+def fake_history(method, url, params=None, **kwargs):
+    messages = MESSAGES
+    if "latest" in params:
+        # Like the server, only the string "true" makes latest inclusive.
+        if params.get("inclusive") == "true":
+            messages = [m for m in messages if m["ts"] <= params["latest"]]
+        else:
+            messages = [m for m in messages if m["ts"] < params["latest"]]
+    offset = params.get("offset", 0)
+    return FakeResponse({"messages": messages[offset : offset + params["count"]]})
+
+
+@pytest.mark.parametrize("prefetch", [True, False])
+def test_iter_offset(offline_api, prefetch):
+    with patch.object(offline_api, "_send", side_effect=fake_users_list) as send:
+        users = list(offline_api.users.list.iter(page_size=50, prefetch=prefetch))
+    assert users == USERS
+    assert send.call_count == 6
+
+
+@pytest.mark.parametrize("page_size", [1, 2, 3, 7, 100])
+def test_iter_cursor_keeps_messages_sharing_timestamp(offline_api, page_size):
+    with patch.object(offline_api, "_send", side_effect=fake_history):
+        messages = list(
+            offline_api.channels.history.iter(roomId="r1", page_size=page_size)
+        )
+    assert messages == MESSAGES
+
+
+def capped(send, limit):
+    def capped_send(method, url, params=None, **kwargs):
+        return send(method, url, dict(params, count=min(params["count"], limit)))
+
+    return capped_send
+
+
+def test_iter_offset_with_server_capped_count(offline_api):
+    send = capped(fake_users_list, 30)
+    with patch.object(offline_api, "_send", side_effect=send):
+        users = list(offline_api.users.list.iter(page_size=100))
+    assert users == USERS
+
+
+def test_iter_cursor_with_server_capped_count(offline_api):
+    send = capped(fake_history, 4)
+    with patch.object(offline_api, "_send", side_effect=send):
+        messages = list(offline_api.channels.history.iter(roomId="r1", page_size=10))
+    assert messages == MESSAGES
+
+
+def test_boolean_params_are_sent_in_lower_case(offline_api):
+    with patch.object(offline_api, "_send", side_effect=fake_history) as send:
+        offline_api.channels.history(
+            roomId="r1", count=10, inclusive=True, unreads=False
+        )
+    params = send.call_args[1]["params"]
+    assert (params["inclusive"], params["unreads"]) == ("true", "false")
+
+
+def test_iter_prefetches_next_page(offline_api):
+    requested = []
+    second_page_requested = threading.Event()
+
+    def send(method, url, params=None, **kwargs):
+        requested.append(params["offset"])
+        if params["offset"] == 50:
+            second_page_requested.set()
+        return fake_users_list(method, url, params)
+
+    with patch.object(offline_api, "_send", side_effect=send):
+        it = offline_api.users.list.iter(page_size=50)
+        next(it)
+        assert second_page_requested.wait(5)
+        it.close()
+    assert requested[:2] == [0, 50]
+
+
+def test_iter_requires_items_key(offline_api):
+    with pytest.raises(ValueError):
+        offline_api.me.iter()
+
+
+def test_paginator_stops_on_total():
+    paginator = Paginator({"query": "{}"}, "users", page_size=10)
+    assert paginator.first_params() == {"query": "{}", "count": 10, "offset": 0}
+    page = {"users": USERS[:10], "total": 10}
+    assert paginator.next_params(page) is None
+
+
+def test_paginator_stops_on_empty_page():
+    paginator = Paginator({}, "users", page_size=10)
+    assert paginator.next_params({"users": USERS[:4]}) == {"count": 10, "offset": 4}
+    assert paginator.next_params({"users": []}) is None
+
+
+def test_async_iter():
+    pytest.importorskip("aiohttp")
+    from rocketchat import AsyncRocketChat
+
+    api = AsyncRocketChat("http://rocket.test")
+    api.auth_token = "token"
+
+    async def fake_call(args, kwargs):
+        return fake_users_list("GET", "", kwargs).json()
+
+    async def go():
+        return [u async for u in api.users.list.iter(page_size=100)]
+
+    with patch.object(type(api.users.list), "_call", side_effect=fake_call):
+        assert asyncio.run(go()) == USERS
@@ -0,0 +1,134 @@
+import threading
+from collections import Counter
+
+import pytest
+import requests
+from mock import patch
+
+from conftest import FakeResponse
+from rocketchat import RocketChat, RocketChatPool
+
+
+class Node(object):
+    """
+    A fake server behind one client of the pool.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = Counter()
+        self.down = False
+
+    def send(self, method, url, **kwargs):
+        if self.down:
+            raise requests.ConnectionError("{} is down".format(self.name))
+        path = url.split("/api/", 1)[1]
+        self.calls[path] += 1
+        if path == "info":
+            return FakeResponse({"info": {"version": "1.0"}, "success": True})
+        return FakeResponse({"node": self.name, "user": {"node": self.name}})
+
+
+def make_pool(count=3, **kwargs):
+    nodes, clients = {}, {}
+    for i in range(count):
+        name = "node{}".format(i)
+        with patch.object(RocketChat, "login"):
+            api = RocketChat("http://{}.test".format(name))
+        api.auth_token = "token"
+        nodes[name] = Node(name)
+        api._send = nodes[name].send
+        clients[name] = api
+    kwargs.setdefault("health_interval", None)
+    return RocketChatPool(clients, **kwargs), nodes
+
+
+def test_round_robin_over_endpoint_tree():
+    pool, nodes = make_pool()
+    for _ in range(6):
+        assert "node" in pool.users.info(username="bob")
+    assert [n.calls["v1/users.info"] for n in nodes.values()] == [2, 2, 2]
+    pool.settings.get("Site_Name")
+    assert sum(n.calls["v1/settings/Site_Name"] for n in nodes.values()) == 1
+    with pytest.raises(AttributeError):
+        pool.users.nope
+    assert pool["node1"] is pool.nodes[1].api
+
+
+def test_pinned_keys_stick_to_a_node():
+    pool, nodes = make_pool(policy="pinned")
+    for room in ("r1", "r2", "r3", "r4", "r5"):
+        first = pool.pin(room).chat.postMessage(roomId=room, text="a")["node"]
+        for _ in range(3):
+            assert pool.pin(room).chat.postMessage(roomId=room)["node"] == first
+    # Unkeyed calls go to the primary.
+    assert {pool.me()["node"] for _ in range(5)} == {"node0"}
+
+
+def test_least_outstanding():
+    pool, nodes = make_pool(count=2, policy="least_outstanding")
+    release = threading.Event()
+    started = threading.Event()
+    original = nodes["node0"].send
+
+    def slow(method, url, **kwargs):
+        started.set()
+        release.wait(5)
+        return original(method, url, **kwargs)
+
+    nodes["node0"].send = slow
+    pool.nodes[0].api._send = slow
+    thread = threading.Thread(target=pool.me)
+    thread.start()
+    assert started.wait(5)
+    assert pool.stats()["node0"]["outstanding"] == 1
+    assert {pool.me()["node"] for _ in range(4)} == {"node1"}
+    release.set()
+    thread.join()
+    assert pool.stats()["node0"]["outstanding"] == 0
+
+
+def test_failing_nodes_are_ejected_and_restored():
+    pool, nodes = make_pool(count=2, max_failures=2)
+    nodes["node0"].down = True
+
+    # Reads that hit a dead node are retried on another one.
+    assert [pool.me()["node"] for _ in range(4)] == ["node1"] * 4
+    assert pool.stats()["node0"]["healthy"] is False
+    assert [pool.me()["node"] for _ in range(2)] == ["node1"] * 2
+
+    # Writes are not retried, they may have reached the server.
+    nodes["node1"].down = True
+    with pytest.raises(requests.ConnectionError):
+        pool.chat.postMessage(channel="#a", text="hi")
+
+    nodes["node0"].down = nodes["node1"].down = False
+    pool.check_health()
+    assert all(s["healthy"] for s in pool.stats().values())
+    assert nodes["node0"].calls["info"] == 1
+
+
+def test_background_health_checks():
+    pool, nodes = make_pool(count=2, health_interval=0.01)
+    try:
+        nodes["node1"].down = True
+        for _ in range(200):
+            if not pool.stats()["node1"]["healthy"]:
+                break
+            threading.Event().wait(0.01)
+        assert pool.stats()["node1"]["healthy"] is False
+        assert pool.stats()["node0"]["healthy"] is True
+    finally:
+        pool.close()
+
+
+def test_iter_stays_on_one_node():
+    pool, nodes = make_pool()
+    pages = [
+        FakeResponse({"users": [{"_id": str(i)} for i in range(2)], "total": 4}),
+        FakeResponse({"users": [{"_id": str(i)} for i in range(2, 4)], "total": 4}),
+    ]
+    for n in pool.nodes:
+        n.api._send = lambda *a, **k: pages.pop(0)
+    users = list(pool.users.list.iter(page_size=2))
+    assert [u["_id"] for u in users] == ["0", "1", "2", "3"]
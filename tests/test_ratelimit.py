@@ -0,0 +1,105 @@
+import time
+
+import pytest
+from mock import patch
+
+from rocketchat import RateLimiter, RateLimitError, RocketChat
+from rocketchat.ratelimit import TokenBucket, reset_delay
+
+from conftest import FakeResponse
+
+
+def limit_headers(remaining, reset_in):
+    return {
+        "X-RateLimit-Limit": "10",
+        "X-RateLimit-Remaining": str(remaining),
+        "X-RateLimit-Reset": str(int((time.time() + reset_in) * 1000)),
+    }
+
+
+TOO_MANY = FakeResponse(
+    {"success": False, "error": "Error, too many requests."},
+    status_code=429,
+    headers={"Retry-After": "0"},
+)
+
+
+def make_api(limiter=None):
+    with patch.object(RocketChat, "login"):
+        return RocketChat("http://rocket.test", rate_limiter=limiter)
+
+
+def test_reset_delay():
+    assert reset_delay({"Retry-After": "3"}) == 3.0
+    assert 4.5 < reset_delay(limit_headers(0, 5)) <= 5.0
+    assert reset_delay({}) is None
+
+
+def test_token_bucket():
+    bucket = TokenBucket(rate=10, capacity=1)
+    now = bucket.last
+    assert bucket.reserve(now) == 0
+    assert bucket.reserve(now) == pytest.approx(0.1)
+    assert bucket.reserve(now) == pytest.approx(0.2)
+
+
+def test_exhausted_endpoint_waits_for_reset():
+    limiter = RateLimiter()
+    limiter.update("a", 200, limit_headers(0, 2))
+    assert 1.5 < limiter.reserve("a") <= 2
+    assert limiter.reserve("b") == 0
+
+
+def test_remaining_calls_are_smoothed_over_window():
+    limiter = RateLimiter()
+    limiter.update("a", 200, limit_headers(10, 1))
+    delays = [limiter.reserve("a") for _ in range(5)]
+    assert delays[0] == 0
+    assert delays == sorted(delays)
+    assert delays[4] == pytest.approx(0.4, abs=0.05)
+
+
+def test_429_is_retried():
+    api = make_api(RateLimiter(backoff=0.001))
+    ok = FakeResponse({"user": {"username": "bob"}}, headers=limit_headers(5, 1))
+    with patch.object(api.session, "request", side_effect=[TOO_MANY, ok]) as request:
+        assert api.users.info(username="bob") == {"username": "bob"}
+    assert request.call_count == 2
+    assert api.rate_limiter.throttled == 1
+
+
+def test_429_raises_rate_limit_error_after_retries():
+    api = make_api(RateLimiter(max_retries=2, backoff=0.001))
+    with patch.object(api.session, "request", return_value=TOO_MANY) as request:
+        with pytest.raises(RateLimitError) as excinfo:
+            api.users.info(username="bob")
+    assert request.call_count == 3
+    assert excinfo.value.errorType == "error-too-many-requests"
+    assert excinfo.value.retry_after == 0
+
+
+def test_429_without_limiter_raises_rate_limit_error():
+    api = make_api()
+    with patch.object(api.session, "request", return_value=TOO_MANY):
+        with pytest.raises(RateLimitError):
+            api.users.info(username="bob")
+
+
+def test_error_without_error_type():
+    api = make_api()
+    response = FakeResponse({"success": False, "error": "broken"})
+    with patch.object(api.session, "request", return_value=response):
+        with pytest.raises(Exception) as excinfo:
+            api.users.info(username="bob")
+    assert excinfo.value.errorType is None
+
+
+def test_endpoint_arguments_share_a_limit():
+    limiter = RateLimiter()
+    api = make_api(limiter)
+    response = FakeResponse({"_id": "A", "value": 1}, headers=limit_headers(0, 2))
+    with patch.object(api.session, "request", return_value=response) as request:
+        api.settings.get("A")
+    assert request.call_args[1]["url"] == "http://rocket.test/api/v1/settings/A"
+    assert "rate_key" not in request.call_args[1]
+    assert 1.5 < limiter.reserve("http://rocket.test/api/v1/settings") <= 2
@@ -0,0 +1,163 @@
+import asyncio
+import json
+
+import pytest
+
+aiohttp = pytest.importorskip("aiohttp")
+from aiohttp import web
+
+from rocketchat.errors import RocketChatError
+from rocketchat.realtime import RealtimeClient, websocket_url
+
+
+class DDPServer(object):
+    """
+    Local stand-in for the RocketChat DDP websocket.
+    """
+
+    def __init__(self, drop_after_subs=None):
+        self.connections = 0
+        self.subs = []
+        self.sockets = []
+        self.drop_after_subs = drop_after_subs
+
+    async def handler(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.connections += 1
+        self.sockets.append(ws)
+        async for msg in ws:
+            message = json.loads(msg.data)
+            kind = message["msg"]
+            if kind == "connect":
+                await ws.send_json({"msg": "ping"})
+                await ws.send_json({"msg": "connected", "session": "s1"})
+            elif kind == "method":
+                if message["params"][0]["resume"] == "good":
+                    result = {"msg": "result", "id": message["id"], "result": {}}
+                else:
+                    error = {"error": 403, "reason": "You've been logged out"}
+                    result = {"msg": "result", "id": message["id"], "error": error}
+                await ws.send_json(result)
+            elif kind == "sub":
+                if message["name"] == "forbidden":
+                    await ws.send_json(
+                        {"msg": "nosub", "id": message["id"], "error": {"error": "x"}}
+                    )
+                    continue
+                self.subs.append((message["name"], message["params"]))
+                await ws.send_json({"msg": "ready", "subs": [message["id"]]})
+                if self.drop_after_subs and len(self.subs) == self.drop_after_subs:
+                    await ws.close()
+        return ws
+
+    async def push(self, stream, event_name, *args):
+        for ws in self.sockets:
+            if not ws.closed:
+                await ws.send_json(
+                    {
+                        "msg": "changed",
+                        "collection": stream,
+                        "id": "id",
+                        "fields": {"eventName": event_name, "args": list(args)},
+                    }
+                )
+
+
+def run_with_server(server, coro_fn):
+    async def main():
+        app = web.Application()
+        app.add_routes([web.get("/websocket", server.handler)])
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = runner.addresses[0][1]
+        try:
+            return await asyncio.wait_for(
+                coro_fn("http://127.0.0.1:{}".format(port)), 10
+            )
+        finally:
+            await runner.cleanup()
+
+    return asyncio.run(main())
+
+
+def test_websocket_url():
+    assert websocket_url("https://chat.test/") == "wss://chat.test/websocket"
+    assert websocket_url("http://chat.test") == "ws://chat.test/websocket"
+
+
+def test_room_messages_through_async_iterator_and_callbacks():
+    server = DDPServer()
+    received = []
+
+    async def go(url):
+        async with RealtimeClient(url, "good", "u1") as rt:
+            await rt.subscribe_room_messages("room1")
+            await rt.subscribe_user_notifications(callback=received.append)
+            await server.push("stream-room-messages", "room1", {"msg": "hello"})
+            await server.push("stream-room-messages", "other", {"msg": "skipped"})
+            await server.push("stream-notify-user", "u1/notification", {"n": 1})
+            event = await rt.__anext__()
+            while not received:
+                await asyncio.sleep(0.01)
+            return event
+
+    event = run_with_server(server, go)
+    assert event.stream == "stream-room-messages"
+    assert event.args == [{"msg": "hello"}]
+    assert received[0].name == "u1/notification"
+    assert server.subs[0] == ("stream-room-messages", ["room1", False])
+
+
+def test_client_created_outside_the_running_loop():
+    server = DDPServer()
+    rt = RealtimeClient("http://unused.test", "good")
+
+    async def go(url):
+        rt.url = websocket_url(url)
+        async with rt:
+            await rt.subscribe_room_messages("room1")
+            await server.push("stream-room-messages", "room1", {"msg": "hello"})
+            return await rt.__anext__()
+
+    assert run_with_server(server, go).args == [{"msg": "hello"}]
+
+
+def test_reconnects_and_resubscribes():
+    server = DDPServer(drop_after_subs=1)
+
+    async def go(url):
+        async with RealtimeClient(url, "good", reconnect_delay=0.01) as rt:
+            await rt.subscribe_room_messages("room1")
+            while len(server.subs) < 2 or not rt.connected:
+                await asyncio.sleep(0.01)
+            await server.push("stream-room-messages", "room1", {"msg": "again"})
+            event = await rt.__anext__()
+            return rt.reconnects, event
+
+    reconnects, event = run_with_server(server, go)
+    assert reconnects == 1
+    assert server.connections == 2
+    assert event.args == [{"msg": "again"}]
+
+
+def test_login_failure_raises():
+    async def go(url):
+        async with RealtimeClient(url, "bad"):
+            pass
+
+    with pytest.raises(RocketChatError) as excinfo:
+        run_with_server(DDPServer(), go)
+    assert excinfo.value.errorType == 403
+
+
+def test_refused_subscription_raises():
+    async def go(url):
+        async with RealtimeClient(url, "good") as rt:
+            with pytest.raises(RocketChatError):
+                await rt.subscribe("forbidden")
+            return rt._subscriptions
+
+    assert run_with_server(DDPServer(), go) == {}
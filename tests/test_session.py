@@ -0,0 +1,66 @@
+from mock import patch
+
+from rocketchat import RocketChat
+
+from conftest import FakeResponse
+
+
+def test_calls_share_pooled_session(offline_api):
+    with patch.object(offline_api.session, "request") as request:
+        request.side_effect = [
+            FakeResponse({"user": {"username": "bob"}}),
+            FakeResponse({"channel": {"name": "general"}}),
+        ]
+        assert offline_api.users.info(username="bob") == {"username": "bob"}
+        assert offline_api.channels.info(roomName="general") == {"name": "general"}
+
+    assert request.call_count == 2
+    kwargs = request.call_args_list[0][1]
+    assert kwargs["method"] == "GET"
+    assert kwargs["url"] == "http://rocket.test/api/v1/users.info"
+    assert kwargs["params"] == {"username": "bob"}
+    assert kwargs["headers"]["X-Auth-Token"] == "token"
+
+
+def test_pool_configuration():
+    with patch.object(RocketChat, "login"):
+        api = RocketChat(
+            "http://rocket.test", pool_maxsize=32, max_retries=3, keep_alive=False
+        )
+    adapter = api.session.get_adapter("https://rocket.test")
+    assert adapter._pool_maxsize == 32
+    assert adapter.max_retries.total == 3
+    assert api.session.headers["Connection"] == "close"
+
+
+def test_context_manager_closes_owned_session():
+    with patch.object(RocketChat, "login"):
+        api = RocketChat("http://rocket.test")
+    with patch.object(api.session, "close") as close:
+        with api:
+            close.assert_not_called()
+        close.assert_called_once_with()
+
+
+def test_external_session_is_not_closed():
+    import requests
+
+    session = requests.Session()
+    with patch.object(RocketChat, "login"):
+        api = RocketChat("http://rocket.test", session=session)
+    assert api.session is session
+    with patch.object(session, "close") as close:
+        api.close()
+    assert not close.called
+
+
+def test_login_uses_session():
+    response = FakeResponse(
+        {"status": "success", "data": {"userId": "u1", "authToken": "t1"}}
+    )
+    with patch("requests.Session.request", return_value=response) as request:
+        api = RocketChat("http://rocket.test", "bob", "secret")
+        api.login()
+    assert request.call_args[1]["url"] == "http://rocket.test/api/v1/login"
+    assert request.call_args[1]["data"] == {"username": "bob", "password": "secret"}
+    assert (api.user_id, api.auth_token) == ("u1", "t1")
@@ -0,0 +1,117 @@
+import json
+
+import pytest
+
+from rocketchat.errors import RocketChatError
+from rocketchat.models import Message, Room, User
+from rocketchat.streaming import iter_items
+
+from conftest import FakeResponse
+
+USERS = [
+    {"_id": "u{}".format(i), "username": "user{}".format(i), "score": i * 1.5}
+    for i in range(50)
+]
+
+
+def chunked(data: bytes, size: int):
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 7, 100, 100000])
+def test_iter_items(size):
+    body = {"success": True, "users": USERS + [12345, -1.5e-7, "é", None], "total": 1e3}
+    rest = {}
+    items = iter_items(chunked(json.dumps(body).encode("utf-8"), size), "users", rest)
+    assert list(items) == body["users"]
+    assert rest == {"success": True, "total": 1e3}
+
+
+def test_iter_items_empty_and_missing():
+    assert list(iter_items([b'{"users": []}'], "users")) == []
+    rest = {}
+    assert list(iter_items([b' {"error": "nope"} '], "users", rest)) == []
+    assert rest == {"error": "nope"}
+
+
+def test_iter_items_truncated():
+    with pytest.raises(ValueError):
+        list(iter_items([b'{"users": [{"_id": 1}, {"_id"'], "users"))
+
+
+class StreamResponse(FakeResponse):
+    def __init__(self, payload, status_code=200):
+        super(StreamResponse, self).__init__(payload, status_code)
+        self.closed = False
+
+    def iter_content(self, chunk_size):
+        return iter(chunked(self.content, chunk_size))
+
+    def raise_for_status(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def test_stream(offline_api):
+    sent = []
+
+    def send(method, url, params=None, stream=False, **kwargs):
+        sent.append((url, params, stream))
+        return StreamResponse({"users": USERS, "total": 50, "success": True})
+
+    offline_api._send = send
+    users = list(offline_api.users.list.stream(count=0, chunk_size=10))
+    assert users == USERS
+    assert sent[0][2] is True
+
+    users = list(offline_api.users.list.stream(model=User, count=0))
+    assert users[3] == User("u3", "user3")
+    assert json.loads(sent[1][1]["fields"])["username"] == 1
+
+    list(offline_api.users.list.stream(fields=["username"]))
+    assert sent[2][1]["fields"] == json.dumps({"username": 1})
+
+
+def test_stream_errors(offline_api):
+    error = {"success": False, "error": "nope", "errorType": "e"}
+    offline_api._send = lambda *a, **kw: StreamResponse(error, 400)
+    with pytest.raises(RocketChatError):
+        list(offline_api.users.list.stream())
+
+    offline_api._send = lambda *a, **kw: StreamResponse(dict(error, users=[]))
+    with pytest.raises(RocketChatError):
+        list(offline_api.users.list.stream())
+
+    with pytest.raises(ValueError):
+        offline_api.chat.postMessage.stream()
+
+
+def test_models():
+    message = Message.from_dict(
+        {"_id": "m1", "rid": "r1", "msg": "hi", "u": {"_id": "u1", "username": "bob"}}
+    )
+    assert message.user_id == "u1"
+    assert message.username == "bob"
+    assert message.ts is None
+    assert Message.api_fields() == {
+        "_id": 1,
+        "rid": 1,
+        "msg": 1,
+        "ts": 1,
+        "u": 1,
+        "_updatedAt": 1,
+    }
+    room = Room.from_dict({"_id": "r1", "t": "c", "name": "general"})
+    assert room.to_dict()["type"] == "c"
+    assert not hasattr(room, "__dict__")
+    assert "general" in repr(room)
+    with pytest.raises(TypeError):
+        User(nickname="bob")
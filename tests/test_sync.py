@@ -0,0 +1,86 @@
+import pytest
+from mock import patch
+
+from rocketchat.sync import HistorySync, SQLiteStore
+
+from conftest import FakeHistoryServer, ts
+
+
+@pytest.fixture
+def server(offline_api):
+    server = FakeHistoryServer()
+    with patch.object(offline_api, "_send", side_effect=server.send):
+        yield server
+
+
+def ids(store, room_id="r1"):
+    return [m["_id"] for m in store.messages(room_id)]
+
+
+def test_incremental_sync(offline_api, server):
+    store = SQLiteStore()
+    sync = HistorySync(offline_api, store, page_size=7)
+    for i in range(30):
+        server.post("r1", i)
+
+    assert sync.sync_room("r1").new == 30
+    assert ids(store) == ["r1-{}".format(i) for i in range(30)]
+    assert store.checkpoint("r1").message_id == "r1-29"
+
+    calls = server.calls
+    assert sync.sync_room("r1").new == 0
+    # The first page only holds the checkpoint message, and one more request
+    # confirms it is not just capped by the server.
+    assert server.calls == calls + 2
+
+    for i in range(30, 35):
+        server.post("r1", i)
+    assert sync.sync_room("r1").new == 5
+    assert len(ids(store)) == 35
+
+
+def test_deletions_and_updates(offline_api, server):
+    store = SQLiteStore()
+    sync = HistorySync(offline_api, store)
+    for i in range(5):
+        server.post("r1", i)
+    sync.sync_room("r1")
+
+    server.deleted = ["r1-2"]
+    server.updated = [{"_id": "r1-1", "ts": ts(1), "msg": "edited"}]
+    result = sync.sync_room("r1")
+    assert (result.new, result.updated, result.deleted) == (0, 1, 1)
+    assert ids(store) == ["r1-0", "r1-1", "r1-3", "r1-4"]
+    assert list(store.messages("r1"))[1]["msg"] == "edited"
+    assert len(list(store.messages("r1", include_deleted=True))) == 5
+
+
+def test_resume_after_crash(offline_api, server, tmp_path):
+    path = str(tmp_path / "archive.db")
+    for i in range(50):
+        server.post("r1", i)
+
+    server.fail_after = 3
+    with pytest.raises(ConnectionError):
+        HistorySync(offline_api, SQLiteStore(path), page_size=10).sync_room("r1")
+    store = SQLiteStore(path)
+    cp = store.checkpoint("r1")
+    assert (cp.ts, cp.window_id, cp.cursor) == (None, "r1-49", ts(20))
+
+    server.fail_after = None
+    server.calls = 0
+    HistorySync(offline_api, store, page_size=10).sync_room("r1")
+    assert server.calls <= 3
+    assert ids(store) == ["r1-{}".format(i) for i in range(50)]
+    cp = store.checkpoint("r1")
+    assert (cp.message_id, cp.cursor) == ("r1-49", None)
+
+
+def test_sync_all_rooms_concurrently(offline_api, server):
+    store = SQLiteStore()
+    for i in range(12):
+        server.post("r1", i)
+        server.post("r2", i)
+    results = HistorySync(offline_api, store, max_workers=2).sync_all()
+    assert [(r.room_id, r.new) for r in results] == [("r1", 12), ("r2", 12)]
+    assert len(ids(store, "r2")) == 12
@@ -0,0 +1,163 @@
+import threading
+import time
+
+import pytest
+import requests
+from mock import patch
+
+from rocketchat import (
+    CircuitBreaker,
+    CircuitOpenError,
+    DeadlineExceeded,
+    Hedging,
+    RateLimiter,
+    RocketChat,
+    RocketChatPool,
+)
+from rocketchat.timeouts import DEFAULT_TIMEOUT, deadline
+
+from conftest import FakeResponse
+
+
+def test_default_and_endpoint_timeouts(offline_api):
+    offline_api.timeouts["users.list"] = (1, 300)
+    with patch.object(offline_api.session, "request") as request:
+        request.return_value = FakeResponse({"user": {}, "users": []})
+        offline_api.users.info(username="bob")
+        offline_api.users.list()
+    assert request.call_args_list[0][1]["timeout"] == DEFAULT_TIMEOUT
+    assert request.call_args_list[1][1]["timeout"] == (1, 300)
+
+
+def test_login_timeout():
+    api = RocketChat("http://rocket.test", "bob", "secret", timeout=3.0)
+    login = {"status": "success", "data": {"userId": "u1", "authToken": "t1"}}
+    with patch.object(api.session, "request", return_value=FakeResponse(login)) as r:
+        api.login()
+    assert r.call_args[1]["timeout"] == 3.0
+
+
+def test_deadline_shortens_timeouts(offline_api):
+    with patch.object(offline_api.session, "request") as request:
+        request.return_value = FakeResponse()
+        with offline_api.deadline(0.5):
+            offline_api.me()
+            with deadline(10):
+                offline_api.me()
+    for call in request.call_args_list:
+        connect, read = call[1]["timeout"]
+        assert 0 < connect <= 0.5 and 0 < read <= 0.5
+
+
+def test_deadline_exceeded(offline_api):
+    with patch.object(offline_api.session, "request") as request:
+        with deadline(0):
+            with pytest.raises(DeadlineExceeded):
+                offline_api.me()
+    assert not request.called
+
+
+def test_pagination_respects_deadline(offline_api):
+    def request(method, url, params=None, **kwargs):
+        time.sleep(0.02)
+        users = [{"_id": str(params["offset"] + i)} for i in range(10)]
+        return FakeResponse({"users": users, "total": 1000})
+
+    seen = []
+    with patch.object(offline_api.session, "request", side_effect=request):
+        with pytest.raises(DeadlineExceeded):
+            with deadline(0.1):
+                for user in offline_api.users.list.iter(page_size=10):
+                    seen.append(user)
+    assert 0 < len(seen) < 1000
+
+
+def test_rate_limit_retry_respects_deadline(offline_api):
+    offline_api.rate_limiter = RateLimiter(backoff=5, max_retries=3)
+    limited = FakeResponse({"success": False, "error": "slow down"}, 429)
+    with patch.object(offline_api.session, "request", return_value=limited) as r:
+        with deadline(1):
+            with pytest.raises(DeadlineExceeded):
+                offline_api.me()
+    assert r.call_count == 1
+
+
+def test_circuit_breaker(offline_api):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    offline_api.circuit_breaker = breaker
+    failing = {"fail": True}
+
+    def request(method, url, **kwargs):
+        if failing["fail"]:
+            raise requests.ConnectionError("down")
+        return FakeResponse()
+
+    with patch.object(offline_api.session, "request", side_effect=request) as r:
+        for _ in range(2):
+            with pytest.raises(requests.ConnectionError):
+                offline_api.me()
+        assert breaker.state == "open"
+        with pytest.raises(CircuitOpenError):
+            offline_api.me()
+        assert r.call_count == 2
+
+        time.sleep(0.06)
+        failing["fail"] = False
+        offline_api.me()
+        assert breaker.state == "closed"
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_server_errors_open_the_circuit(offline_api):
+    offline_api.circuit_breaker = CircuitBreaker(failure_threshold=1)
+    error = FakeResponse({"success": False, "error": "oops"}, 503)
+    with patch.object(offline_api.session, "request", return_value=error):
+        with pytest.raises(Exception):
+            offline_api.me()
+    with pytest.raises(CircuitOpenError):
+        offline_api.me()
+
+
+def test_pool_fails_over_open_circuit():
+    clients = []
+    for name in ("a", "b"):
+        with patch.object(RocketChat, "login"):
+            api = RocketChat("http://{}.test".format(name))
+        api.auth_token = "token"
+        api.circuit_breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+        clients.append(api)
+    clients[0].circuit_breaker.failure()
+    clients[1].session.request = lambda **kw: FakeResponse({"user": {"n": "b"}})
+    pool = RocketChatPool(clients, health_interval=None)
+    assert all(pool.users.info(username="x") == {"n": "b"} for _ in range(4))
+
+
+def test_hedged_requests(offline_api):
+    hedging = Hedging(min_samples=10, min_delay=0.01, max_delay=0.02)
+    offline_api.hedging = hedging
+    slow = threading.Event()
+    calls = []
+
+    def request(method, url, **kwargs):
+        calls.append(url)
+        if slow.is_set() and len(calls) % 2:
+            time.sleep(0.5)
+        return FakeResponse({"user": {"n": len(calls)}})
+
+    with patch.object(offline_api.session, "request", side_effect=request):
+        for _ in range(10):
+            offline_api.users.info(username="bob")
+        assert hedging.stats()["hedged"] == 0
+        assert hedging.delay("users.info") == 0.01
+
+        slow.set()
+        calls.clear()
+        start = time.perf_counter()
+        offline_api.users.info(username="bob")
+        assert time.perf_counter() - start < 0.4
+        offline_api.chat.postMessage(text="hi")
+
+    stats = hedging.stats()
+    assert stats["hedged"] == 1
+    assert stats["hedge_wins"] == 1
+    hedging.close()
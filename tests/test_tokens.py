@@ -0,0 +1,194 @@
+import asyncio
+import os
+import stat
+import threading
+import time
+
+import pytest
+from mock import patch
+
+from conftest import FakeResponse
+from rocketchat import FileTokenStore, RocketChat
+
+
+class FakeServer(object):
+    """
+    Accepts one valid token at a time and counts logins.
+    """
+
+    def __init__(self, delay=0.0):
+        self.logins = 0
+        self.token = "expired"
+        self.delay = delay
+        self.lock = threading.Lock()
+
+    def send(self, method, url, **kwargs):
+        if url.endswith("/login"):
+            time.sleep(self.delay)
+            with self.lock:
+                self.logins += 1
+                self.token = "token{}".format(self.logins)
+            data = {"userId": "u1", "authToken": self.token}
+            return FakeResponse({"status": "success", "data": data})
+        if kwargs["headers"]["X-Auth-Token"] != self.token:
+            return FakeResponse(
+                {"status": "error", "message": "You must be logged in to do this."},
+                status_code=401,
+            )
+        return FakeResponse({"_id": "u1", "username": "bob", "success": True})
+
+
+def make_api(server, **kwargs):
+    api = RocketChat("http://rocket.test", **kwargs)
+    api._send = server.send
+    return api
+
+
+def test_existing_token_skips_login():
+    server = FakeServer()
+    server.token = "pat"
+    api = make_api(server, auth_token="pat", user_id="u1")
+    assert api.me()["username"] == "bob"
+    assert server.logins == 0
+
+
+def test_expired_token_without_credentials_is_not_retried():
+    server = FakeServer()
+    api = make_api(server, auth_token="old", user_id="u1")
+    with patch.object(api, "login") as login:
+        api.me()
+    login.assert_not_called()
+
+
+def test_relogin_is_single_flight():
+    server = FakeServer(delay=0.05)
+    api = make_api(
+        server, username="bob", password="secret", auth_token="expired", user_id="u1"
+    )
+    server.token = "rotated"
+    results = []
+
+    def call():
+        results.append(api.me()["username"])
+
+    threads = [threading.Thread(target=call) for _ in range(10)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == ["bob"] * 10
+    assert server.logins == 1
+    assert api.auth_token == "token1"
+
+
+def test_token_store_shared_between_clients(tmp_path):
+    path = str(tmp_path / "tokens.json")
+    server = FakeServer(delay=0.05)
+    apis = [
+        make_api(
+            server, username="bob", password="secret", token_store=FileTokenStore(path)
+        )
+        for _ in range(5)
+    ]
+    threads = [threading.Thread(target=api.me) for api in apis]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert server.logins == 1
+    assert {api.auth_token for api in apis} == {"token1"}
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+    # A new process picks up the stored token.
+    api = make_api(
+        server, username="bob", password="secret", token_store=FileTokenStore(path)
+    )
+    api.me()
+    assert server.logins == 1
+
+    # Once it expires, the first client to notice replaces it for everyone.
+    server.token = "rotated"
+    apis[0].me()
+    assert server.logins == 2
+    apis[1].me()
+    assert server.logins == 2
+    assert apis[1].auth_token == "token2"
+    assert FileTokenStore(path).get("http://rocket.test|bob") == {
+        "userId": "u1",
+        "authToken": "token2",
+    }
+
+
+def test_discard_keeps_refreshed_token(tmp_path):
+    store = FileTokenStore(str(tmp_path / "tokens.json"))
+    store.set("k", "u1", "new")
+    store.discard("k", "old")
+    assert store.get("k")["authToken"] == "new"
+    store.discard("k")
+    assert store.get("k") is None
+
+
+def test_rejected_token_is_discarded_when_login_fails(tmp_path):
+    path = str(tmp_path / "tokens.json")
+    server = FakeServer()
+    api = make_api(
+        server, username="bob", password="secret", token_store=FileTokenStore(path)
+    )
+    api.me()
+    server.token = "rotated"
+    with patch.object(api, "login", side_effect=Exception("login failed")):
+        with pytest.raises(Exception):
+            api.me()
+    assert FileTokenStore(path).get("http://rocket.test|bob") is None
+
+
+def test_async_clients_share_one_login(tmp_path):
+    pytest.importorskip("aiohttp")
+    from rocketchat import AsyncRocketChat
+
+    store = FileTokenStore(str(tmp_path / "tokens.json"))
+    logins = []
+
+    async def login(self, **kwargs):
+        await asyncio.sleep(0.05)
+        logins.append(kwargs["username"])
+        self.user_id, self.auth_token = "u1", "token{}".format(len(logins))
+
+    apis = [
+        AsyncRocketChat("http://rocket.test", "bob", "secret", token_store=store)
+        for _ in range(2)
+    ]
+
+    async def go():
+        await asyncio.gather(*[api._ensure_login() for api in apis])
+
+    with patch.object(AsyncRocketChat, "login", login):
+        asyncio.run(go())
+    assert logins == ["bob"]
+    assert {api.auth_token for api in apis} == {"token1"}
+
+
+def test_async_lock_does_not_block_the_event_loop(tmp_path):
+    fcntl = pytest.importorskip("fcntl")
+    store = FileTokenStore(str(tmp_path / "tokens.json"))
+    # The lock held by another process.
+    other = open(store.path + ".lock", "a")
+    fcntl.flock(other, fcntl.LOCK_EX)
+    ticks = []
+
+    async def tick():
+        while True:
+            ticks.append(None)
+            await asyncio.sleep(0.01)
+
+    async def go():
+        asyncio.get_event_loop().call_later(0.1, other.close)
+        ticker = asyncio.ensure_future(tick())
+        async with store.async_lock():
+            store.set("k", "u1", "token")
+            ticked = len(ticks)
+        ticker.cancel()
+        return ticked
+
+    assert asyncio.run(go()) >= 5
+    assert store.get("k")["authToken"] == "token"